@@ -0,0 +1,121 @@
+import threading
+import time
+import cv2
+import numpy as np
+from classifier import results_to_arrays
+
+
+class FullFrameInference:
+    # Runs MediaPipe on every full-resolution frame
+    def __init__(self, hands):
+        self.hands = hands
+        self.idle = False
+
+    def process(self, image):
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return self.hands.process(rgb_image)
+
+    def wait_if_idle(self):
+        pass
+
+
+class AdaptiveInference:
+    # Skips inference on still frames and drops the camera to a cheaper mode
+    # while idle. Frames always go to `hands` whole: MediaPipe's tracking
+    # mode already follows the hand between palm detections. Camera modes
+    # are only requested here and applied by the capture thread in
+    # wait_if_idle(), since VideoCapture must not be changed while another
+    # thread is inside read().
+    def __init__(self, hands, cap=None, pixel_threshold=16, motion_fraction=0.004, max_skip=1.0,
+                 hand_skip=0.2, idle_after=3.0, idle_fps=10, idle_resolution=(320, 240)):
+        self.hands = hands
+        self.cap = cap
+        self.pixel_threshold = pixel_threshold
+        self.motion_fraction = motion_fraction
+        self.max_skip = max_skip
+        self.hand_skip = hand_skip
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.idle_resolution = idle_resolution
+        self.prev_small = None
+        self.prev_hands = None
+        self.last_inference = 0.0
+        self.last_activity = time.perf_counter()
+        self.idle = False
+        self.active_mode = None
+        self.requested = None
+        self.mode_lock = threading.Lock()
+        self.throttle = False
+        self.skipped = 0
+
+    def has_motion(self, image):
+        # Frame differencing on a tiny grayscale copy
+        small = cv2.resize(image, (64, 48), interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+        prev, self.prev_small = self.prev_small, small
+        if prev is None:
+            return False
+        diff = np.abs(small - prev)
+        return np.count_nonzero(diff > self.pixel_threshold) > diff.size * self.motion_fraction
+
+    def process(self, image):
+        # Returns MediaPipe results, or None when the frame was skipped
+        now = time.perf_counter()
+        moving = self.has_motion(image)
+        hand_seen = self.prev_hands is not None and len(self.prev_hands) > 0
+
+        limit = self.hand_skip if hand_seen else self.max_skip
+        if not moving and now - self.last_inference < limit:
+            self.skipped += 1
+            if not hand_seen and not self.idle and now - self.last_activity > self.idle_after:
+                self.set_idle(True)
+            return None
+
+        if moving or hand_seen:
+            self.last_activity = now
+            if self.idle:
+                self.set_idle(False)
+
+        results = self.hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+        self.last_inference = now
+        self.prev_hands = results_to_arrays(results)
+        return results
+
+    def set_idle(self, idle):
+        # Lower capture resolution and frame rate while nothing happens
+        self.idle = idle
+        self.prev_small = None
+        if self.cap is not None:
+            with self.mode_lock:
+                self.requested = idle
+
+    def apply_mode(self, idle):
+        # Capture thread, between reads
+        if idle:
+            self.active_mode = (self.cap.get(cv2.CAP_PROP_FRAME_WIDTH),
+                                self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT),
+                                self.cap.get(cv2.CAP_PROP_FPS))
+            if self.idle_resolution:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.idle_resolution[0])
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.idle_resolution[1])
+            self.cap.set(cv2.CAP_PROP_FPS, self.idle_fps)
+            self.throttle = self.cap.get(cv2.CAP_PROP_FPS) > self.idle_fps
+        elif self.active_mode:
+            width, height, fps = self.active_mode
+            if self.idle_resolution and width and height:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            if fps:
+                self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+    def wait_if_idle(self):
+        # Called by the capture thread before each read: apply a requested
+        # camera mode, then cap the frame rate in software for cameras that
+        # ignore CAP_PROP_FPS
+        with self.mode_lock:
+            requested, self.requested = self.requested, None
+        if requested is not None:
+            self.apply_mode(requested)
+        if self.idle and (self.throttle or self.cap is None):
+            time.sleep(1.0 / self.idle_fps)
@@ -1,43 +1,86 @@
+import time
+STARTED = time.perf_counter()
+
 import os
-import random
+import bisect
+import importlib
 import threading
-import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from mutagen.mp3 import MP3
-from mutagen.wave import WAVE
-from mutagen.flac import FLAC
-from mutagen.mp4 import MP4
+from library import LibraryIndex, LibraryWatcher
+from metadata import MetadataService
 from player import MusicPlayer
-from gestures import start_gesture_loop
+from player_actor import PlayerActor
+from playlist_view import PlaylistView
+from preview import PreviewPanel
+from search_index import TrackSearchIndex
+from session import SessionStore
+from storage import data_path
+from telemetry import telemetry
 
 class ConductifyGUI:
     def __init__(self, master):
         self.master = master
         master.title("Conductify - Gesture Music Controller")
-        master.geometry("820x580")
+        master.geometry("820x620")
         master.configure(bg="#121212")
         master.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         self.playlist = []
-        self.shuffle_history = []
         self.current_track_index = 0
         self.music_file = None
         self.is_playing = False
         self.total_duration = 0
         self.current_play_time = 0
-        self.last_update_time = time.time()
+        self.progress_job = None
+        self.metadata_job = None
+        self.search_job = None
+        self.filtered = None
         self.update_thread_active = True
         self.seeking = False
         self.loop_mode = "Off"
         self.shuffle_mode = False
         self.gesture_active = False
         self.gesture_thread = None
-
-        self.player = MusicPlayer()
+        self.gesture_pipelined = True
+        self.gesture_adaptive = True
+        self.gesture_process = True
+        # Camera preview: "panel" inside this window, "window" for the
+        # separate OpenCV window, "off" for headless gesture control
+        self.gesture_preview = "panel"
+        self.preview_fps = 15
+        # Camera sources for gesture control, one worker process each
+        self.gesture_sources = [0]
+        self.gesture_worker = None
+        self.telemetry_job = None
+        self.resume = None
+        # Software audio engine (audio_engine.py, needs sounddevice):
+        # click-free volume ramps, gapless playback and crossfades
+        self.audio_engine = False
+        self.crossfade = 0.0
+        # Port of the local control API (server.py), None to leave it off
+        self.api_port = None
+        self.api = None
+
+        self.player = self.create_player()
+        self.actor = PlayerActor(self.player, self.player_event)
+        self.metadata = MetadataService()
+        self.search_index = TrackSearchIndex()
+        self.library = LibraryIndex()
+        self.library_watcher = None
+        self.session = SessionStore()
 
         self.setup_ui()
-        self.master.after(1000, self.update_progress)
+        self.restore_session()
+
+    def create_player(self):
+        # The software engine when enabled and available, pygame.mixer.music otherwise
+        if self.audio_engine:
+            from audio_engine import EnginePlayer, available
+            if available():
+                return EnginePlayer(crossfade=self.crossfade)
+            print("Audio engine unavailable (needs sounddevice), using pygame.mixer")
+        return MusicPlayer()
 
     def setup_ui(self):
         style = ttk.Style()
@@ -47,7 +90,18 @@ class ConductifyGUI:
         self.track_label = tk.Label(self.master, text="No track loaded", bg="#121212", fg="#ffffff", font=("Segoe UI", 14, "bold"))
         self.track_label.pack(pady=10)
 
-        self.playlist_listbox = tk.Listbox(self.master, bg="#1e1e1e", fg="#ffffff", selectbackground="#1db954",
+        search_frame = tk.Frame(self.master, bg="#121212")
+        search_frame.pack(fill=tk.X, padx=20)
+        tk.Label(search_frame, text="Search", bg="#121212", fg="#888888", font=("Segoe UI", 9)).pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_var, bg="#1e1e1e", fg="#ffffff",
+                                     insertbackground="#ffffff", relief=tk.FLAT, font=("Segoe UI", 10))
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.search_var.trace_add("write", self.on_search_changed)
+        self.search_entry.bind("<Return>", self.play_first_result)
+        self.search_entry.bind("<Escape>", lambda event: self.search_var.set(""))
+
+        self.playlist_listbox = PlaylistView(self.master, bg="#1e1e1e", fg="#ffffff", selectbackground="#1db954",
                                            font=("Consolas", 11), relief=tk.FLAT, borderwidth=0, highlightthickness=0)
         self.playlist_listbox.pack(pady=5, fill=tk.X, padx=20)
         self.playlist_listbox.bind("<<ListboxSelect>>", self.play_selected_track)
@@ -67,6 +121,7 @@ class ConductifyGUI:
         self.loop_button.grid(row=0, column=4, padx=6)
         self.shuffle_button = tk.Button(controls, text="Shuffle: Off", command=self.toggle_shuffle_mode, **btn_cfg)
         self.shuffle_button.grid(row=0, column=5, padx=6)
+        tk.Button(controls, text="Library", command=self.load_library, **btn_cfg).grid(row=0, column=6, padx=6)
 
         volume_frame = tk.Frame(self.master, bg="#121212")
         volume_frame.pack(pady=10)
@@ -95,9 +150,18 @@ class ConductifyGUI:
                                              bg="#121212", font=("Segoe UI", 9, "italic"))
         self.gesture_status_label.pack()
 
+        self.preview_panel = PreviewPanel(self.master, fps=self.preview_fps, bg="#121212")
+
         self.status_label = tk.Label(self.master, text="", bg="#121212", fg="#888888", anchor="w", font=("Segoe UI", 9))
         self.status_label.pack(fill=tk.X, side=tk.BOTTOM)
 
+        # Stage timings overlay, F12 toggles it together with collection
+        self.telemetry_label = tk.Label(self.master, text="", bg="#000000", fg="#1db954", justify=tk.LEFT,
+                                        anchor="nw", font=("Consolas", 8))
+        self.master.bind("<F12>", lambda event: self.toggle_telemetry())
+        if telemetry.enabled:
+            self.show_telemetry()
+
     def load_music(self):
         # Responsible for the loading logic of the app
         files = filedialog.askopenfilenames(
@@ -110,101 +174,206 @@ class ConductifyGUI:
         ) 
 
         if files:
-            self.playlist = list(files) 
-            self.current_track_index = 0 
-            self.music_file = self.playlist[0]
-            self.player.load_playlist(self.playlist)
-            if self.player.load_track(0): 
-                self.update_playlist_display()
-                self.update_track_info() 
-                self.get_track_duration() 
-                self.status_update("Loaded track/tracks.") 
+            self.set_playlist(files, "Loaded track/tracks.")
+
+    def set_playlist(self, paths, message):
+        # Replace the playlist and load its first track
+        self.playlist = list(paths) 
+        self.current_track_index = 0 
+        self.music_file = self.playlist[0]
+        self.actor.call(self.player.load_playlist, self.playlist)
+        self.session.save_playlist(self.playlist)
+        self.session.update(index=0, position=0.0)
+        self.show_playlist()
+        self.status_update(message) 
+
+    def show_playlist(self):
+        # Fill the views of a new playlist, metadata, search and loudness build in the background
+        self.metadata.scan(self.playlist)
+        self.player.loudness.scan(self.playlist)
+        self.start_metadata_poll()
+        self.search_index.build_async(self.playlist, self.search_text)
+        self.filtered = None
+        self.search_var.set("")
+        self.update_playlist_display()
+        self.update_track_info() 
+        self.get_track_duration() 
+
+    def restore_session(self):
+        # Reopen the playlist, modes and position the last session ended with
+        start = time.perf_counter()
+        session = self.session.load()
+        if session is None or not session["playlist"]:
+            return
+        self.playlist = session["playlist"]
+        self.current_track_index = min(max(session["index"], 0), len(self.playlist) - 1)
+        self.music_file = self.playlist[self.current_track_index]
+        self.loop_mode = session["loop_mode"]
+        self.shuffle_mode = session["shuffle_mode"]
+        self.loop_button.config(text=f"Loop: {self.loop_mode}")
+        self.shuffle_button.config(text=f"Shuffle: {'On' if self.shuffle_mode else 'Off'}")
+        volume = session["volume"]
+        self.volume_var.set(int(round(volume * 100)))
+        self.volume_label.config(text=f"{int(round(volume * 100))}%")
+        self.actor.send("set_volume", volume)
+        # Opening the track waits for the window, see on_first_paint
+        self.resume = (self.player.restore, self.playlist, self.current_track_index, session["position"],
+                       self.loop_mode, self.shuffle_mode, session["shuffle"])
+        self.show_playlist()
+        self.current_play_time = session["position"]
+        self.refresh_progress()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.status_update(f"Resumed session: {len(self.playlist)} tracks in {elapsed:.0f} ms")
+
+    def save_shuffle(self):
+        # Runs on the actor thread, which owns the shuffle order
+        self.session.save_shuffle(self.player.shuffle_state())
+
+    def load_library(self):
+        # Index a whole folder tree and play from it
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+        self.status_update("Indexing library...")
+        threading.Thread(target=self.scan_library, args=(folder,), daemon=True).start()
+
+    def scan_library(self, folder):
+        # Runs on a worker thread, only folders that changed since the last scan are listed
+        start = time.perf_counter()
+        try:
+            changed, added, removed = self.library.scan(folder)
+            tracks = self.library.tracks(folder)
+        except Exception as e:
+            print(f"Library error: {e}")
+            self.master.after(0, lambda: self.status_update(f"Library error: {e}"))
+            return
+        elapsed = time.perf_counter() - start
+        self.master.after(0, lambda: self.on_library_scanned(folder, tracks, changed, elapsed))
+
+    def on_library_scanned(self, folder, tracks, changed, elapsed):
+        if not tracks:
+            self.status_update("No audio files found in library")
+            return
+        self.set_playlist(tracks, f"Library: {len(tracks)} tracks, {changed} folders rescanned in {elapsed:.2f}s")
+        if self.library_watcher is not None:
+            self.library_watcher.stop()
+            self.library_watcher = None
+        try:
+            self.library_watcher = LibraryWatcher(self.library, [folder], self.library_changed)
+        except OSError as e:
+            print(f"Library watch unavailable: {e}")
+
+    def library_changed(self, added, removed):
+        # Called from the watcher thread
+        self.master.after(0, lambda: self.apply_library_changes(added, removed))
+
+    def apply_library_changes(self, added, removed):
+        # Apply watched additions and removals to the playlist
+        added = [track for track in added if self.player.is_audio_file(track)]
+        if removed:
+            self.actor.call(self.player.remove_tracks, removed)
+            gone = set(removed)
+            self.playlist = [track for track in self.playlist if track not in gone]
+            # Follow the current track to its new position, like the player does
+            position = {track: index for index, track in enumerate(self.playlist)}
+            self.current_track_index = position.get(self.music_file, min(self.current_track_index,
+                                                                          max(len(self.playlist) - 1, 0)))
+        if added:
+            self.actor.call(self.player.add_tracks, added)
+            self.playlist.extend(added)
+        self.session.save_playlist(self.playlist)
+        if self.shuffle_mode:
+            self.actor.call(self.save_shuffle)
+        if removed:
+            self.search_index.build_async(self.playlist, self.search_text)
+            self.update_playlist_display()
+            self.on_search_changed()
+        else:
+            for track in added:
+                self.search_index.add(track, self.search_text(track))
+            if self.filtered is None:
+                self.playlist_listbox.append(len(added))
+            else:
+                self.on_search_changed()
+        if added:
+            self.metadata.scan(added)
+            self.player.loudness.scan(added)
+            self.start_metadata_poll()
+        self.update_track_info()
+        self.status_update(f"Library updated: {len(added)} added, {len(removed)} removed")
     
     def toggle_playback(self):
-        # Toggle between play and pause
+        # Toggle between play and pause, the button follows the player's state event
         if self.is_playing: 
-            self.player.pause() 
-            self.is_playing = False 
-            self.play_button.config(text="Play") 
-            self.status_update("Paused") 
-        else:
-            if self.player.is_paused: 
-                self.player.resume() 
-            else:
-                self.player.play() 
-            self.is_playing = True
-            self.play_button.config(text="Pause")
-            self.last_update_time = time.time() 
-            self.status_update(f"Playing: {os.path.basename(self.music_file)}") 
+            self.actor.send("pause")
+        elif self.playlist:
+            self.actor.send("play")
     
     def next_track(self):
         # Play next track
         if self.playlist and len(self.playlist) > 1:
-            was_playing = self.is_playing
-
-            if self.shuffle_mode:
-                self.shuffle_history.append(self.current_track_index)
-                next_index = random.randint(0, len(self.playlist) - 1)
-                while next_index == self.current_track_index:
-                    next_index = random.randint(0, len(self.playlist) - 1)
-                success = self.player.load_track(next_index)
-                if not success:
-                    return
-                self.current_track_index = next_index
-                self.music_file = self.player.playlist[next_index]
-            else:
-                if not self.player.next_track():
-                    return
-                self.current_track_index = self.player.current_track_index
-                self.music_file = self.player.playlist[self.current_track_index]
-
-            self.update_track_info()
-            self.get_track_duration()
-            self.playlist_listbox.selection_clear(0, tk.END)
-            self.playlist_listbox.selection_set(self.current_track_index)
-            self.current_play_time = 0
-            self.last_update_time = time.time()
-            self.progress_var.set(0)
-
-            if was_playing:
-                self.player.play()
-                self.is_playing = True
-                self.play_button.config(text="Pause")
+            self.actor.send("skip", 1)
 
-            self.status_update(f"Next: {os.path.basename(self.music_file)}")
-
-    
     def previous_track(self):
         # Play previous track
         if self.playlist and len(self.playlist) > 1: 
-            was_playing = self.is_playing 
-
-            if self.shuffle_mode and self.shuffle_history:
-                prev_index = self.shuffle_history.pop()
-                success = self.player.load_track(prev_index)
-                if not success:
-                    return
-                self.current_track_index = prev_index
-                self.music_file = self.player.playlist[prev_index]
+            self.actor.send("skip", -1)
+
+    def player_event(self, name, state):
+        # Called from the player actor thread
+        stamp = telemetry.now()
+        if self.api is not None:
+            if name == "state":
+                self.api.publish_state(state)
             else:
-                if not self.player.previous_track():
-                    return
-                self.current_track_index = self.player.current_track_index
-                self.music_file = self.player.playlist[self.current_track_index]
+                self.api.publish_event("player", name=name)
+        self.master.after(0, lambda: self.on_player_event(name, state, stamp))
 
-            self.update_track_info() 
+    def on_player_event(self, name, state, stamp=0.0):
+        if not self.update_thread_active:
+            return
+        telemetry.record("tk_callback", stamp)
+        if name == "ended":
+            self.on_track_ended()
+        else:
+            self.apply_player_state(state)
+
+    def apply_player_state(self, state):
+        # Mirror the player's state after a batch of commands
+        was_playing = self.is_playing
+        self.is_playing = state["is_playing"]
+        self.play_button.config(text="Pause" if self.is_playing else "Play")
+        changed = state["track"] != self.music_file or state["index"] != self.current_track_index
+        if changed:
+            self.current_track_index = state["index"]
+            self.music_file = state["track"]
+            self.update_track_info()
             self.get_track_duration()
-            self.playlist_listbox.selection_clear(0, tk.END)
+            self.show_current_selection()
             self.current_play_time = 0
-            self.last_update_time = time.time()
-            self.playlist_listbox.selection_set(self.current_track_index)
             self.progress_var.set(0)
-
-            if was_playing:
-                self.player.play()
-                self.is_playing = True
-                self.play_button.config(text="Pause")
-            self.status_update(f"Previous: {os.path.basename(self.music_file)}")
+            if self.music_file:
+                self.status_update(f"Playing: {os.path.basename(self.music_file)}")
+        elif not state["pending_skip"]:
+            # While browsing the old track still plays, its clock is not shown
+            self.current_play_time = state["position"]
+            self.refresh_progress()
+        if not changed and self.is_playing != was_playing:
+            if self.is_playing:
+                self.status_update(f"Playing: {os.path.basename(self.music_file)}")
+            elif state["is_paused"]:
+                self.status_update("Paused")
+        volume = int(round(state["volume"] * 100))
+        if volume != int(self.volume_var.get()):
+            self.volume_var.set(volume)
+            self.volume_label.config(text=f"{volume}%")
+            if self.gesture_worker is not None:
+                self.gesture_worker.set_volume(state["volume"])
+        if changed or self.is_playing != was_playing:
+            self.schedule_progress()
+        self.session.update(index=self.current_track_index, position=self.current_play_time, volume=state["volume"])
+        if changed and self.shuffle_mode:
+            self.actor.call(self.save_shuffle)
 
     def toggle_loop_mode(self):
         if self.loop_mode == "Off":
@@ -217,10 +386,15 @@ class ConductifyGUI:
             self.loop_mode = "Off"
             self.loop_button.config(text="Loop: Off")
 
+        self.actor.call(self.player.set_loop_mode, self.loop_mode)
+        self.session.update(loop_mode=self.loop_mode)
         self.status_update(f"Loop mode: {self.loop_mode}")
 
     def toggle_shuffle_mode(self):
         self.shuffle_mode = not self.shuffle_mode
+        self.actor.call(self.player.set_shuffle_mode, self.shuffle_mode)
+        self.actor.call(self.save_shuffle)
+        self.session.update(shuffle_mode=self.shuffle_mode)
         state = "On" if self.shuffle_mode else "Off"
         self.shuffle_button.config(text=f"Shuffle: {state}")
         self.status_update(f"Shuffle mode set to: {state}")
@@ -229,29 +403,14 @@ class ConductifyGUI:
         # Play selected track from playlist
         selection = self.playlist_listbox.curselection()
         if selection:
-            index = selection[0]
+            index = self.track_for_row(selection[0])
             if index < len(self.playlist):
-                self.current_track_index = index
-                self.player.current_track_index = index
-                self.player.load_playlist(self.playlist)
-                self.player.current_track_index = index
-                self.music_file = self.music_file = self.playlist[index]
-                if self.player.load_track(index):
-                    self.current_play_time = 0
-                    self.last_update_time = time.time()
-                    self.progress_var.set(0)
-                    self.update_track_info()
-                    self.get_track_duration()
-                    if self.player.play():
-                        self.is_playing = True
-                        self.play_button.config(text="Pause")
-                        self.update_progress()
-                        self.status_update(f"Playing: {os.path.basename(self.music_file)}")
+                self.actor.send("select", index)
     
     def set_volume(self, volume):
         # Set volume from scale
         vol = float(volume) / 100.0
-        self.player.set_volume(vol)
+        self.actor.send("set_volume", vol)
         self.volume_label.config(text=f"{int(volume)}%")
     
     def seek_music(self, event):
@@ -262,12 +421,41 @@ class ConductifyGUI:
             if bar_width > 0:
                 position_ratio = click_x / bar_width
                 seek_time = position_ratio * self.total_duration
+                self.actor.send("seek", seek_time)
                 self.current_play_time = seek_time
-                self.player.seek(seek_time)
-                self.current_play_time = seek_time
-                self.last_update_time = time.time()
+                self.schedule_progress()
                 self.status_update(f"Seek to {self.format_time(seek_time)}")
     
+    def on_first_paint(self):
+        # The window is up: report the startup time, then warm up what was
+        # left out of startup while the user looks at it
+        elapsed = time.perf_counter() - STARTED
+        telemetry.observe("startup", elapsed)
+        if telemetry.enabled:
+            print(f"First paint after {elapsed * 1000:.0f} ms")
+        if self.api_port is not None:
+            self.start_api()
+        if self.resume is not None:
+            self.actor.call(*self.resume)
+            self.resume = None
+        else:
+            self.actor.call(self.player.init_mixer)
+        if not self.gesture_process:
+            # The worker process imports MediaPipe itself, only the
+            # in-process loop needs it here
+            threading.Thread(target=importlib.import_module, args=("gestures",), daemon=True).start()
+
+    def start_api(self):
+        # Local control API, started before the session resumes so clients
+        # see its first state event. Imported here, startup does not pay for
+        # the server unless the API was asked for.
+        from server import ControlServer
+        self.api = ControlServer(self, port=self.api_port)
+        if self.api.start():
+            self.status_update(f"Control API on http://127.0.0.1:{self.api.port}")
+        else:
+            self.api = None
+
     def toggle_gesture_control(self):
         # Toggle gesture control on/off
         if not self.gesture_active:
@@ -279,19 +467,54 @@ class ConductifyGUI:
             self.gesture_button.config(text="Stop Gesture Control", bg="#ff4444")
             self.gesture_status_label.config(text="Gesture control ACTIVE - Camera starting...", fg="#00ff88")
             
-            # Start gesture recognition in a separate thread
-            self.gesture_thread = threading.Thread(target=lambda: start_gesture_loop(self.gesture_status_update, self), daemon=True)
-            self.gesture_thread.start()
+            panel = self.gesture_preview == "panel" and self.gesture_process
+            show_window = self.gesture_preview == "window" or (self.gesture_preview == "panel" and not panel)
+            overlay = self.gesture_preview != "off"
+            if self.gesture_process:
+                # Camera and inference in worker processes, away from Tk's GIL
+                from sessions import GestureSession
+                self.gesture_worker = GestureSession(self, self.gesture_status_update, sources=self.gesture_sources,
+                                                     pipelined=self.gesture_pipelined, adaptive=self.gesture_adaptive,
+                                                     share_frames=panel, show_window=show_window, overlay=overlay, preview_fps=self.preview_fps)
+                self.gesture_worker.start()
+                self.gesture_worker.set_volume(self.player.get_volume())
+                if panel:
+                    self.show_preview(self.gesture_worker.frames)
+            else:
+                # Start gesture recognition in a separate thread
+                from gestures import start_gesture_loop
+                self.gesture_thread = threading.Thread(target=lambda: start_gesture_loop(self.gesture_status_update, self, pipelined=self.gesture_pipelined, adaptive=self.gesture_adaptive,
+                                                                                         show_window=show_window, overlay=overlay), daemon=True)
+                self.gesture_thread.start()
             
         else:
             self.gesture_active = False
+            self.stop_gesture_worker()
             self.gesture_button.config(text="Start Gesture Control", bg="#4a4a4a")
             self.gesture_status_label.config(text="Gesture control inactive", fg="#888888")
             self.status_update("Gesture control stopped")
     
+    def show_preview(self, frames):
+        self.master.geometry("820x880")
+        self.preview_panel.pack(pady=5)
+        self.preview_panel.attach(frames)
+
+    def hide_preview(self):
+        self.preview_panel.detach()
+        self.preview_panel.pack_forget()
+        self.master.geometry("820x620")
+
+    def stop_gesture_worker(self):
+        if self.gesture_worker is not None:
+            if self.preview_panel.source is not None:
+                self.hide_preview()
+            self.gesture_worker.stop()
+            self.gesture_worker = None
+
     def start_gesture_recognition(self):
         # Start gesture recognition loop
         try:
+            from gestures import start_gesture_loop
             start_gesture_loop(self.gesture_status_update, self.player)
         except Exception as e:
             self.gesture_status_label.config(text=f"Gesture error: {str(e)}", fg="#ff4444")
@@ -300,9 +523,13 @@ class ConductifyGUI:
     
     def gesture_status_update(self, message):
         # Update gesture status from gesture recognition
+        if self.api is not None and message != "ESC_PRESSED":
+            self.api.publish_event("gesture", message=message)
+
         def update():
             if message == "ESC_PRESSED":
                 self.gesture_active = False
+                self.stop_gesture_worker()
                 self.gesture_button.config(text="Start Gesture Control", bg="#4a4a4a")
                 self.gesture_status_label.config(text="Gesture control inactive", fg="#888888")
                 self.status_update("Gesture control stopped by ESC")
@@ -310,18 +537,6 @@ class ConductifyGUI:
             
             self.gesture_status_label.config(text=message, fg="#00ff88")
             self.status_update(message)
-            
-            if "Play" in message:
-                self.is_playing = True
-                self.play_button.config(text="Pause")
-                self.last_update_time = time.time()
-            elif "Pause" in message:
-                self.is_playing = False
-                self.play_button.config(text="Play")
-
-            current_volume = int(self.player.get_volume() * 100)
-            self.volume_var.set(current_volume)
-            self.volume_label.config(text=f"{current_volume}%")
         
         self.master.after(0, update)
     
@@ -337,77 +552,162 @@ class ConductifyGUI:
             self.track_label.config(text="No track loaded")
     
     def update_playlist_display(self):
-        # Update playlist display
-        self.playlist_listbox.delete(0, tk.END)
-        for i, track in enumerate(self.playlist):
-            filename = os.path.basename(track)
-            display_text = f"{i+1:2d}. {filename}"
-            self.playlist_listbox.insert(tk.END, display_text)
+        # Update playlist display, limited to the search results while searching
+        if self.filtered is None:
+            self.playlist_listbox.set_model(len(self.playlist), self.track_display_text)
+        else:
+            self.playlist_listbox.set_model(len(self.filtered), lambda row: self.track_display_text(self.filtered[row]))
         
         if self.playlist:
-            self.playlist_listbox.selection_set(self.current_track_index)
+            self.show_current_selection()
+
+    def track_for_row(self, row):
+        return row if self.filtered is None else self.filtered[row]
+
+    def row_for_track(self, index):
+        # Row showing playlist entry `index`, None if the search hides it
+        if self.filtered is None:
+            return index
+        row = bisect.bisect_left(self.filtered, index)
+        if row < len(self.filtered) and self.filtered[row] == index:
+            return row
+        return None
+
+    def show_current_selection(self):
+        self.playlist_listbox.select(self.row_for_track(self.current_track_index))
+
+    def search_text(self, track):
+        # Searchable text: file name plus any tags the scanner found
+        parts = [os.path.basename(track)]
+        info = self.metadata.get(track)
+        if info:
+            parts.extend(info.get(key) or "" for key in ("artist", "album", "title"))
+        return " ".join(parts)
+
+    def on_search_changed(self, *args):
+        # Debounce keystrokes, the search itself runs on the prebuilt index
+        if self.search_job is not None:
+            self.master.after_cancel(self.search_job)
+        self.search_job = self.master.after(80, self.apply_search)
+
+    def apply_search(self):
+        self.search_job = None
+        query = self.search_var.get().strip()
+        if len(query) < 2:
+            if self.filtered is None:
+                return
+            self.filtered = None
+        else:
+            results = self.search_index.search(query)
+            if results is None:
+                # Index still building
+                self.search_job = self.master.after(200, self.apply_search)
+                return
+            self.filtered = results
+            self.status_update(f"{len(results)} matching tracks")
+        self.update_playlist_display()
+
+    def play_first_result(self, event=None):
+        if self.playlist and (self.filtered is None or self.filtered):
+            self.playlist_listbox.select(0)
+            self.play_selected_track(None)
+
+    def track_display_text(self, index):
+        # Playlist row, with tags and duration once the scanner has them
+        track = self.playlist[index]
+        name = os.path.basename(track)
+        info = self.metadata.get(track)
+        if info:
+            if info.get("title"):
+                name = f"{info['artist']} - {info['title']}" if info.get("artist") else info["title"]
+            if info.get("duration"):
+                name += f"  [{self.format_time(info['duration'])}]"
+        return f"{index+1:2d}. {name}"
+
+    def start_metadata_poll(self):
+        if self.metadata_job is None:
+            self.metadata_job = self.master.after(100, self.poll_metadata)
+
+    def poll_metadata(self):
+        # Fill in playlist rows as the metadata scanner finishes them
+        self.metadata_job = None
+        if not self.update_thread_active:
+            return
+        results = self.metadata.drain()
+        if results:
+            # Only the visible rows exist, so redraw those
+            self.playlist_listbox.refresh()
+        for path, info in results:
+            if info is None:
+                continue
+            self.search_index.update(path, self.search_text(path))
+            if path == self.music_file:
+                self.total_duration = info["duration"] or 0
+                self.refresh_progress()
+        if results and self.filtered is not None:
+            self.on_search_changed()
+        if self.metadata.busy():
+            self.start_metadata_poll()
     
     def get_track_duration(self):
-        # Get duration of current track
+        # Get duration of current track from the metadata scanner, never blocks
         if not self.music_file:
             return
-        try:
-            ext = os.path.splitext(self.music_file)[1].lower()
-            if ext == '.mp3':
-                audio = MP3(self.music_file)
-            elif ext == '.wav':
-                audio = WAVE(self.music_file)
-            elif ext == '.flac':
-                audio = FLAC(self.music_file)
-            elif ext == '.m4a':
-                audio = MP4(self.music_file)
-            else:
-                audio = None
-            self.total_duration = audio.info.length if audio else 0
-        except Exception as e:
-            print(f"Error getting duration: {e}")
+        info = self.metadata.request(self.music_file)
+        if info is None:
             self.total_duration = 0
+            self.start_metadata_poll()
+        else:
+            self.total_duration = info["duration"] or 0
     
+    def schedule_progress(self, delay=0):
+        # (Re)arm the progress refresh, replacing any pending one
+        if self.progress_job is not None:
+            self.master.after_cancel(self.progress_job)
+        self.progress_job = self.master.after(delay, self.update_progress)
+
     def update_progress(self):
-        # Update progress bar and time display
+        # Ask the actor for the player's clock. The position arrives with
+        # its state event and is shown by apply_player_state; mixer events
+        # come back as 'advanced' / 'ended'. Runs only while playing: once
+        # per displayed second, faster near the end of a track.
+        self.progress_job = None
         if not self.update_thread_active:
             return
-        
-        if self.is_playing and self.total_duration > 0:
-            current_time = time.time()
-            if not self.seeking:
-                time_diff = current_time - self.last_update_time
-                self.current_play_time += time_diff
-                
-                if self.current_play_time >= self.total_duration:
-                    if self.loop_mode == "One":
-                        self.current_play_time = 0
-                        self.player.seek(0)
-                        self.last_update_time = time.time()
-                        self.status_update("Replaying track (Loop One)")
-                    elif self.loop_mode == "All":
-                        self.next_track()
-                    else:
-                        if len(self.playlist) > 1 and self.current_track_index < len(self.playlist) - 1:
-                            self.next_track()
-                        else:
-                            self.player.stop()
-                            self.is_playing = False
-                            self.play_button.config(text="Play")
-                            self.status_update("Playback finished")
-            
-            self.last_update_time = current_time
 
-            if self.total_duration > 0:
-                progress = (self.current_play_time / self.total_duration) * 100
-                self.progress_var.set(min(progress, 100))
-            
-            current_str = self.format_time(self.current_play_time)
-            total_str = self.format_time(self.total_duration)
-            self.time_label.config(text=f"{current_str} / {total_str}")
-        
-        self.master.after(1000, self.update_progress)
-    
+        if self.is_playing:
+            self.actor.send("poll")
+
+        if self.is_playing:
+            remaining = self.total_duration - self.current_play_time
+            if 0 < remaining < 1.5:
+                delay = 50
+            else:
+                delay = int((1.0 - self.current_play_time % 1.0) * 1000) + 10
+            self.schedule_progress(delay)
+
+    def refresh_progress(self):
+        if self.total_duration > 0:
+            progress = (self.current_play_time / self.total_duration) * 100
+            self.progress_var.set(min(progress, 100))
+
+        current_str = self.format_time(self.current_play_time)
+        total_str = self.format_time(self.total_duration)
+        self.time_label.config(text=f"{current_str} / {total_str}")
+
+    def on_track_ended(self):
+        # The mixer ran out of music with nothing queued behind it
+        if self.loop_mode == "One":
+            self.actor.send("play")
+            self.status_update("Replaying track (Loop One)")
+        elif self.loop_mode == "All" or (len(self.playlist) > 1 and self.current_track_index < len(self.playlist) - 1):
+            self.actor.send("advance", 1)
+        else:
+            self.current_play_time = 0
+            self.is_playing = False
+            self.play_button.config(text="Play")
+            self.status_update("Playback finished")
+
     def format_time(self, seconds):
         # Format time in MM:SS format 
         if seconds < 0:
@@ -419,19 +719,71 @@ class ConductifyGUI:
     def status_update(self, message):
         # Update status bar
         self.status_label.config(text=message)
+
+    def toggle_telemetry(self):
+        # F12: start or stop collecting stage timings and show them
+        telemetry.enabled = not telemetry.enabled
+        if self.gesture_worker is not None:
+            self.gesture_worker.set_telemetry(telemetry.enabled)
+        if telemetry.enabled:
+            self.show_telemetry()
+            self.status_update("Telemetry on")
+        else:
+            if self.telemetry_job is not None:
+                self.master.after_cancel(self.telemetry_job)
+                self.telemetry_job = None
+            self.telemetry_label.place_forget()
+            self.status_update("Telemetry off")
+
+    def show_telemetry(self):
+        # Refresh the overlay once a second while telemetry is on
+        self.telemetry_job = None
+        if not telemetry.enabled:
+            return
+        self.telemetry_label.config(text="\n".join(telemetry.lines()) or "Telemetry: waiting for samples")
+        self.telemetry_label.place(x=8, y=8)
+        self.telemetry_label.lift()
+        self.telemetry_job = self.master.after(1000, self.show_telemetry)
+
+    def export_telemetry(self):
+        # Write the report to CONDUCTIFY_TELEMETRY when it names a .json/.csv
+        # file, otherwise next to the other caches
+        target = os.environ.get("CONDUCTIFY_TELEMETRY", "")
+        if os.path.splitext(target)[1].lower() not in (".json", ".csv"):
+            target = data_path("telemetry.json")
+        try:
+            telemetry.export(target)
+            print(f"Telemetry written to {target}")
+        except OSError as e:
+            print(f"Telemetry export error: {e}")
     
     def on_closing(self):
         # Handle window closing
         self.update_thread_active = False
         self.gesture_active = False
+        self.stop_gesture_worker()
+        if self.api is not None:
+            self.api.stop()
+        self.actor.stop()
+        # The actor has stopped, the shuffle order can be read from here
+        self.save_shuffle()
+        self.session.close()
+        if telemetry.enabled:
+            self.export_telemetry()
         if self.player:
             self.player.stop()
             self.player.cleanup()
+        if self.library_watcher is not None:
+            self.library_watcher.stop()
+        self.library.close()
+        self.metadata.shutdown()
         self.master.destroy()
 
 def main():
     root = tk.Tk()
     app = ConductifyGUI(root)
+    # Idle callbacks run in order, so this one follows the first redraw
+    root.after_idle(app.on_first_paint)
     try:
         root.mainloop()
     except KeyboardInterrupt:
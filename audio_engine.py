@@ -0,0 +1,600 @@
+import collections
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from player import MusicPlayer
+
+RATE = 44100
+CHANNELS = 2
+BLOCK = 1024
+# Gain changes are spread over at least this long: short enough to feel
+# immediate, long enough not to click
+RAMP_TIME = 0.03
+
+
+def available():
+    # The engine plays through sounddevice, which needs PortAudio
+    try:
+        import sounddevice
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+def open_decoder(rate):
+    # pygame decodes (and resamples) files for the engine. Its own output is
+    # not used, so SDL gets the dummy driver unless one was chosen already.
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    if pygame.mixer.get_init() is None:
+        pygame.mixer.init(frequency=rate, size=-16, channels=CHANNELS)
+    return pygame
+
+
+class Track:
+    # A decoded file. `samples` is an int16 (frames, channels) view of the
+    # pygame Sound, which is kept alive alongside it.
+    def __init__(self, path, sound, samples):
+        self.path = path
+        self.sound = sound
+        self.samples = samples
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class GainRamp:
+    # Gain that moves towards its target by at most `step` per frame, so a
+    # change is spread over the blocks that follow instead of jumping
+    def __init__(self, gain=1.0, seconds=RAMP_TIME, rate=RATE, block=BLOCK):
+        self.current = self.target = gain
+        self.rate = rate
+        self.shape = np.arange(1, block + 1, dtype=np.float32)[:, None]
+        self.ramp = np.empty((block, 1), dtype=np.float32)
+        self.set_time(seconds)
+
+    def set_time(self, seconds):
+        self.step = 1.0 / max(seconds * self.rate, 1.0)
+
+    def fade(self, out, start, end):
+        # Scale `out` by a line from start to end, reaching end on its last frame
+        n = len(out)
+        if not n:
+            return
+        ramp = self.ramp[:n]
+        np.multiply(self.shape[:n], (end - start) / n, out=ramp)
+        ramp += start
+        out *= ramp
+
+    def apply(self, out):
+        # Scale one block of (frames, channels) in place
+        if self.current == self.target:
+            if self.current != 1.0:
+                out *= self.current
+            return
+        delta = self.target - self.current
+        limit = self.step * len(out)
+        end = self.target if abs(delta) <= limit else self.current + (limit if delta > 0 else -limit)
+        self.fade(out, self.current, end)
+        self.current = end
+
+
+class Voice:
+    # One track in the mix, with its own gain for crossfades. `level` is a
+    # fixed gain, the track's loudness normalisation.
+    def __init__(self, track, serial, position=0, gain=1.0, fade=RAMP_TIME, rate=RATE, block=BLOCK, level=1.0):
+        self.track = track
+        self.serial = serial
+        self.position = position
+        self.scale = level / 32768
+        self.gain = GainRamp(gain, fade, rate, block)
+
+    def remaining(self):
+        return len(self.track) - self.position
+
+    def finished(self):
+        return self.remaining() <= 0 or (self.gain.target == 0 and self.gain.current == 0)
+
+    def mix(self, out, scratch):
+        # Add up to len(out) frames into `out`, returns how many
+        n = min(len(out), self.remaining())
+        if n <= 0:
+            return 0
+        part = scratch[:n]
+        np.multiply(self.track.samples[self.position:self.position + n], self.scale, out=part)
+        self.gain.apply(part)
+        out[:n] += part
+        self.position += n
+        return n
+
+
+class RingBuffer:
+    # Preallocated float32 frames between the mixing thread and the output
+    # callback. Positions count frames since the start and only grow; a
+    # frame's slot is its position modulo the capacity.
+    def __init__(self, frames, channels=CHANNELS):
+        self.data = np.zeros((frames, channels), dtype=np.float32)
+        self.capacity = frames
+        self.read_pos = 0
+        self.write_pos = 0
+
+    def available(self):
+        return self.write_pos - self.read_pos
+
+    def space(self):
+        return self.capacity - self.available()
+
+    def write(self, block):
+        n = len(block)
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = block[:first]
+        self.data[:n - first] = block[first:]
+        self.write_pos += n
+
+    def read(self, out):
+        # Copy up to len(out) frames into `out`, returns how many
+        n = min(len(out), self.available())
+        start = self.read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        out[first:n] = self.data[:n - first]
+        self.read_pos += n
+        return n
+
+    def truncate(self, keep):
+        # Drop buffered frames beyond the next `keep`
+        self.write_pos = min(self.write_pos, self.read_pos + keep)
+
+
+class AudioEngine:
+    # Software mixer. A feeder thread mixes the playing tracks block by
+    # block into a ring buffer a few blocks ahead of the output device; the
+    # device callback only copies blocks out and applies the master volume
+    # ramp, so volume changes and pauses take effect within a block and
+    # never click. A track queued behind the current one starts on the
+    # frame after it (gapless), or fades in over `crossfade` seconds while
+    # the current one fades out.
+    #
+    # Every track gets a serial number. Markers of (ring position, serial,
+    # track frame) tell which track and frame the output is playing.
+    def __init__(self, rate=RATE, block=BLOCK, buffer_blocks=8, crossfade=0.0, max_tracks=3):
+        self.rate = rate
+        self.block = block
+        self.crossfade = crossfade
+        self.max_tracks = max_tracks
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.ring = RingBuffer(block * buffer_blocks)
+        self.mixed = np.zeros((block, CHANNELS), dtype=np.float32)
+        self.scratch = np.zeros((block, CHANNELS), dtype=np.float32)
+        self.level = 0.5
+        self.volume = GainRamp(self.level, rate=rate, block=block)
+        self.voices = []
+        self.queued = None
+        self.queued_serial = None
+        # (serial, frame) of a cued track still being decoded
+        self.pending = None
+        self.markers = collections.deque(maxlen=buffer_blocks * 2 + 4)
+        self.serial = 0
+        self.running = False
+        self.paused = False
+        self.fade_at = None
+        self.tracks = collections.OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="decode")
+        self.pygame = None
+        self.stream = None
+        self.feeder = None
+        self.closed = False
+
+    def open(self):
+        # Start the decoder, the feeder thread and the output stream, once
+        if self.stream is not None:
+            return
+        import sounddevice
+        self.pygame = open_decoder(self.rate)
+        self.feeder = threading.Thread(target=self.feed, name="audio-feeder", daemon=True)
+        self.feeder.start()
+        self.stream = sounddevice.OutputStream(samplerate=self.rate, blocksize=self.block, channels=CHANNELS,
+                                               dtype="float32", callback=self.callback)
+        self.stream.start()
+
+    def decode(self, path):
+        sound = self.pygame.mixer.Sound(path)
+        return Track(path, sound, self.pygame.sndarray.samples(sound))
+
+    def prepare(self, path):
+        # Decode `path` in the background, returns its future
+        with self.lock:
+            future = self.tracks.get(path)
+            if future is None:
+                future = self.tracks[path] = self.executor.submit(self.decode, path)
+            self.tracks.move_to_end(path)
+            while len(self.tracks) > self.max_tracks:
+                self.tracks.popitem(last=False)
+        return future
+
+    def cue(self, path, position=0.0, level=1.0):
+        # Replace whatever plays with `path`, stopped at `position` seconds.
+        # Returns the track's serial at once: the old audio stops now, the
+        # new track joins the mix when its decode finishes, so the caller
+        # (the player actor) never waits for a decode.
+        future = self.prepare(path)
+        with self.lock:
+            self.serial += 1
+            serial = self.serial
+            frame = int(position * self.rate)
+            self.voices = []
+            self.queued = self.queued_serial = None
+            self.pending = (serial, frame)
+            self.running = False
+            self.cut()
+            self.markers.append((self.ring.write_pos, serial, frame))
+        future.add_done_callback(lambda done: self.cue_ready(done, serial, level))
+        return serial
+
+    def cue_ready(self, future, serial, level):
+        try:
+            track = future.result()
+        except Exception as e:
+            # Nothing left to play, the player sees the track end
+            print(f"Error decoding track: {e}")
+            track = None
+        with self.lock:
+            if self.pending is None or self.pending[0] != serial:
+                return
+            frame = self.pending[1]
+            self.pending = None
+            if track is not None:
+                self.voices = [Voice(track, serial, min(frame, len(track)), rate=self.rate, block=self.block,
+                                     level=level)]
+        self.wake.set()
+
+    def queue(self, path, level=1.0):
+        # Play `path` after the current track, replacing any queued one.
+        # Returns its serial; decoding finishes in the background.
+        future = self.prepare(path)
+        with self.lock:
+            self.serial += 1
+            serial = self.queued_serial = self.serial
+            self.queued = None
+        future.add_done_callback(lambda done: self.queue_ready(done, serial, level))
+        return serial
+
+    def queue_ready(self, future, serial, level):
+        try:
+            track = future.result()
+        except Exception as e:
+            print(f"Error decoding track: {e}")
+            with self.lock:
+                if self.queued_serial == serial:
+                    self.queued_serial = None
+            return
+        fade = self.crossfade or RAMP_TIME
+        with self.lock:
+            if self.queued_serial == serial:
+                self.queued = Voice(track, serial, gain=0.0 if self.crossfade else 1.0, fade=fade,
+                                    rate=self.rate, block=self.block, level=level)
+        self.wake.set()
+
+    def unqueue(self):
+        with self.lock:
+            self.queued = self.queued_serial = None
+
+    def start(self):
+        with self.lock:
+            self.running = True
+            self.paused = False
+            self.volume.target = self.level
+        self.wake.set()
+
+    def pause(self):
+        # The output ramps down, then stops reading the ring
+        with self.lock:
+            self.paused = True
+            self.volume.target = 0.0
+
+    def resume(self):
+        self.start()
+
+    def stop(self):
+        with self.lock:
+            self.voices = []
+            self.queued = self.queued_serial = None
+            self.pending = None
+            self.running = False
+            self.cut()
+
+    def seek(self, seconds):
+        # Move the current track to `seconds`, returns the position reached
+        with self.lock:
+            if self.pending is not None:
+                # Still decoding: start from there instead
+                serial = self.pending[0]
+                self.pending = (serial, max(int(seconds * self.rate), 0))
+                self.cut()
+                self.markers.append((self.ring.write_pos, serial, self.pending[1]))
+                return self.pending[1] / self.rate
+            if not self.voices:
+                return None
+            voice = self.voices[-1]
+            voice.position = min(max(int(seconds * self.rate), 0), len(voice.track))
+            voice.gain.current = voice.gain.target = 1.0
+            self.voices = [voice]
+            self.cut()
+            return voice.position / self.rate
+
+    def set_volume(self, volume):
+        with self.lock:
+            self.level = volume
+            if not self.paused:
+                self.volume.target = volume
+
+    def cut(self):
+        # Drop buffered audio, lock held. One block is kept and faded out by
+        # the callback so the switch does not click.
+        self.ring.truncate(self.block)
+        self.fade_at = self.ring.write_pos
+        while self.markers and self.markers[-1][0] >= self.fade_at:
+            self.markers.pop()
+        if self.voices:
+            voice = self.voices[-1]
+            self.markers.append((self.ring.write_pos, voice.serial, voice.position))
+
+    def position(self):
+        # (serial, seconds) of the track frame the output is playing
+        with self.lock:
+            read = self.ring.read_pos
+            marker = None
+            for candidate in reversed(self.markers):
+                marker = candidate
+                if candidate[0] <= read:
+                    break
+        if marker is None:
+            return None, 0.0
+        start, serial, frame = marker
+        return serial, (frame + max(read - start, 0)) / self.rate
+
+    def active(self):
+        # Running with something left to mix
+        with self.lock:
+            return self.running and bool(self.voices or self.pending or self.queued is not None
+                                         or self.queued_serial is not None)
+
+    def finished(self):
+        # Everything queued has been played out
+        with self.lock:
+            return (self.running and not self.voices and self.pending is None and self.queued is None
+                    and self.queued_serial is None and self.ring.available() == 0)
+
+    def feed(self):
+        # Keep the ring full while running
+        while not self.closed:
+            with self.lock:
+                ready = self.running and bool(self.voices or self.queued) and self.ring.space() >= self.block
+                if ready:
+                    self.render()
+            if not ready:
+                self.wake.wait(self.block / self.rate / 2)
+                self.wake.clear()
+
+    def render(self):
+        # Mix one block into the ring, lock held
+        mixed = self.mixed
+        mixed.fill(0)
+        queued = self.queued
+        current = self.voices[-1] if self.voices else None
+        if queued is not None and self.crossfade and current is not None \
+                and current.remaining() <= self.crossfade * self.rate:
+            # Crossfade: fade out over what is left of the current track
+            current.gain.set_time(max(current.remaining(), 1) / self.rate)
+            current.gain.target = 0.0
+            queued.gain.target = 1.0
+            self.voices.append(queued)
+            self.queued = self.queued_serial = None
+            current = queued
+        if current is not None:
+            self.markers.append((self.ring.write_pos, current.serial, current.position))
+        for voice in self.voices[:-1]:
+            voice.mix(mixed, self.scratch)
+        done = current.mix(mixed, self.scratch) if current is not None else 0
+        if done < self.block and self.queued is not None:
+            # Gapless handover on the frame after the current track ends
+            voice = self.queued
+            voice.gain.current = voice.gain.target = 1.0
+            self.voices.append(voice)
+            self.queued = self.queued_serial = None
+            self.markers.append((self.ring.write_pos + done, voice.serial, voice.position))
+            voice.mix(mixed[done:], self.scratch)
+        self.voices = [voice for voice in self.voices if not voice.finished()]
+        self.ring.write(mixed)
+
+    def callback(self, outdata, frames, time_info, status):
+        # Output device thread: copy one block out and apply the volume
+        with self.lock:
+            if self.paused and self.volume.current == 0:
+                outdata.fill(0)
+                return
+            start = self.ring.read_pos
+            n = self.ring.read(outdata)
+            fade_at, self.fade_at = self.fade_at, None
+        outdata[n:] = 0
+        if fade_at is not None:
+            # Audio that was cut off: fade it out, then ramp the new audio in
+            k = min(max(fade_at - start, 0), n)
+            if k:
+                self.volume.fade(outdata[:k], self.volume.current, 0.0)
+            self.volume.current = 0.0
+            self.volume.apply(outdata[k:])
+        else:
+            self.volume.apply(outdata)
+        self.wake.set()
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EnginePlayer(MusicPlayer):
+    # MusicPlayer on the software engine: the same playlist, shuffle and
+    # loop handling, with playback, gapless queueing and crossfades done by
+    # AudioEngine instead of pygame.mixer.music
+    def __init__(self, crossfade=0.0, **engine_options):
+        super().__init__()
+        self.engine = AudioEngine(crossfade=crossfade, **engine_options)
+        self.engine.set_volume(self.volume)
+        self.serial = None
+        self.queued_serial = None
+        self.cued = False
+
+    def init_mixer(self):
+        self.engine.open()
+
+    def mixer_ready(self):
+        return self.engine.stream is not None
+
+    def mixer_load(self, track):
+        self.engine.open()
+        self.gain = self.track_gain(track)
+        self.serial = self.engine.cue(track, level=self.gain)
+        self.cued = True
+
+    def load_track(self, index):
+        if 0 <= index < len(self.playlist):
+            self.current_track_index = index
+            track = self.playlist[self.current_track_index]
+            try:
+                self.mixer_load(track)
+            except Exception as e:
+                print(f"Error loading track: {e}")
+                return False
+            self.music_file = track
+            self.queued_index = self.queued_serial = None
+            self.start_offset = 0.0
+            self.prepare_next()
+            return True
+        return False
+
+    def prepare_next(self):
+        # Decode the predicted next tracks ahead and queue the one that follows on end
+        for index in {self.end_target(), self.skip_target()}:
+            if index is not None:
+                self.engine.prepare(self.playlist[index])
+                if self.normalize:
+                    self.loudness.gain(self.playlist[index])
+        if self.is_playing:
+            self.queue_next()
+
+    def queue_next(self):
+        # Unlike pygame's queue, the engine's can be replaced at any time
+        target = self.end_target()
+        self.stop_after_current = False
+        if target is None:
+            self.engine.unqueue()
+            self.queued_index = self.queued_serial = None
+            return
+        track = self.playlist[target]
+        self.queued_serial = self.engine.queue(track, level=self.track_gain(track))
+        self.queued_index = target
+
+    def check_transition(self):
+        # The output reached the queued track, True if it did
+        if self.queued_index is None or not self.is_playing:
+            return False
+        serial, _ = self.engine.position()
+        if serial != self.queued_serial:
+            return False
+        index = self.queued_index
+        self.queued_index = None
+        if self.shuffle is not None and index == self.shuffle.peek():
+            self.shuffle.next()
+        self.current_track_index = index
+        self.music_file = self.playlist[index]
+        self.serial = self.queued_serial
+        self.gain = self.track_gain(self.music_file)
+        self.prepare_next()
+        return True
+
+    def poll(self):
+        if not self.is_playing:
+            return []
+        if self.check_transition():
+            return ["advanced"]
+        if self.engine.finished():
+            self.is_playing = False
+            self.is_paused = False
+            self.queued_index = self.queued_serial = None
+            return ["ended"]
+        return []
+
+    def seek(self, seconds):
+        # Sample-exact for every format, the whole track is decoded
+        if not self.playlist or not self.music_file:
+            return None
+        return self.engine.seek(seconds)
+
+    def play(self):
+        if self.playlist:
+            track = self.playlist[self.current_track_index]
+            if self.cued or self.is_paused or not self.engine.active():
+                # A freshly loaded track starts where it was cued, anything
+                # else restarts like pygame's play()
+                if not self.cued or self.music_file != track:
+                    self.mixer_load(track)
+                    self.music_file = track
+                    self.queued_index = self.queued_serial = None
+                self.cued = False
+                self.engine.start()
+            self.is_playing = True
+            self.is_paused = False
+            if self.queued_index is None:
+                self.queue_next()
+
+    def pause(self):
+        if self.is_playing:
+            self.engine.pause()
+            self.is_playing = False
+            self.is_paused = True
+
+    def resume(self):
+        if self.is_paused:
+            self.engine.resume()
+            self.is_playing = True
+            self.is_paused = False
+            self.cued = False
+        elif not self.is_playing and self.music_file:
+            self.play()
+
+    def stop(self):
+        self.engine.stop()
+        self.is_paused = False
+        self.is_playing = False
+        self.cued = False
+
+    def output_volume(self):
+        # The engine applies each track's gain itself
+        return self.volume
+
+    def set_volume(self, volume):
+        # Ramped by the engine, so every pinch-drag step is click-free
+        self.volume = max(0.0, min(volume, 1.0))
+        self.engine.set_volume(self.volume)
+
+    def get_position(self):
+        serial, seconds = self.engine.position()
+        return seconds
+
+    def cleanup(self):
+        try:
+            self.preloader.shutdown()
+            self.seek_index.shutdown()
+            self.loudness.shutdown()
+            self.engine.close()
+        except Exception as e:
+            print(f"Cleanup error: {e}")
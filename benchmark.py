@@ -0,0 +1,180 @@
+import argparse
+import json
+import sys
+import time
+import cv2
+import numpy as np
+from classifier import results_to_arrays
+from detector import GestureDetector
+from gesture_model import load_mapping, load_model
+from recorder import LandmarkRecorder, read_landmarks
+from sources import open_source
+
+STAGES = ["capture", "inference", "classify"]
+
+
+def make_detector(model_path=None):
+    # Rule-based detector, or the trained gesture model at `model_path`
+    if not model_path:
+        return GestureDetector()
+    model = load_model(model_path)
+    if model is None:
+        raise SystemExit(f"Cannot load gesture model {model_path}")
+    return GestureDetector(model, load_mapping())
+
+
+def replay_video(source, adaptive=False, record_path=None, max_frames=None, model_path=None):
+    # Full path: decode frames, run MediaPipe, classify, detect gestures
+    from adaptive import AdaptiveInference, FullFrameInference
+    from gestures import create_hands
+
+    cap = open_source(source)
+    hands = create_hands()
+    infer = AdaptiveInference(hands) if adaptive else FullFrameInference(hands)
+    recorder = LandmarkRecorder(record_path) if record_path else None
+    detector = make_detector(model_path)
+    timings = {stage: [] for stage in STAGES}
+    events = []
+    results = None
+    frames = 0
+    try:
+        while cap.isOpened() and (max_frames is None or frames < max_frames):
+            start = time.perf_counter()
+            success, image = cap.read()
+            if not success:
+                break
+            image = cv2.flip(image, 1)
+            timestamp = cap.timestamp()
+            inferred = time.perf_counter()
+            timings["capture"].append(inferred - start)
+
+            fresh = infer.process(image)
+            if fresh is not None:
+                results = fresh
+            classified = time.perf_counter()
+            timings["inference"].append(classified - inferred)
+
+            hands = results_to_arrays(results) if fresh is not None else np.empty((0, 21, 3), np.float32)
+            if recorder is not None:
+                recorder.write(timestamp, hands)
+            for name, value in detector.detect(hands, timestamp):
+                events.append({"time": timestamp, "gesture": name, "value": value})
+            timings["classify"].append(time.perf_counter() - classified)
+            frames += 1
+    finally:
+        cap.release()
+        if recorder is not None:
+            recorder.close()
+    return frames, timings, events
+
+
+def replay_landmarks(path, model_path=None):
+    # Classification path only, from a recorded landmark stream
+    detector = make_detector(model_path)
+    timings = {"classify": []}
+    events = []
+    frames = 0
+    for timestamp, hands in read_landmarks(path):
+        start = time.perf_counter()
+        for name, value in detector.detect(hands, timestamp):
+            events.append({"time": timestamp, "gesture": name, "value": value})
+        timings["classify"].append(time.perf_counter() - start)
+        frames += 1
+    return frames, timings, events
+
+
+def score_events(events, labels, tolerance=0.3):
+    # Match recognised events to labelled ones with the same gesture within `tolerance` seconds
+    unmatched = list(events)
+    matched = 0
+    missed = []
+    for label in sorted(labels, key=lambda item: item["time"]):
+        best = None
+        for event in unmatched:
+            if event["gesture"] == label["gesture"] and abs(event["time"] - label["time"]) <= tolerance:
+                if best is None or abs(event["time"] - label["time"]) < abs(best["time"] - label["time"]):
+                    best = event
+        if best is None:
+            missed.append(label)
+        else:
+            unmatched.remove(best)
+            matched += 1
+    precision = matched / len(events) if events else 1.0
+    recall = matched / len(labels) if labels else 1.0
+    return {
+        "matched": matched,
+        "false_positives": unmatched,
+        "missed": missed,
+        "precision": precision,
+        "recall": recall
+    }
+
+
+def summarise(frames, timings, wall_time):
+    report = {"frames": frames, "fps": frames / wall_time if wall_time > 0 else 0.0, "stages": {}}
+    for stage, values in timings.items():
+        if not values:
+            continue
+        ms = np.array(values) * 1000.0
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        report["stages"][stage] = {"mean": float(ms.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+    return report
+
+
+def run(args):
+    start = time.perf_counter()
+    if args.input.endswith(".lmk"):
+        frames, timings, events = replay_landmarks(args.input, args.model)
+    else:
+        frames, timings, events = replay_video(args.input, args.adaptive, args.record, args.max_frames, args.model)
+    report = summarise(frames, timings, time.perf_counter() - start)
+    report["events"] = events
+
+    print(f"{report['frames']} frames at {report['fps']:.1f} fps")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<10} mean {s['mean']:.2f} ms  p50 {s['p50']:.2f}  p95 {s['p95']:.2f}  p99 {s['p99']:.2f}")
+    for event in events:
+        print(f"  {event['time']:8.3f}s  {event['gesture']}")
+
+    failed = False
+    if args.labels:
+        with open(args.labels) as f:
+            labels = json.load(f)
+        score = score_events(events, labels, args.tolerance)
+        report["score"] = score
+        print(f"Matched {score['matched']}/{len(labels)} labels, "
+              f"precision {score['precision']:.2f}, recall {score['recall']:.2f}")
+        if args.min_recall is not None and score["recall"] < args.min_recall:
+            print(f"Recall below {args.min_recall}")
+            failed = True
+        if args.min_precision is not None and score["precision"] < args.min_precision:
+            print(f"Precision below {args.min_precision}")
+            failed = True
+    if args.min_fps is not None and report["fps"] < args.min_fps:
+        print(f"Throughput below {args.min_fps} fps")
+        failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay gesture recordings headless and report performance")
+    parser.add_argument("input", help="Video file, frame directory, camera index or .lmk landmark recording")
+    parser.add_argument("--labels", help="JSON list of {\"time\": seconds, \"gesture\": name} ground truth")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Seconds allowed between label and event")
+    parser.add_argument("--record", help="Save the detected landmark stream to this .lmk file")
+    parser.add_argument("--adaptive", action="store_true", help="Use adaptive frame skipping and idle mode")
+    parser.add_argument("--model", help="Classify poses with this trained gesture model (.npz)")
+    parser.add_argument("--max-frames", type=int, help="Stop after this many frames (for live cameras)")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    parser.add_argument("--min-fps", type=float)
+    parser.add_argument("--min-recall", type=float)
+    parser.add_argument("--min-precision", type=float)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
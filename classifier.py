@@ -0,0 +1,88 @@
+import numpy as np
+
+# MediaPipe hand landmark indices
+WRIST = 0
+THUMB_IP = 3
+THUMB_TIP = 4
+INDEX_TIP = 8
+TIP_IDS = [4, 8, 12, 16, 20]
+FINGER_TIPS = [8, 12, 16, 20]
+FINGER_PIPS = [6, 10, 14, 18]
+PALM_IDS = [0, 5, 9, 13, 17]
+
+PINCH_THRESHOLD = 0.04
+
+
+def hand_to_array(hand_landmarks):
+    # Convert one MediaPipe hand to a (21, 3) array, once per frame
+    if isinstance(hand_landmarks, np.ndarray):
+        return hand_landmarks
+    return np.array([(p.x, p.y, p.z) for p in hand_landmarks.landmark], dtype=np.float32)
+
+
+def results_to_arrays(results):
+    # Convert a MediaPipe result to a (hands, 21, 3) array
+    if results is None or not results.multi_hand_landmarks:
+        return np.empty((0, 21, 3), dtype=np.float32)
+    return np.stack([hand_to_array(hand) for hand in results.multi_hand_landmarks])
+
+
+def finger_states(hands):
+    # Raised fingers (thumb first) for arrays shaped (..., 21, 3)
+    thumb = hands[..., THUMB_TIP, 0] < hands[..., THUMB_IP, 0]
+    others = hands[..., FINGER_TIPS, 1] < hands[..., FINGER_PIPS, 1]
+    return np.concatenate([thumb[..., None], others], axis=-1)
+
+
+def pinch_distance(hands):
+    # Thumb tip to index tip distance in normalised image units
+    delta = hands[..., THUMB_TIP, :2] - hands[..., INDEX_TIP, :2]
+    return np.hypot(delta[..., 0], delta[..., 1])
+
+
+def palm_centre(hands):
+    # Mean of the wrist and finger base landmarks
+    return hands[..., PALM_IDS, :2].mean(axis=-2)
+
+
+def fingertip_velocity(hands, prev_hands, dt):
+    # Fingertip velocities (..., 5, 2) in normalised units per second
+    if prev_hands is None or dt is None or dt <= 0:
+        return np.zeros(hands.shape[:-2] + (len(TIP_IDS), 2), dtype=np.float32)
+    return (hands[..., TIP_IDS, :2] - prev_hands[..., TIP_IDS, :2]) / dt
+
+
+def classify(hands, prev_hands=None, dt=None):
+    # All per-hand features for arrays shaped (..., 21, 3)
+    fingers = finger_states(hands)
+    raised = fingers.sum(axis=-1)
+    distance = pinch_distance(hands)
+    return {
+        'fingers': fingers,
+        'raised': raised,
+        'fist': raised == 0,
+        'open_palm': raised == 5,
+        'pinch': distance < PINCH_THRESHOLD,
+        'pinch_distance': distance,
+        'palm_centre': palm_centre(hands),
+        'index_tip': hands[..., INDEX_TIP, :2],
+        'tip_velocity': fingertip_velocity(hands, prev_hands, dt)
+    }
+
+
+def classify_batch(frames, timestamps=None):
+    # Classify a recorded stream of one hand, frames shaped (frames, 21, 3).
+    # Velocities come from consecutive frames, the first frame gets zero.
+    frames = np.asarray(frames, dtype=np.float32)
+    features = classify(frames)
+    velocity = np.zeros(frames.shape[:-2] + (len(TIP_IDS), 2), dtype=np.float32)
+    if len(frames) > 1:
+        if timestamps is None:
+            dt = np.ones(len(frames) - 1, dtype=np.float32)
+        else:
+            dt = np.diff(np.asarray(timestamps, dtype=np.float64)).astype(np.float32)
+            dt[dt <= 0] = np.inf
+        tips = frames[:, TIP_IDS, :2]
+        velocity[1:] = (tips[1:] - tips[:-1]) / dt[:, None, None]
+    features['tip_velocity'] = velocity
+    return features
@@ -0,0 +1,119 @@
+import collections
+import time
+import numpy as np
+from classifier import classify
+from gesture_model import landmark_features
+from tracker import HandTracker
+
+# Events fired when a hand settles into a pose
+POSE_EVENTS = {"open": "play", "fist": "pause"}
+
+
+class HandState:
+    # Gesture state machine of one tracked hand. A pose only counts once it
+    # has been held for `confirm` seconds, and each pose fires its event once
+    # on entry, so holding it never repeats. A swipe fires once per movement
+    # and re-arms when the hand comes to rest.
+    def __init__(self, now, pose_events, confirm, swipe_window, swipe_distance, rest_distance):
+        self.pose_events = pose_events
+        self.confirm = confirm
+        self.swipe_window = swipe_window
+        self.swipe_distance = swipe_distance
+        self.rest_distance = rest_distance
+        self.pose = None
+        self.candidate = None
+        self.candidate_since = now
+        self.pinch_y = None
+        self.positions = collections.deque()
+        self.swiped = False
+
+    def step(self, pose, index_y, palm_x, now):
+        events = []
+        if pose != self.candidate:
+            self.candidate = pose
+            self.candidate_since = now
+        if self.candidate != self.pose and now - self.candidate_since >= self.confirm:
+            self.pose = self.candidate
+            if self.pose in self.pose_events:
+                events.append((self.pose_events[self.pose], None))
+            self.pinch_y = index_y if self.pose == "pinch" else None
+
+        # Volume (pinch-drag)
+        if self.pose == "pinch":
+            delta = self.pinch_y - index_y
+            if abs(delta) > 0.01:
+                events.append(("volume", delta * 2))
+                self.pinch_y = index_y
+
+        # Swipe
+        self.positions.append((now, palm_x))
+        while now - self.positions[0][0] > self.swipe_window:
+            self.positions.popleft()
+        dx = palm_x - self.positions[0][1]
+        if self.swiped:
+            if abs(dx) < self.rest_distance:
+                self.swiped = False
+        elif self.pose != "pinch" and abs(dx) >= self.swipe_distance:
+            events.append(("next", None) if dx > 0 else ("previous", None))
+            self.swiped = True
+        return events
+
+
+def pose_of(features, i):
+    if features['pinch'][i]:
+        return "pinch"
+    if features['open_palm'][i]:
+        return "open"
+    if features['fist'][i]:
+        return "fist"
+    return None
+
+
+class GestureDetector:
+    # Turns per-frame hand arrays into gesture events without touching the player.
+    # Events are (name, value) tuples: play, pause, volume (delta), next, previous.
+    # Hands are tracked and smoothed so each one runs its own state machine.
+    # Poses come from the built-in rules, or from a trained gesture model
+    # with its gesture -> action mapping when one is given. Hands the model
+    # does not recognise fall back to the rules, and the built-in open /
+    # fist actions stay unless the mapping overrides them.
+    def __init__(self, model=None, mapping=None, confirm=0.1, swipe_window=0.3, swipe_distance=0.15,
+                 rest_distance=0.04, **tracker_options):
+        self.tracker = HandTracker(**tracker_options)
+        self.model = model
+        self.state_options = {
+            "pose_events": {**POSE_EVENTS, **(mapping or {})},
+            "confirm": confirm,
+            "swipe_window": swipe_window,
+            "swipe_distance": swipe_distance,
+            "rest_distance": rest_distance,
+        }
+
+    def detect(self, hands, now=None):
+        # Gesture events for one frame of hands shaped (hands, 21, 3)
+        return [(name, value) for user, name, value in self.detect_users(hands, now)]
+
+    def detect_users(self, hands, now=None):
+        # The same events as (track id, name, value): every tracked hand is
+        # one user with its own state machine
+        if now is None:
+            now = time.time()
+        tracks = self.tracker.update(hands, now)
+        if not tracks:
+            return []
+        smoothed = np.stack([track.hand for track in tracks])
+        features = classify(smoothed)
+        poses = self.model.predict(landmark_features(smoothed)) if self.model is not None else None
+        events = []
+        for i, track in enumerate(tracks):
+            if track.state is None:
+                track.state = HandState(now, **self.state_options)
+            index_x, index_y = features['index_tip'][i]
+            palm_x = features['palm_centre'][i][0]
+            # Pinch-drag volume stays rule-based, the model covers static poses
+            pose = None if poses is None or features['pinch'][i] else poses[i]
+            if pose is None:
+                pose = pose_of(features, i)
+            events.extend((track.id, name, value)
+                          for name, value in track.state.step(pose, float(index_y), float(palm_x), now))
+        return events
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from recorder import LandmarkRecorder, load_landmarks
+from storage import data_path
+
+WRIST = 0
+MIDDLE_MCP = 9
+
+# Static gestures and the player action each one triggers. Copied to
+# gestures.json on first use, where it can be edited.
+DEFAULT_MAPPING = {"open": "play", "fist": "pause"}
+ACTIONS = {"play", "pause", "stop", "next", "previous"}
+
+
+def landmark_features(hands):
+    # Position and scale invariant feature vectors for hands shaped (..., 21, 3):
+    # landmarks relative to the wrist, divided by the wrist to middle knuckle length
+    hands = np.asarray(hands, dtype=np.float32)
+    relative = hands - hands[..., WRIST:WRIST + 1, :]
+    scale = np.linalg.norm(relative[..., MIDDLE_MCP, :2], axis=-1)
+    scale = np.maximum(scale, 1e-6)[..., None, None]
+    return (relative / scale).reshape(hands.shape[:-2] + (63,))
+
+
+class KNNGestureModel:
+    # k-nearest-neighbour classifier over landmark features. Poses further
+    # than `max_distance` from every sample are rejected as unknown (None).
+    def __init__(self, samples, labels, names, k=5, max_distance=None):
+        self.samples = np.asarray(samples, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.names = list(names)
+        self.k = min(k, len(self.samples))
+        self.max_distance = max_distance
+        self.norms = (self.samples ** 2).sum(axis=1)
+
+    def predict(self, features):
+        # Gesture name (or None) for each feature vector, all hands in one pass
+        features = np.asarray(features, dtype=np.float32).reshape(-1, self.samples.shape[1])
+        if not len(features):
+            return []
+        distances = (features ** 2).sum(axis=1)[:, None] + self.norms[None, :] - 2 * features @ self.samples.T
+        nearest = np.argpartition(distances, self.k - 1, axis=1)[:, :self.k]
+        votes = self.labels[nearest]
+        names = []
+        for row, candidates in enumerate(votes):
+            label = np.bincount(candidates, minlength=len(self.names)).argmax()
+            closest = np.sqrt(max(distances[row, nearest[row]].min(), 0.0))
+            if self.max_distance is not None and closest > self.max_distance:
+                names.append(None)
+            else:
+                names.append(self.names[label])
+        return names
+
+    def save(self, path):
+        np.savez_compressed(path, samples=self.samples, labels=self.labels, names=np.array(self.names),
+                            k=self.k, max_distance=np.nan if self.max_distance is None else self.max_distance)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        max_distance = float(data["max_distance"])
+        return cls(data["samples"], data["labels"], [str(name) for name in data["names"]], int(data["k"]),
+                   None if np.isnan(max_distance) else max_distance)
+
+
+def recordings_dir():
+    return data_path("gestures")
+
+
+def model_path():
+    return data_path("gestures.npz")
+
+
+def mapping_path():
+    return data_path("gestures.json")
+
+
+def load_mapping(path=None):
+    # The user's gesture -> action mapping, created with the defaults if missing
+    path = path or mapping_path()
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            json.dump(DEFAULT_MAPPING, f, indent=2)
+        return dict(DEFAULT_MAPPING)
+    with open(path) as f:
+        mapping = json.load(f)
+    unknown = {action for action in mapping.values() if action not in ACTIONS}
+    if unknown:
+        print(f"Gesture mapping: ignoring unknown actions {sorted(unknown)}")
+    return {gesture: action for gesture, action in mapping.items() if action in ACTIONS}
+
+
+def load_model(path=None):
+    # The trained model, or None when no model has been trained yet
+    path = path or model_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        return KNNGestureModel.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Gesture model error: {e}")
+        return None
+
+
+def collect_samples(root, per_label=400):
+    # Single-hand frames of every recording under root/<label>/*.lmk,
+    # evenly thinned to at most `per_label` samples per gesture
+    if not os.path.isdir(root):
+        return None, None, []
+    names = sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+    samples = []
+    labels = []
+    for label, name in enumerate(names):
+        frames = []
+        for file_name in sorted(os.listdir(os.path.join(root, name))):
+            if file_name.endswith(".lmk"):
+                timestamps, hands = load_landmarks(os.path.join(root, name, file_name))
+                frames.extend(frame[0] for frame in hands if len(frame) == 1)
+        if not frames:
+            continue
+        keep = np.linspace(0, len(frames) - 1, min(per_label, len(frames))).astype(int)
+        samples.append(landmark_features(np.stack([frames[i] for i in keep])))
+        labels.append(np.full(len(keep), label, dtype=np.int32))
+    if not samples:
+        return None, None, names
+    return np.concatenate(samples), np.concatenate(labels), names
+
+
+def train(root=None, k=5):
+    # Build the model from the recordings, returns (model, leave-one-out accuracy)
+    samples, labels, names = collect_samples(root or recordings_dir())
+    if samples is None:
+        raise ValueError("No gesture recordings found")
+    model = KNNGestureModel(samples, labels, names, k=k)
+    distances = model.norms[:, None] + model.norms[None, :] - 2 * samples @ samples.T
+    distances = np.maximum(distances, 0.0)
+    np.fill_diagonal(distances, np.inf)
+    nearest = distances.argmin(axis=1)
+    accuracy = float((labels[nearest] == labels).mean()) if len(samples) > 1 else 1.0
+    # Reject poses much further away than samples of the same gesture are from each other
+    same = np.where(labels[:, None] == labels[None, :], distances, np.inf).min(axis=1)
+    same = np.sqrt(same[np.isfinite(same)])
+    model.max_distance = float(np.percentile(same, 95) * 2) if len(same) else None
+    return model, accuracy
+
+
+def record(label, source=0, seconds=5.0):
+    # Record one hand holding a gesture into the recordings folder
+    import cv2
+    from gestures import create_hands
+    from classifier import results_to_arrays
+    from sources import open_source
+
+    directory = os.path.join(recordings_dir(), label)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + ".lmk")
+    cap = open_source(source)
+    hands = create_hands()
+    frames = 0
+    start = time.time()
+    try:
+        with LandmarkRecorder(path) as recorder:
+            while cap.isOpened() and time.time() - start < seconds:
+                success, image = cap.read()
+                if not success:
+                    break
+                image = cv2.flip(image, 1)
+                rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                found = results_to_arrays(hands.process(rgb))
+                if len(found) == 1:
+                    recorder.write(time.time() - start, found)
+                    frames += 1
+    finally:
+        cap.release()
+    return path, frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and train custom gestures")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="Record samples of one gesture from the camera")
+    record_parser.add_argument("label", help="Gesture name, e.g. thumbs_up")
+    record_parser.add_argument("--source", default=0, help="Camera index, video file or frame directory")
+    record_parser.add_argument("--seconds", type=float, default=5.0)
+    train_parser = commands.add_parser("train", help="Train the model from all recordings")
+    train_parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        path, frames = record(args.label, args.source, args.seconds)
+        print(f"Recorded {frames} frames of '{args.label}' to {path}")
+        return 0 if frames else 1
+
+    try:
+        model, accuracy = train(k=args.k)
+    except ValueError as e:
+        print(e)
+        return 1
+    model.save(model_path())
+    mapping = load_mapping()
+    probe = model.samples[:2]
+    start = time.perf_counter()
+    for _ in range(100):
+        model.predict(probe)
+    elapsed = (time.perf_counter() - start) / 100 * 1000
+    print(f"Trained on {len(model.samples)} samples of {', '.join(model.names)}")
+    print(f"Leave-one-out accuracy {accuracy:.2%}, {elapsed:.3f} ms per frame of two hands")
+    unmapped = [name for name in model.names if name not in mapping]
+    if unmapped:
+        print(f"No action mapped for {', '.join(unmapped)}, edit {mapping_path()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
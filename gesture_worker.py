@@ -0,0 +1,195 @@
+import multiprocessing
+import threading
+import time
+import numpy as np
+from player_actor import send_gesture
+from shared_ring import FrameRing
+from telemetry import telemetry
+
+# Seconds between telemetry snapshots sent to the GUI process
+TELEMETRY_INTERVAL = 1.0
+
+
+class WorkerControl:
+    # Stands in for the GUI inside the worker process: the loops read
+    # gesture_active, and gestures are piped to the GUI process, which sends
+    # them to the player actor and reports the outcome
+    def __init__(self, conn, stop):
+        self.conn = conn
+        self.stop = stop
+        self.lock = threading.Lock()
+        self.volume = 0.5
+
+    @property
+    def gesture_active(self):
+        return not self.stop.is_set()
+
+    def send_gesture(self, name, value, stamp=None, user=None):
+        # The outcome is only known in the GUI process, nothing to report here
+        self.post("gesture", name, (value, stamp, user))
+
+    def post(self, kind, name, value=None):
+        # Capture, inference and render threads all report through here
+        with self.lock:
+            self.conn.send((kind, name, value))
+
+
+class FrameSink:
+    # Copies rendered frames into the shared frame ring, downscaled and
+    # converted to RGB for the Tk panel in buffers allocated once
+    def __init__(self, ring):
+        self.ring = ring
+        self.buffer = np.zeros(ring.shape, dtype=np.uint8)
+        self.rgb = np.zeros(ring.shape, dtype=np.uint8)
+
+    def fit(self, image):
+        import cv2
+        if image.shape == self.buffer.shape:
+            return image
+        height, width = self.buffer.shape[:2]
+        return cv2.resize(image, (width, height), dst=self.buffer, interpolation=cv2.INTER_AREA)
+
+    def write(self, timestamp, image):
+        import cv2
+        self.ring.write(timestamp, cv2.cvtColor(self.fit(image), cv2.COLOR_BGR2RGB, dst=self.rgb))
+
+
+def worker_main(conn, stop, frame_name, options):
+    # Entry point of the worker process: camera, MediaPipe and gesture
+    # detection all run here, away from the Tk / pygame process
+    frames = FrameRing(*options["frame_size"], name=frame_name) if frame_name else None
+    control = WorkerControl(conn, stop)
+    telemetry.enabled = options["telemetry"]
+
+    def status(message):
+        control.post("status", message)
+
+    def listen():
+        # Volume updates for the overlay and telemetry toggles come back over
+        # the same pipe; telemetry snapshots go out about once a second
+        reported = time.monotonic()
+        while not stop.is_set():
+            try:
+                if conn.poll(0.2):
+                    kind, value = conn.recv()
+                    if kind == "volume":
+                        control.volume = value
+                    elif kind == "telemetry":
+                        telemetry.enabled = value
+                if telemetry.enabled and time.monotonic() - reported >= TELEMETRY_INTERVAL:
+                    reported = time.monotonic()
+                    control.post("telemetry", telemetry.state())
+            except (EOFError, OSError):
+                stop.set()
+
+    threading.Thread(target=listen, daemon=True).start()
+    try:
+        from gestures import start_gesture_loop
+        start_gesture_loop(status, control, pipelined=options["pipelined"], adaptive=options["adaptive"],
+                           source=options["source"], record_path=options["record_path"],
+                           frame_sink=FrameSink(frames) if frames else None,
+                           show_window=options["show_window"], overlay=options["overlay"],
+                           preview_fps=options["preview_fps"], volume=lambda: control.volume,
+                           source_id=options["source_id"], max_hands=options["max_hands"],
+                           send=control.send_gesture)
+    except Exception as e:
+        status(f"Gesture error: {e}")
+    finally:
+        if frames is not None:
+            frames.close()
+        try:
+            control.post("stopped", None)
+        except (BrokenPipeError, OSError):
+            pass
+
+
+class GestureWorker:
+    # Runs gesture recognition in a separate process. Gesture commands and
+    # status messages arrive over a pipe that a listener thread forwards to
+    # the player actor and status_callback; preview frames, when shared,
+    # through a shared memory ring.
+    def __init__(self, gui, status_callback, source=0, pipelined=True, adaptive=True, record_path=None,
+                 share_frames=False, frame_size=(320, 240), show_window=True, overlay=True, preview_fps=15,
+                 source_id=0, max_hands=2):
+        self.gui = gui
+        self.source_id = source_id
+        self.status_callback = status_callback
+        self.context = multiprocessing.get_context("spawn")
+        self.frames = FrameRing(*frame_size) if share_frames else None
+        self.stop_event = self.context.Event()
+        self.conn, child_conn = self.context.Pipe()
+        options = {
+            "source": source,
+            "pipelined": pipelined,
+            "adaptive": adaptive,
+            "record_path": record_path,
+            "frame_size": frame_size,
+            "show_window": show_window,
+            "overlay": overlay,
+            "preview_fps": preview_fps,
+            "telemetry": telemetry.enabled,
+            "source_id": source_id,
+            "max_hands": max_hands,
+        }
+        self.process = self.context.Process(
+            target=worker_main, name=f"gesture-worker-{source_id}", daemon=True,
+            args=(child_conn, self.stop_event, self.frames.name if self.frames else None, options))
+        self.listener = None
+        self.closed = False
+
+    def start(self):
+        self.process.start()
+        self.listener = threading.Thread(target=self.listen, daemon=True)
+        self.listener.start()
+
+    def listen(self):
+        # Forward worker messages until it stops
+        while True:
+            try:
+                if not self.conn.poll(0.2):
+                    if not self.process.is_alive():
+                        break
+                    continue
+                kind, name, value = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == "gesture":
+                message = send_gesture(self.gui.actor, name, *value)
+                self.status_callback(message or "Gesture ignored: another camera has control")
+            elif kind == "telemetry":
+                telemetry.merge_remote(f"worker{self.source_id}", name)
+            elif kind == "status":
+                self.status_callback(name)
+            elif kind == "stopped":
+                break
+
+    def set_volume(self, volume):
+        # Keep the worker's volume overlay in sync
+        self.notify("volume", volume)
+
+    def set_telemetry(self, enabled):
+        self.notify("telemetry", enabled)
+
+    def notify(self, kind, value):
+        if self.process.is_alive():
+            try:
+                self.conn.send((kind, value))
+            except (BrokenPipeError, OSError):
+                pass
+
+    def stop(self, timeout=2.0):
+        # Ask the worker to finish, then make sure it is gone
+        if self.closed:
+            return
+        self.closed = True
+        self.stop_event.set()
+        if self.process.pid is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(1.0)
+        if self.listener is not None:
+            self.listener.join(1.0)
+        self.conn.close()
+        if self.frames is not None:
+            self.frames.close()
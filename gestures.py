@@ -1,130 +1,152 @@
 import cv2
 import mediapipe as mp
 import time
+import threading
 import traceback
-import math
+from adaptive import AdaptiveInference, FullFrameInference
+from classifier import (PINCH_THRESHOLD, finger_states, hand_to_array, pinch_distance,
+                        results_to_arrays)
+from detector import GestureDetector
+from gesture_model import load_mapping, load_model
+from pipeline import LatestQueue, StageStats
+from player_actor import send_gesture
+from recorder import LandmarkRecorder
+from sources import open_source
+from telemetry import telemetry
 
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 
 def count_fingers(hand_landmarks):
-    fingers = []
-    tips_ids = [4, 8, 12, 16, 20]
-
-    if hand_landmarks.landmark[tips_ids[0]].x < hand_landmarks.landmark[tips_ids[0] - 1].x:
-        fingers.append(1)
-    else:
-        fingers.append(0)
-
-    for id in range(1, 5):
-        if hand_landmarks.landmark[tips_ids[id]].y < hand_landmarks.landmark[tips_ids[id] - 2].y:
-            fingers.append(1)
-        else:
-            fingers.append(0)
-    return fingers
+    return [int(f) for f in finger_states(hand_to_array(hand_landmarks))]
 
 def is_fist(fingers): return sum(fingers) == 0
 def is_open_palm(fingers): return sum(fingers) == 5
 def is_pinch(landmarks):
-    thumb_tip = landmarks.landmark[4]
-    index_tip = landmarks.landmark[8]
-    dist = math.hypot(thumb_tip.x - index_tip.x, thumb_tip.y - index_tip.y)
-    return dist < 0.04
-
-def start_gesture_loop(status_callback, gui):
-    cap = cv2.VideoCapture(0)
-    hands = mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.6)
-
-    gesture_timers = {
-        "play": 0,
-        "pause": 0,
-        "shuffle": 0,
-        "swipe": 0
-    }
-
-    def is_allowed(gesture, cooldown=1.0):
+    return bool(pinch_distance(hand_to_array(landmarks)) < PINCH_THRESHOLD)
+
+class GestureHandler:
+    # Turns hand landmarks into player actions, shared by every loop mode
+    def __init__(self, status_callback, gui, recorder=None, sinks=(), volume=None):
+        # `sinks` get every landmark frame like the recorder does, `volume`
+        # reports the player volume for the overlay
+        self.status_callback = status_callback
+        self.gui = gui
+        self.recorder = recorder
+        self.sinks = [recorder] if recorder is not None else []
+        self.sinks.extend(sinks)
+        self.volume = volume or gui.player.get_volume
+        # Preview: HighGUI window, frame sink (e.g. the in-app panel) capped
+        # at preview_fps, or neither for headless use
+        self.frame_sink = None
+        self.show_window = True
+        self.overlay = True
+        self.preview_fps = 15
+        self.last_preview = 0.0
+        self.window = "Gesture Control"
+        # Gestures are arbitrated per camera, see sessions.GestureArbiter
+        self.source_id = 0
+        # send(name, value, stamp, user) -> status message or None
+        self.send = lambda *gesture: send_gesture(gui.actor, *gesture)
+        model = load_model()
+        self.detector = GestureDetector(model, load_mapping() if model is not None else None)
+        self.started = time.time()
+
+    def process(self, results):
+        # Act on the hands found in one frame
+        hands = results_to_arrays(results)
         now = time.time()
-        if now - gesture_timers[gesture] > cooldown:
-            gesture_timers[gesture] = now
+        for sink in self.sinks:
+            sink.write(now - self.started, hands)
+        start = telemetry.now()
+        events = self.detector.detect_users(hands, now)
+        telemetry.record("classify", start)
+        for track_id, name, value in events:
+            self.dispatch(name, value, now, self.source_id)
+
+    def dispatch(self, name, value, stamp=None, user=None):
+        # Commands go through the player actor, which coalesces bursts
+        start = telemetry.now()
+        message = self.send(name, value, stamp, user)
+        if message:
+            self.status_callback(message)
+        telemetry.record("dispatch", start)
+
+    def draw(self, image, results):
+        # Landmarks and volume bar overlay
+        if results is not None and results.multi_hand_landmarks:
+            for hand_landmarks in results.multi_hand_landmarks:
+                mp_drawing.draw_landmarks(image, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+
+        # Laid out for 640x480 and scaled to the image
+        scale = image.shape[0] / 480.0
+        volume = self.volume()
+        top, bottom, left, right = int(100 * scale), int(400 * scale), int(20 * scale), int(60 * scale)
+        bar_height = int(volume * (bottom - top))
+        cv2.rectangle(image, (left, bottom - bar_height), (right, bottom), (0, 255, 0), -1)
+        cv2.rectangle(image, (left, top), (right, bottom), (255, 255, 255), max(1, int(2 * scale)))
+        cv2.putText(image, f'{int(volume * 100)}%', (left, int(90 * scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7 * scale, (255, 255, 255), max(1, int(2 * scale)))
+
+    def wants_frame(self):
+        # Whether this frame gets rendered at all
+        if self.show_window:
             return True
-        return False
+        if self.frame_sink is None:
+            return False
+        now = time.perf_counter()
+        if now - self.last_preview < 1.0 / self.preview_fps:
+            return False
+        self.last_preview = now
+        return True
 
-    prev_pinch_y = None
-    prev_x = None
+    def render(self, image, results, text=None):
+        # Overlay and present one frame, True when ESC was pressed. The
+        # panel gets a downscaled copy, so the overlay is drawn on that.
+        if not self.show_window and self.frame_sink is not None:
+            image = self.frame_sink.fit(image)
+        if self.overlay:
+            self.draw(image, results)
+            if text:
+                cv2.putText(image, text, (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        return self.present(image)
 
-    try:
-        while cap.isOpened():
-            if not gui.gesture_active:
-                break
+    def present(self, image, wait=1):
+        # Hand the rendered frame to the frame sink and/or the HighGUI
+        # window, True when ESC was pressed there
+        if self.frame_sink is not None:
+            self.frame_sink.write(time.time() - self.started, image)
+        if not self.show_window:
+            return False
+        cv2.imshow(self.window, image)
+        return cv2.waitKey(wait) & 0xFF == 27
 
-            success, image = cap.read()
-            if not success:
-                continue
-
-            image = cv2.flip(image, 1)
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = hands.process(rgb_image)
-
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    mp_drawing.draw_landmarks(image, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-                    fingers = count_fingers(hand_landmarks)
-
-                    # Play
-                    if is_open_palm(fingers) and is_allowed("play", cooldown=1.2):
-                        status_callback("Gesture: Play")
-                        if gui.player.is_paused:
-                            gui.player.resume()
-                        else:
-                            gui.player.play()
-
-                    # Pause
-                    elif is_fist(fingers) and is_allowed("pause", cooldown=1.2):
-                        status_callback("Gesture: Pause")
-                        gui.player.pause()
-
-                    # Volume (pinch-drag)
-                    if is_pinch(hand_landmarks):
-                        pinch_y = hand_landmarks.landmark[8].y
-                        if prev_pinch_y is not None:
-                            delta = prev_pinch_y - pinch_y
-                            if abs(delta) > 0.01:
-                                volume = gui.player.get_volume()
-                                volume += delta * 2
-                                volume = min(max(volume, 0), 1)
-                                gui.player.set_volume(volume)
-                                status_callback(f"Gesture volume: {int(volume * 100)}%")
-                        prev_pinch_y = pinch_y
-                    else:
-                        prev_pinch_y = None
-
-                    # Swipe
-                    index_x = hand_landmarks.landmark[8].x
-                    if prev_x is not None and is_allowed("swipe", cooldown=0.8):
-                        now = time.time()
-                        dx = index_x - prev_x
-                        if abs(dx) > 0.1:
-                            if dx > 0:
-                                status_callback("Gesture: Next Track")
-                                gui.next_track()
-                            else:
-                                status_callback("Gesture: Previous Track")
-                                gui.previous_track()
-                            gesture_timers["swipe"] = now
-                    prev_x = index_x
-
-            # Volume bar UI
-            volume = gui.player.get_volume()
-            bar_height = int(volume * 300)
-            cv2.rectangle(image, (20, 400 - bar_height), (60, 400), (0, 255, 0), -1)
-            cv2.rectangle(image, (20, 100), (60, 400), (255, 255, 255), 2)
-            cv2.putText(image, f'{int(volume * 100)}%', (20, 90),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-            cv2.imshow("Gesture Control", image)
-            if cv2.waitKey(5) & 0xFF == 27:
-                status_callback("ESC_PRESSED")
-                break
+def create_hands(max_hands=2):
+    return mp_hands.Hands(max_num_hands=max_hands, min_detection_confidence=0.7, min_tracking_confidence=0.6)
+
+def start_gesture_loop(status_callback, gui, pipelined=False, adaptive=False, source=0, record_path=None,
+                       sinks=(), frame_sink=None, show_window=True, overlay=True, preview_fps=15, volume=None,
+                       source_id=0, max_hands=2, send=None):
+    cap = open_source(source)
+    hands = create_hands(max_hands)
+    recorder = LandmarkRecorder(record_path) if record_path else None
+    handler = GestureHandler(status_callback, gui, recorder, sinks, volume)
+    handler.frame_sink = frame_sink
+    handler.show_window = show_window
+    handler.overlay = overlay
+    handler.preview_fps = preview_fps
+    handler.source_id = source_id
+    if send is not None:
+        handler.send = send
+    if source_id:
+        handler.window = f"Gesture Control {source_id + 1}"
+    infer = AdaptiveInference(hands, cap) if adaptive else FullFrameInference(hands)
+
+    try:
+        if pipelined:
+            run_pipelined_loop(status_callback, gui, cap, infer, handler)
+        else:
+            run_sequential_loop(status_callback, gui, cap, infer, handler)
 
         status_callback("Gesture control stopped")
 
@@ -134,4 +156,127 @@ def start_gesture_loop(status_callback, gui):
         status_callback(f"Gesture error: {str(e)}")
     finally:
         cap.release()
+        if recorder is not None:
+            recorder.close()
         cv2.destroyAllWindows()
+
+def run_sequential_loop(status_callback, gui, cap, infer, handler):
+    # Capture, inference and render one after another on this thread
+    results = None
+    while cap.isOpened():
+        if not gui.gesture_active:
+            break
+
+        infer.wait_if_idle()
+        start = telemetry.now()
+        success, image = cap.read()
+        if not success:
+            continue
+
+        image = cv2.flip(image, 1)
+        telemetry.record("capture", start)
+        start = telemetry.now()
+        fresh = infer.process(image)
+        telemetry.record("inference", start)
+        if fresh is not None:
+            results = fresh
+            handler.process(results)
+
+        if handler.wants_frame() and handler.render(image, results):
+            status_callback("ESC_PRESSED")
+            break
+
+def run_pipelined_loop(status_callback, gui, cap, infer, handler):
+    # Capture and inference run on their own threads, this thread renders.
+    # Stages hand over through latest-frame-wins queues so a slow stage
+    # drops stale frames instead of acting on them later.
+    stop = threading.Event()
+    frames = LatestQueue(1)
+    outputs = LatestQueue(1)
+    stats = StageStats(["capture", "inference", "render"])
+    errors = []
+
+    def capture():
+        try:
+            while not stop.is_set() and cap.isOpened():
+                infer.wait_if_idle()
+                start = time.perf_counter()
+                success, image = cap.read()
+                if not success:
+                    time.sleep(0.005)
+                    continue
+                image = cv2.flip(image, 1)
+                stats.record("capture", start)
+                telemetry.record("capture", start)
+                frames.put((start, image))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+            frames.close()
+
+    def inference():
+        results = None
+        try:
+            while not stop.is_set():
+                item = frames.get(timeout=0.1)
+                if item is None:
+                    continue
+                captured, image = item
+                start = time.perf_counter()
+                fresh = infer.process(image)
+                telemetry.record("inference", start)
+                if fresh is not None:
+                    results = fresh
+                    handler.process(results)
+                stats.record("inference", start)
+                outputs.put((captured, image, results))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+            outputs.close()
+
+    workers = [threading.Thread(target=capture, daemon=True),
+               threading.Thread(target=inference, daemon=True)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        fps_text = ""
+        reported = {"capture": 0, "inference": 0}
+        while not stop.is_set() and gui.gesture_active:
+            item = outputs.get(timeout=0.1)
+            escape = False
+            if item is not None:
+                captured, image, results = item
+                start = time.perf_counter()
+                if handler.wants_frame():
+                    escape = handler.render(image, results, fps_text)
+                stats.record("render", start)
+                stats.record_latency(captured)
+            elif handler.show_window:
+                escape = cv2.waitKey(1) & 0xFF == 27
+
+            if escape:
+                status_callback("ESC_PRESSED")
+                break
+
+            if stats.due():
+                snapshot, latency = stats.snapshot()
+                fps_text = " | ".join(f"{stage} {s['fps']:.0f}" for stage, s in snapshot.items())
+                # Drops since the last report; the summary also starts a new window
+                dropped = {"capture": frames.dropped, "inference": outputs.dropped}
+                summary = stats.summary({name: count - reported[name] for name, count in dropped.items()})
+                reported = dropped
+                if telemetry.enabled:
+                    print(summary)
+                telemetry.gauge("dropped_capture", frames.dropped)
+                telemetry.gauge("dropped_inference", outputs.dropped)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=1.0)
+
+    if errors:
+        raise errors[0]
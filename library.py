@@ -0,0 +1,306 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sqlite3
+import struct
+import threading
+import time
+from player import AUDIO_EXTENSIONS
+from storage import data_path
+
+
+def is_audio_name(name):
+    return os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS
+
+
+class LibraryIndex:
+    # SQLite index of whole directory trees. Each directory's mtime is
+    # stored, so a rescan only lists directories whose entries changed.
+    def __init__(self, path=None):
+        self.db = sqlite3.connect(path or data_path("library.db"), check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, root TEXT, mtime REAL, subdirs TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS tracks (path TEXT PRIMARY KEY, dir TEXT, root TEXT, size INTEGER, mtime REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS tracks_dir ON tracks (dir)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS tracks_root ON tracks (root)")
+
+    def scan(self, root):
+        # Bring the index for `root` up to date, returns (changed dirs, added, removed)
+        root = os.path.abspath(root)
+        with self.lock:
+            known = {row[0]: (row[1], row[2]) for row in
+                     self.db.execute("SELECT path, mtime, subdirs FROM dirs WHERE root = ?", (root,))}
+        seen = set()
+        changed = added = removed = 0
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            seen.add(directory)
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                continue
+            entry = known.get(directory)
+            if entry is not None and entry[0] == mtime:
+                stack.extend(os.path.join(directory, name) for name in entry[1].split("\n") if name)
+                continue
+            subdirs, files = self.list_directory(directory)
+            with self.lock, self.db:
+                a, r = self.replace_directory(directory, root, mtime, subdirs, files)
+            added += a
+            removed += r
+            changed += 1
+            stack.extend(os.path.join(directory, name) for name in subdirs)
+
+        gone = [path for path in known if path not in seen]
+        if gone:
+            with self.lock, self.db:
+                for directory in gone:
+                    removed += self.forget_directory(directory)
+        return changed, added, removed
+
+    def list_directory(self, directory):
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif is_audio_name(entry.name) and entry.is_file():
+                            stat = entry.stat()
+                            files.append((entry.path, stat.st_size, stat.st_mtime))
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Library scan error: {e}")
+        return subdirs, files
+
+    def replace_directory(self, directory, root, mtime, subdirs, files):
+        # Store one directory listing, returns (added, removed) track counts
+        before = {row[0] for row in self.db.execute("SELECT path FROM tracks WHERE dir = ?", (directory,))}
+        after = {path for path, size, file_mtime in files}
+        self.db.execute("DELETE FROM tracks WHERE dir = ?", (directory,))
+        self.db.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?)",
+                            [(path, directory, root, size, file_mtime) for path, size, file_mtime in files])
+        self.db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+                        (directory, root, mtime, "\n".join(subdirs)))
+        return len(after - before), len(before - after)
+
+    def forget_directory(self, directory):
+        count = self.db.execute("DELETE FROM tracks WHERE dir = ?", (directory,)).rowcount
+        self.db.execute("DELETE FROM dirs WHERE path = ?", (directory,))
+        return count
+
+    def tracks(self, root):
+        root = os.path.abspath(root)
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT path FROM tracks WHERE root = ? ORDER BY path", (root,))]
+
+    def directories(self, root):
+        root = os.path.abspath(root)
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT path FROM dirs WHERE root = ?", (root,))]
+
+    def root_of(self, directory):
+        with self.lock:
+            row = self.db.execute("SELECT root FROM dirs WHERE path = ?", (directory,)).fetchone()
+        return row[0] if row else None
+
+    def add_track(self, path, root):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        with self.lock, self.db:
+            exists = self.db.execute("SELECT 1 FROM tracks WHERE path = ?", (path,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?)",
+                            (path, os.path.dirname(path), root, stat.st_size, stat.st_mtime))
+            self.touch_directory(os.path.dirname(path))
+        return not exists
+
+    def remove_track(self, path):
+        with self.lock, self.db:
+            count = self.db.execute("DELETE FROM tracks WHERE path = ?", (path,)).rowcount
+            self.touch_directory(os.path.dirname(path))
+        return count > 0
+
+    def remove_tree(self, directory):
+        # Forget a directory and everything below it, returns the removed track paths
+        prefix = directory.rstrip(os.sep) + os.sep
+        with self.lock, self.db:
+            paths = [row[0] for row in self.db.execute(
+                "SELECT path FROM tracks WHERE dir = ? OR substr(dir, 1, ?) = ?", (directory, len(prefix), prefix))]
+            self.db.execute("DELETE FROM tracks WHERE dir = ? OR substr(dir, 1, ?) = ?", (directory, len(prefix), prefix))
+            self.db.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?", (directory, len(prefix), prefix))
+        return paths
+
+    def touch_directory(self, directory):
+        # Record a watched change so the next rescan does not list the directory again
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return
+        row = self.db.execute("SELECT subdirs FROM dirs WHERE path = ?", (directory,)).fetchone()
+        if row is not None:
+            subdirs = sorted(entry.name for entry in os.scandir(directory) if entry.is_dir(follow_symlinks=False))
+            self.db.execute("UPDATE dirs SET mtime = ?, subdirs = ? WHERE path = ?", (mtime, "\n".join(subdirs), directory))
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = getattr(os, "O_NONBLOCK", 0)
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def load_inotify():
+    # libc with inotify, or None where it is not available
+    if not hasattr(os, "O_NONBLOCK"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class LibraryWatcher:
+    # Applies file additions and removals under the indexed roots as they
+    # happen, using inotify. Changes are batched and reported through
+    # on_change(added_paths, removed_paths) from the watcher thread.
+    def __init__(self, index, roots, on_change, settle=0.5):
+        self.libc = load_inotify()
+        if self.libc is None:
+            raise OSError("inotify is not available on this platform")
+        self.index = index
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.on_change = on_change
+        self.settle = settle
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        self.stopped = threading.Event()
+        for root in self.roots:
+            self.watch_tree(root)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def watch(self, directory, root):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            print(f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+            return
+        self.watches[wd] = (directory, root)
+
+    def watch_tree(self, root, top=None):
+        # Watch the indexed directories of `root`, or only those at and below
+        # `top`, that are not watched yet
+        watched = {directory for directory, _ in self.watches.values()}
+        for directory in self.index.directories(root):
+            if directory in watched:
+                continue
+            if top is None or directory == top or directory.startswith(top + os.sep):
+                self.watch(directory, root)
+
+    def run(self):
+        # One failing event or flush is reported and skipped, the thread
+        # keeps watching
+        added = set()
+        removed = set()
+        rescan = False
+        last_event = None
+        while not self.stopped.is_set():
+            ready, _, _ = select.select([self.fd], [], [], 0.2)
+            if ready:
+                try:
+                    data = os.read(self.fd, 65536)
+                except BlockingIOError:
+                    data = b""
+                offset = 0
+                while offset + EVENT_HEADER.size <= len(data):
+                    wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                    name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                    offset += EVENT_HEADER.size + length
+                    if mask & IN_Q_OVERFLOW:
+                        rescan = True
+                        continue
+                    if mask & IN_IGNORED:
+                        self.watches.pop(wd, None)
+                        continue
+                    if wd not in self.watches or not name:
+                        continue
+                    directory, root = self.watches[wd]
+                    path = os.path.join(directory, os.fsdecode(name))
+                    try:
+                        self.handle(path, root, mask, added, removed)
+                    except Exception as e:
+                        print(f"Library watch error: {e}")
+                last_event = time.monotonic()
+            if last_event is not None and time.monotonic() - last_event >= self.settle:
+                try:
+                    if rescan:
+                        rescan = False
+                        added, removed = self.rescan(added, removed)
+                    if added or removed:
+                        self.on_change(sorted(added - removed), sorted(removed - added))
+                except Exception as e:
+                    print(f"Library watch error: {e}")
+                added = set()
+                removed = set()
+                last_event = None
+
+    def rescan(self, added, removed):
+        # The kernel dropped events: fall back to an mtime rescan, and watch
+        # directories created meanwhile
+        before = set()
+        after = set()
+        for root in self.roots:
+            before.update(self.index.tracks(root))
+            self.index.scan(root)
+            self.watch_tree(root)
+            after.update(self.index.tracks(root))
+        return (added | (after - before)) - (before - after), removed | (before - after)
+
+    def handle(self, path, root, mask, added, removed):
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self.index.scan(root)
+                self.watch_tree(root, path)
+                added.update(track for track in self.index.tracks(root)
+                             if track.startswith(path + os.sep))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                removed.update(self.index.remove_tree(path))
+            return
+        if not is_audio_name(path):
+            return
+        if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            if self.index.add_track(path, root):
+                added.add(path)
+                removed.discard(path)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            if self.index.remove_track(path):
+                removed.add(path)
+                added.discard(path)
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join(timeout=1.0)
+        os.close(self.fd)
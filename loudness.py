@@ -0,0 +1,275 @@
+import collections
+import math
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from storage import data_path, file_identity
+
+# Tracks are normalised to this integrated loudness (LUFS), as most
+# streaming services do
+TARGET = -14.0
+# Boosts are limited so the sample peak stays below this (dBFS)
+PEAK_CEILING = -1.0
+MAX_BOOST = 12.0
+
+# BS.1770 blocks: 400 ms, starting every 100 ms
+HOP = 0.1
+GATE_ABSOLUTE = -70.0
+GATE_RELATIVE = -10.0
+# Samples per FFT when weighting, about 6 s at 44.1 kHz
+CHUNK = 1 << 18
+
+
+def biquad_response(b, a, freqs, rate):
+    # |H|^2 of a biquad at `freqs` Hz
+    z = np.exp(-2j * np.pi * freqs / rate)
+    h = (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    return np.abs(h) ** 2
+
+
+def k_weighting(freqs, rate):
+    # Power response of the BS.1770 K filter at any sample rate: a +4 dB
+    # high shelf from about 1.7 kHz and a high-pass at 38 Hz, designed the
+    # way libebur128 does it
+    k = math.tan(math.pi * 1681.974450955533 / rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    shelf = biquad_response((vh + vb * k / q + k * k, 2 * (k * k - vh), vh - vb * k / q + k * k),
+                            (1 + k / q + k * k, 2 * (k * k - 1), 1 - k / q + k * k), freqs, rate)
+    k = math.tan(math.pi * 38.13547087602444 / rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    highpass = biquad_response((1, -2, 1), (1, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0), freqs, rate)
+    return shelf * highpass
+
+
+def measure(samples, rate):
+    # (integrated loudness in LUFS, sample peak in dBFS) of int16 or float
+    # samples shaped (frames, channels). The K filter is applied per chunk
+    # in the frequency domain; its phase does not matter for loudness.
+    samples = np.asarray(samples)
+    scale = 1 / 32768 if samples.dtype == np.int16 else 1.0
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    peak = float(np.abs(samples).max()) * scale if len(samples) else 0.0
+    hop = int(rate * HOP)
+    hops = len(samples) // hop
+    if hops < 4:
+        return None, peak_db(peak)
+    weights = np.sqrt(k_weighting(np.fft.rfftfreq(CHUNK, 1 / rate), rate))
+    powers = np.zeros(hops)
+    # Whole hops per chunk, zero-padded to the FFT size
+    step = CHUNK // hop * hop
+    for start in range(0, hops * hop, step):
+        stop = min(start + step, hops * hop)
+        for channel in range(samples.shape[1]):
+            block = samples[start:stop, channel].astype(np.float64) * scale
+            weighted = np.fft.irfft(np.fft.rfft(block, CHUNK) * weights, CHUNK)[:stop - start]
+            powers[start // hop:stop // hop] += (weighted.reshape(-1, hop) ** 2).mean(axis=1)
+    # 400 ms blocks overlapping by 75%
+    blocks = np.convolve(powers, np.full(4, 0.25), mode="valid")
+    blocks = blocks[blocks > 0]
+    loudness = -0.691 + 10 * np.log10(blocks) if len(blocks) else blocks
+    gated = blocks[loudness > GATE_ABSOLUTE]
+    if not len(gated):
+        return None, peak_db(peak)
+    relative = -0.691 + 10 * math.log10(gated.mean()) + GATE_RELATIVE
+    gated = gated[-0.691 + 10 * np.log10(gated) > relative]
+    return -0.691 + 10 * math.log10(gated.mean()), peak_db(peak)
+
+
+def peak_db(peak):
+    return 20 * math.log10(peak) if peak > 0 else None
+
+
+def gain_for(loudness, peak):
+    # Linear gain that brings a track to TARGET without clipping
+    if loudness is None:
+        return 1.0
+    gain = TARGET - loudness
+    if peak is not None:
+        gain = min(gain, PEAK_CEILING - peak)
+    return 10 ** (min(gain, MAX_BOOST) / 20)
+
+
+def analyse(path):
+    # Runs in a pool process: decode with pygame and measure
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    if pygame.mixer.get_init() is None:
+        pygame.mixer.init(frequency=44100, size=-16, channels=2)
+    rate = pygame.mixer.get_init()[0]
+    sound = pygame.mixer.Sound(path)
+    return measure(pygame.sndarray.samples(sound), rate)
+
+
+def lower_priority():
+    # Pool processes stay out of the way of playback and the GUI
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+class LoudnessService:
+    # Integrated loudness and peak of every track, measured once in a pool
+    # of processes and kept in an SQLite cache checked against size and
+    # mtime. gain() only reads `gains`, a dictionary filled from the cache
+    # by load() and by finished analyses, so loading a track never waits on
+    # the disk or an analysis. Cache checks run on one background thread;
+    # tracks asked for by gain() jump the analysis queue.
+    def __init__(self, path=None, workers=None):
+        self.db = sqlite3.connect(path or data_path("loudness.db"), check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS tracks (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, "
+                        "loudness REAL, peak REAL)")
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.lock = threading.Lock()
+        self.rows = None
+        self.gains = {}
+        self.asked = set()
+        self.queue = collections.deque()
+        self.queued = set()
+        self.inflight = 0
+        self.pending = []
+        self.background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="loudness")
+        self.executor = None
+        self.closed = False
+
+    def load(self):
+        # Whole table in memory, read once, with the gains of every entry
+        with self.lock:
+            if self.rows is None:
+                self.rows = {row[0]: row[1:] for row in self.db.execute("SELECT * FROM tracks")}
+                for path, (size, mtime, loudness, peak) in self.rows.items():
+                    self.gains.setdefault(path, gain_for(loudness, peak))
+            return self.rows
+
+    def gain(self, path):
+        # Linear normalisation gain for `path`, None until it is analysed
+        gain = self.gains.get(path)
+        if gain is None:
+            with self.lock:
+                if not self.closed and path not in self.asked:
+                    self.asked.add(path)
+                    self.background.submit(self._scan, [path], True)
+        return gain
+
+    def scan(self, paths):
+        # Analyse whatever is missing from the cache, in the background
+        with self.lock:
+            if not self.closed:
+                self.background.submit(self._scan, list(paths))
+
+    def _scan(self, paths, urgent=False):
+        # Background thread: drop gains of files changed since they were
+        # measured and analyse those along with the unknown ones
+        if self.closed:
+            return
+        rows = self.load()
+        missing = []
+        for path in paths:
+            entry = rows.get(path)
+            try:
+                if entry is not None and file_identity(path) == (entry[0], entry[1]):
+                    continue
+            except OSError:
+                continue
+            self.gains.pop(path, None)
+            missing.append(path)
+        self.request(missing, urgent)
+
+    def request(self, paths, urgent=False):
+        with self.lock:
+            if self.closed:
+                return
+            for path in paths:
+                if path in self.queued:
+                    if not urgent:
+                        continue
+                    try:
+                        self.queue.remove(path)
+                    except ValueError:
+                        continue
+                self.queued.add(path)
+                if urgent:
+                    self.queue.appendleft(path)
+                else:
+                    self.queue.append(path)
+            self._pump()
+
+    def _pump(self):
+        # Keep a few analyses in flight, lock held
+        if self.executor is None and self.queue:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=lower_priority,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        while self.queue and self.inflight < self.workers * 2:
+            path = self.queue.popleft()
+            try:
+                identity = file_identity(path)
+            except OSError:
+                self.queued.discard(path)
+                continue
+            try:
+                future = self.executor.submit(analyse, path)
+            except Exception as e:
+                # The pool cannot start or has broken: no normalisation
+                # for the rest of this session rather than retrying
+                print(f"Loudness error: {e}")
+                self.closed = True
+                self.queue.clear()
+                self.queued.clear()
+                return
+            self.inflight += 1
+            future.add_done_callback(lambda done, path=path, identity=identity: self._done(path, identity, done))
+
+    def _done(self, path, identity, future):
+        try:
+            loudness, peak = future.result()
+        except Exception as e:
+            # Unreadable files are remembered too, so they are not retried.
+            # Workers terminated by shutdown() are not errors.
+            if not future.cancelled() and not self.closed:
+                print(f"Loudness error: {e}")
+            loudness = peak = None
+        with self.lock:
+            self.inflight -= 1
+            self.queued.discard(path)
+            if self.closed:
+                return
+            if self.rows is not None:
+                self.rows[path] = (identity[0], identity[1], loudness, peak)
+            self.gains[path] = gain_for(loudness, peak)
+            self.pending.append((path, identity[0], identity[1], loudness, peak))
+            if len(self.pending) >= 50 or (not self.queue and not self.inflight):
+                self._flush()
+            self._pump()
+
+    def _flush(self):
+        if self.pending:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?)", self.pending)
+            self.pending = []
+
+    def shutdown(self):
+        # Pool processes are terminated, not waited for: an analysis of a
+        # long file must not hold up exit
+        with self.lock:
+            self.closed = True
+            self.queue.clear()
+            executor = self.executor
+        self.background.shutdown(wait=False, cancel_futures=True)
+        if executor is not None:
+            processes = list((executor._processes or {}).values())
+            executor.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in processes:
+                process.join(1.0)
+        with self.lock:
+            self._flush()
+            self.db.close()
@@ -0,0 +1,258 @@
+import collections
+import importlib
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from storage import data_path, file_identity
+
+FIELDS = ["duration", "bitrate", "sample_rate", "title", "artist", "album"]
+
+# (module, class) per extension, imported the first time a file of that
+# format is read so startup does not pay for every mutagen format
+PARSERS = {
+    '.mp3': ("mutagen.mp3", "EasyMP3"),
+    '.wav': ("mutagen.wave", "WAVE"),
+    '.flac': ("mutagen.flac", "FLAC"),
+    '.m4a': ("mutagen.easymp4", "EasyMP4"),
+    '.ogg': ("mutagen.oggvorbis", "OggVorbis")
+}
+
+# ID3 frame names for formats without an "easy" tag interface
+ID3_KEYS = {"title": "TIT2", "artist": "TPE1", "album": "TALB"}
+
+
+def first_tag(tags, key):
+    if not tags:
+        return None
+    try:
+        value = tags.get(key)
+        if value is None and key in ID3_KEYS:
+            value = tags.get(ID3_KEYS[key])
+    except (KeyError, ValueError):
+        return None
+    if value is None:
+        return None
+    if hasattr(value, "text"):
+        value = value.text
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    return str(value) if value is not None else None
+
+
+def parser_for(path):
+    # Mutagen class for the file's extension, or None for unknown formats
+    entry = PARSERS.get(os.path.splitext(path)[1].lower())
+    if entry is None:
+        return None
+    module, name = entry
+    return getattr(importlib.import_module(module), name)
+
+
+def read_metadata(path):
+    # Read duration, stream info and common tags from one file
+    parser = parser_for(path)
+    info = dict.fromkeys(FIELDS)
+    info["duration"] = 0
+    if parser is None:
+        return info
+    audio = parser(path)
+    info["duration"] = audio.info.length or 0
+    info["bitrate"] = getattr(audio.info, "bitrate", None)
+    info["sample_rate"] = getattr(audio.info, "sample_rate", None)
+    for key in ("title", "artist", "album"):
+        info[key] = first_tag(audio.tags, key)
+    return info
+
+
+class MetadataCache:
+    # On-disk metadata keyed by path and checked against size and mtime
+    def __init__(self, path=None):
+        self.db = sqlite3.connect(path or data_path("metadata.db"), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS tracks (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, "
+            "duration REAL, bitrate INTEGER, sample_rate INTEGER, title TEXT, artist TEXT, album TEXT)"
+        )
+        self.lock = threading.Lock()
+        self.rows = None
+        self.pending = []
+
+    def load(self):
+        # Whole table in memory, read once
+        with self.lock:
+            if self.rows is None:
+                self.rows = {}
+                for row in self.db.execute("SELECT * FROM tracks"):
+                    self.rows[row[0]] = (row[1], row[2], dict(zip(FIELDS, row[3:])))
+            return self.rows
+
+    def get(self, path, identity):
+        entry = self.load().get(path)
+        if entry and (entry[0], entry[1]) == identity:
+            return entry[2]
+        return None
+
+    def store(self, path, identity, info):
+        with self.lock:
+            if self.rows is not None:
+                self.rows[path] = (identity[0], identity[1], info)
+            self.pending.append((path, identity[0], identity[1]) + tuple(info[key] for key in FIELDS))
+            if len(self.pending) >= 200:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self.db.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self.pending)
+            self.db.commit()
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+class MetadataService:
+    # Scans playlists in the background; finished entries are collected
+    # with drain() on the Tk thread. Cache checks run on one lookup thread,
+    # in order, except that request() puts its track at the front; files
+    # missing from the cache are read by the executor.
+    def __init__(self, cache=None, workers=4):
+        self.cache = cache or MetadataCache()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metadata")
+        self.results = queue.Queue()
+        self.known = {}
+        self.requested = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.lookups = collections.deque()
+        self.worker = None
+        self.outstanding = 0
+        self.closed = False
+
+    def scan(self, paths):
+        # Validate the cache and read missing files without blocking the caller
+        paths = list(paths)
+        with self.lock:
+            if self.closed or not paths:
+                return
+            self.outstanding += len(paths)
+            self.lookups.extend((path, False) for path in paths)
+            self._wake()
+
+    def _wake(self):
+        # Lock held: start the lookup thread once, then just signal it
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._work, name="metadata-lookup", daemon=True)
+            self.worker.start()
+        self.wakeup.notify()
+
+    def _work(self):
+        while True:
+            with self.lock:
+                while not self.lookups and not self.closed:
+                    self.wakeup.wait()
+                if self.closed:
+                    return
+                path, inline = self.lookups.popleft()
+            try:
+                self._lookup(path, inline)
+            except Exception as e:
+                print(f"Error reading metadata: {e}")
+            finally:
+                self._done()
+
+    def _lookup(self, path, inline=False):
+        with self.lock:
+            if path in self.known or (path in self.requested and not inline):
+                return
+            self.requested.add(path)
+        try:
+            identity = file_identity(path)
+        except OSError:
+            self._publish(path, None)
+            return
+        info = self.cache.get(path, identity)
+        if info is not None:
+            self._publish(path, info)
+            return
+        if inline:
+            with self.lock:
+                self.outstanding += 1
+            self._read(path, identity)
+            return
+        with self.lock:
+            if self.closed:
+                return
+            self.outstanding += 1
+            self.executor.submit(self._read, path, identity)
+
+    def _read(self, path, identity):
+        try:
+            info = read_metadata(path)
+            self.cache.store(path, identity, info)
+        except Exception as e:
+            print(f"Error reading metadata: {e}")
+            info = None
+        self._publish(path, info)
+        self._done()
+
+    def _publish(self, path, info):
+        with self.lock:
+            self.requested.discard(path)
+            if info is not None:
+                self.known[path] = info
+        self.results.put((path, info))
+
+    def _done(self):
+        with self.lock:
+            self.outstanding -= 1
+            finished = self.outstanding == 0
+        if finished:
+            self.cache.flush()
+
+    def request(self, path):
+        # Returns the metadata of `path` if known, otherwise has the lookup
+        # thread read it ahead of any playlist scan still in progress
+        info = self.get(path)
+        if info is None:
+            with self.lock:
+                if not self.closed:
+                    self.outstanding += 1
+                    self.lookups.appendleft((path, True))
+                    self._wake()
+        return info
+
+    def get(self, path):
+        with self.lock:
+            return self.known.get(path)
+
+    def busy(self):
+        with self.lock:
+            return self.outstanding > 0 or not self.results.empty()
+
+    def drain(self, limit=500):
+        # Finished (path, info) pairs, info is None for unreadable files
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def shutdown(self):
+        # Nothing is queued or submitted once closed is set
+        with self.lock:
+            self.closed = True
+            self.lookups.clear()
+            self.wakeup.notify()
+            worker = self.worker
+        if worker is not None:
+            worker.join()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.cache.close()
@@ -0,0 +1,94 @@
+import collections
+import threading
+import time
+
+
+class LatestQueue:
+    # Bounded hand-off queue between pipeline stages, newest item wins
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.items = collections.deque()
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        # Add an item, dropping the oldest one if the queue is full
+        with self.cond:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        # Take the oldest queued item, or None on timeout / close
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            if self.items:
+                return self.items.popleft()
+            return None
+
+    def close(self):
+        # Wake up any waiting consumer
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class StageStats:
+    # Per-stage throughput and busy time for the gesture pipeline
+    def __init__(self, stages, interval=5.0):
+        self.stages = list(stages)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.counts = {stage: 0 for stage in self.stages}
+        self.busy = {stage: 0.0 for stage in self.stages}
+        self.latency_total = 0.0
+        self.latency_count = 0
+
+    def record(self, stage, start):
+        # Record one item finished by a stage that began work at `start`
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.counts[stage] += 1
+            self.busy[stage] += elapsed
+
+    def record_latency(self, captured):
+        # Record capture-to-display latency of a frame
+        with self.lock:
+            self.latency_total += time.perf_counter() - captured
+            self.latency_count += 1
+
+    def due(self):
+        return time.perf_counter() - self.started >= self.interval
+
+    def snapshot(self):
+        # Throughput (fps) and average time per item (ms) for each stage
+        with self.lock:
+            window = max(time.perf_counter() - self.started, 1e-6)
+            stats = {}
+            for stage in self.stages:
+                count = self.counts[stage]
+                stats[stage] = {
+                    'fps': count / window,
+                    'ms': (self.busy[stage] / count * 1000.0) if count else 0.0
+                }
+            latency = (self.latency_total / self.latency_count * 1000.0) if self.latency_count else 0.0
+            return stats, latency
+
+    def summary(self, dropped=None):
+        # Human readable report, resets the measurement window
+        stats, latency = self.snapshot()
+        parts = [f"{stage} {s['fps']:.1f} fps ({s['ms']:.1f} ms)" for stage, s in stats.items()]
+        text = "Pipeline: " + ", ".join(parts) + f", latency {latency:.0f} ms"
+        if dropped:
+            text += ", dropped " + ", ".join(f"{name} {count}" for name, count in dropped.items())
+        with self.lock:
+            self.reset()
+        return text
@@ -1,20 +1,58 @@
 # Import
-import pygame
 import os
-import random
+import threading
+from shuffle import ShuffleEngine
 from pathlib import Path
+from loudness import LoudnessService
+from preload import TrackPreloader
+from seekindex import OffsetFile, SeekIndexService
+
+AUDIO_EXTENSIONS = frozenset(['.mp3', '.wav', '.ogg', '.m4a'])
+
+# pygame is imported and the mixer opened on first use (see init_mixer):
+# together they take about 200 ms that would otherwise come before the
+# window first appears
+pygame = None
+mixer_lock = threading.Lock()
+
+
+def init_mixer():
+    # Import pygame and open the audio device, once
+    global pygame
+    with mixer_lock:
+        if pygame is None:
+            import pygame as module
+            module.mixer.init()
+            pygame = module
+    return pygame
 
 # Music Player class 
 class MusicPlayer:
     def __init__(self):
         # Class definition
-        pygame.mixer.init() 
         self.playlist = [] 
         self.current_track_index = 0 
         self.volume = 0.5   
         self.is_playing = False
         self.is_paused = False 
         self.music_file = None
+        self.loop_mode = "Off"
+        self.shuffle_mode = False
+        self.shuffle = None
+        self.shuffle_seed = None
+        self.queued_index = None
+        self.stop_after_current = False
+        self.last_pos = 0
+        self.start_offset = 0.0
+        self.preloader = TrackPreloader()
+        self.seek_index = SeekIndexService()
+        # (track, open file) shared by every seek within one track
+        self.seek_file = None
+        # Loudness normalisation: `gain` is the current track's offset,
+        # applied on top of the user's volume
+        self.loudness = LoudnessService()
+        self.normalize = True
+        self.gain = 1.0
 
     def load_playlist(self, file_paths):
         # Load multiple files as a playlist
@@ -23,42 +61,265 @@ class MusicPlayer:
 
         self.playlist = [str(path) for path in file_paths if self.is_audio_file(path)] 
         self.current_track_index = 0 
+        self.reset_shuffle()
         if self.playlist: 
             return self.load_track(self.current_track_index)  
         return False
     
+    def restore(self, file_paths, index, position=0.0, loop_mode="Off", shuffle_mode=False, shuffle_state=None):
+        # Reopen a saved session paused at `position`. The paths were checked
+        # when they were first loaded, and the shuffle order carries on
+        # from where it was.
+        self.playlist = list(file_paths)
+        self.current_track_index = index
+        self.loop_mode = loop_mode
+        self.shuffle_mode = shuffle_mode
+        if shuffle_mode and shuffle_state and shuffle_state["size"] == len(self.playlist):
+            self.shuffle = ShuffleEngine.from_state(shuffle_state)
+            self.shuffle_seed = self.shuffle.seed
+        else:
+            self.reset_shuffle()
+        if not self.load_track(index):
+            return False
+        if position > 0:
+            self.is_paused = True
+            self.seek(position)
+        return True
+
+    def shuffle_state(self):
+        # Current shuffle order for a saved session, None when shuffle is off
+        return self.shuffle.state() if self.shuffle is not None else None
+
+    def add_tracks(self, file_paths):
+        # Append tracks without interrupting playback
+        added = [str(path) for path in file_paths if self.is_audio_file(path)]
+        self.playlist.extend(added)
+        if self.shuffle is not None and added:
+            self.shuffle.extend(len(added))
+        if added:
+            self.prepare_next()
+        return added
+
+    def remove_tracks(self, file_paths):
+        # Drop tracks, keeping the current and queued ones if they survive
+        gone = set(file_paths)
+        queued = self.playlist[self.queued_index] if self.queued_index is not None else None
+        self.playlist = [path for path in self.playlist if path not in gone]
+        position = {path: index for index, path in enumerate(self.playlist)}
+        self.current_track_index = position.get(self.music_file, min(self.current_track_index, max(len(self.playlist) - 1, 0)))
+        self.queued_index = position.get(queued)
+        self.reset_shuffle()
+        if self.playlist:
+            self.prepare_next()
+
+    def init_mixer(self):
+        # Open the audio device ahead of the first track, e.g. right after
+        # the window is shown
+        init_mixer()
+
+    def mixer_ready(self):
+        return pygame is not None
+
     def load_track(self, index):
         if 0 <= index < len(self.playlist):
+            init_mixer()
             self.current_track_index = index
             track = self.playlist[self.current_track_index]
             try:
-                pygame.mixer.music.load(track)
-                pygame.mixer.music.set_volume(self.volume)
+                self.mixer_load(track)
+                self.gain = self.track_gain(track)
+                pygame.mixer.music.set_volume(self.output_volume())
                 self.music_file = track
+                self.queued_index = None
+                self.last_pos = 0
+                self.start_offset = 0.0
+                self.seek_index.request(track)
+                self.prepare_next()
                 return True 
             except pygame.error as e:
                 print(f"Error loading track: {e}")
         return False
 
+    def mixer_load(self, track):
+        # Load from the preloaded copy in memory when there is one
+        source, namehint = self.preloader.source(track)
+        if namehint:
+            pygame.mixer.music.load(source, namehint)
+        else:
+            pygame.mixer.music.load(source)
+
+    def skip_target(self):
+        # Track a manual skip forward goes to
+        if not self.playlist:
+            return None
+        if self.shuffle is not None:
+            return self.shuffle.peek()
+        return (self.current_track_index + 1) % len(self.playlist)
+
+    def end_target(self):
+        # Track that follows when the current one ends, or None to stop
+        if not self.playlist:
+            return None
+        if self.loop_mode == "One":
+            return self.current_track_index
+        if not self.shuffle_mode and self.loop_mode == "Off" and self.current_track_index >= len(self.playlist) - 1:
+            return None
+        return self.skip_target()
+
+    def reset_shuffle(self):
+        # Fresh shuffle order over the playlist, starting from the current track
+        if self.shuffle_mode and self.playlist:
+            self.shuffle = ShuffleEngine(len(self.playlist), start=self.current_track_index, seed=self.shuffle_seed)
+        else:
+            self.shuffle = None
+
+    def prepare_next(self):
+        # Read the predicted next tracks ahead and queue the one that follows on end
+        for index in {self.end_target(), self.skip_target()}:
+            if index is not None:
+                self.preloader.request(self.playlist[index])
+                if self.normalize:
+                    self.loudness.gain(self.playlist[index])
+        if self.is_playing and pygame.mixer.music.get_busy():
+            self.queue_next()
+
+    def queue_next(self):
+        # Queue the predicted track behind the current one for a gapless transition
+        target = self.end_target()
+        if target is None:
+            self.stop_after_current = self.queued_index is not None
+            return
+        try:
+            source, namehint = self.preloader.source(self.playlist[target])
+            if namehint:
+                pygame.mixer.music.queue(source, namehint)
+            else:
+                pygame.mixer.music.queue(source)
+            self.queued_index = target
+            self.stop_after_current = False
+        except pygame.error as e:
+            print(f"Error queueing track: {e}")
+            self.queued_index = None
+
+    def check_transition(self):
+        # Detect the mixer moving on to the queued track, True if it did
+        if self.queued_index is None or not self.is_playing:
+            return False
+        pos = pygame.mixer.music.get_pos()
+        advanced = 0 <= pos < self.last_pos
+        self.last_pos = pos
+        if not advanced:
+            return False
+        index = self.queued_index
+        self.queued_index = None
+        if self.stop_after_current:
+            self.stop()
+            return False
+        if self.shuffle is not None and index == self.shuffle.peek():
+            self.shuffle.next()
+        self.current_track_index = index
+        self.music_file = self.playlist[index]
+        self.start_offset = 0.0
+        self.seek_index.request(self.music_file)
+        # pygame has no per-track gain, so the queued track's offset is
+        # applied once its start has been noticed
+        self.gain = self.track_gain(self.music_file)
+        pygame.mixer.music.set_volume(self.output_volume())
+        self.prepare_next()
+        return True
+
+    def poll(self):
+        # Playback events reported by the mixer since the last call:
+        # 'advanced' when a queued track took over, 'ended' when playback ran out
+        if not self.is_playing:
+            return []
+        if self.check_transition():
+            return ["advanced"]
+        if not pygame.mixer.music.get_busy():
+            self.is_playing = False
+            self.is_paused = False
+            self.queued_index = None
+            return ["ended"]
+        return []
+
+    def set_loop_mode(self, mode):
+        self.loop_mode = mode
+        self.prepare_next()
+
+    def set_shuffle_mode(self, enabled, seed=None):
+        self.shuffle_mode = enabled
+        if seed is not None:
+            self.shuffle_seed = seed
+        self.reset_shuffle()
+        self.prepare_next()
+
 
     def load(self, file_path):
         return self.load_playlist(file_path)
     
     def seek(self, seconds):
-        if self.playlist:
-            pygame.mixer.music.play(start=seconds)
+        # Jump to `seconds` and return the position actually reached. MP3s
+        # with a frame table restart the decoder at that frame's byte offset.
+        if not self.playlist or not self.music_file:
+            return None
+        index = self.seek_index.get(self.music_file)
+        try:
+            if index is not None:
+                offset, seconds = index.locate(seconds)
+                # The previous view may read the same file, stop it first
+                pygame.mixer.music.unload()
+                source = self.seek_source(self.music_file)
+                pygame.mixer.music.load(OffsetFile(source, offset, close_source=False), "mp3")
+                pygame.mixer.music.set_volume(self.output_volume())
+                pygame.mixer.music.play()
+            else:
+                pygame.mixer.music.play(start=seconds)
+        except (pygame.error, OSError) as e:
+            print(f"Error seeking: {e}")
+            return None
+        self.last_pos = 0
+        self.start_offset = seconds
+        self.queued_index = None
+        if self.is_paused:
+            pygame.mixer.music.pause()
+        elif self.is_playing:
+            self.queue_next()
+        return seconds
     
+    def seek_source(self, track):
+        # Open file, or preloaded copy, of `track`; the one of the previous
+        # track is closed
+        if self.seek_file is None or self.seek_file[0] != track:
+            self.close_seek_source()
+            source, namehint = self.preloader.source(track)
+            if namehint is None:
+                source = open(track, "rb")
+            self.seek_file = (track, source)
+        return self.seek_file[1]
+
+    def close_seek_source(self):
+        if self.seek_file is not None:
+            self.seek_file[1].close()
+            self.seek_file = None
+
     def play(self):
         if self.playlist:
+            init_mixer()
             if not pygame.mixer.music.get_busy() or self.is_paused:
                 track_path = self.playlist[self.current_track_index]
-                if self.music_file != track_path:
-                    pygame.mixer.music.load(track_path)
+                if self.music_file != track_path or self.start_offset:
+                    # Also reload after a seek left a stream cut at an offset
+                    self.mixer_load(track_path)
                     self.music_file = track_path
-                pygame.mixer.music.set_volume(self.volume)
+                pygame.mixer.music.set_volume(self.output_volume())
                 pygame.mixer.music.play()
+                self.last_pos = 0
+                self.start_offset = 0.0
+                self.queued_index = None
             self.is_playing = True
             self.is_paused = False
+            if self.queued_index is None:
+                self.queue_next()
 
 
     def pause(self):
@@ -79,45 +340,88 @@ class MusicPlayer:
     
     def stop(self):
         # Stop playback
-        pygame.mixer.music.stop() 
+        if self.mixer_ready():
+            pygame.mixer.music.stop() 
         self.is_paused = False
         self.is_playing = False
 
     def next_track(self):
         # Play the next track in the playlist
-        if not self.playlist: 
-            return False
-        self.current_track_index = (self.current_track_index + 1) % len(self.playlist) 
-        if self.load_track(self.current_track_index): 
-            self.play()
-            return True
-        return False
+        return self.skip(1)
 
     def previous_track(self):
         # Play the previous track in the playlist
-        if not self.playlist: 
+        return self.skip(-1)
+
+    def skip(self, steps):
+        # Jump `steps` tracks forward (or back when negative) with a single load
+        if not self.playlist or steps == 0:
             return False
-        self.current_track_index = (self.current_track_index - 1 + len(self.playlist)) % len(self.playlist) 
-        if self.load_track(self.current_track_index): 
+        return self.jump(self.step(steps))
+
+    def step(self, steps, index=None):
+        # Index `steps` tracks away from `index` (default: the current track)
+        # without loading anything. Shuffle order moves along with it.
+        if index is None:
+            index = self.current_track_index
+        for _ in range(abs(steps)):
+            if self.shuffle is not None:
+                target = self.shuffle.next() if steps > 0 else self.shuffle.previous()
+                if target is not None:
+                    index = target
+                    continue
+            index = (index + (1 if steps > 0 else -1)) % len(self.playlist)
+            if self.shuffle is not None:
+                self.shuffle.select(index)
+        return index
+
+    def jump(self, index):
+        # Load and play a track the shuffle order already points at
+        if self.load_track(index): 
             self.play()
             return True
         return False
 
+    def select_track(self, index):
+        # Play a track the user picked from the playlist
+        if self.shuffle is not None:
+            self.shuffle.select(index)
+        return self.jump(index)
+
     def set_volume(self, volume):
         # Set volume to a value
         self.volume = max(0.0, min(volume, 1.0)) 
-        pygame.mixer.music.set_volume(self.volume) 
+        if self.mixer_ready():
+            pygame.mixer.music.set_volume(self.output_volume()) 
+
+    def track_gain(self, track):
+        # Linear gain bringing `track` to the loudness target, 1.0 until it
+        # has been analysed (which gain() starts in the background)
+        if not self.normalize:
+            return 1.0
+        gain = self.loudness.gain(track)
+        return 1.0 if gain is None else gain
+
+    def output_volume(self):
+        # pygame cannot amplify, quiet tracks are boosted up to full volume only
+        return min(self.volume * self.gain, 1.0)
 
     def get_volume(self):
         # Get current volume
         return self.volume
 
     def get_position(self):
-        return pygame.mixer.music.get_pos() / 1000.0 
+        # Position in the current track, counted from the samples the mixer has played
+        if not self.mixer_ready():
+            return self.start_offset
+        pos = pygame.mixer.music.get_pos()
+        if pos < 0:
+            return self.start_offset if self.is_paused else 0.0
+        return self.start_offset + pos / 1000.0
 
     def is_audio_file(self, path):
         # Check if file is an audio file
-        return Path(path).suffix.lower() in ['.mp3', '.wav', '.ogg', '.m4a'] 
+        return os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS
 
     def get_current_track_info(self):
         # Get information about current track
@@ -134,7 +438,13 @@ class MusicPlayer:
     def cleanup(self):
         # Cleanup up resources used by the music player
         try:
-            pygame.mixer.music.stop()
-            pygame.mixer.quit()
+            self.preloader.shutdown()
+            self.seek_index.shutdown()
+            self.loudness.shutdown()
+            if self.mixer_ready():
+                pygame.mixer.music.stop()
+                pygame.mixer.quit()
+            # Only once the mixer no longer reads from it
+            self.close_seek_source()
         except Exception as e:
             print(f"Cleanup error: {e}")
\ No newline at end of file
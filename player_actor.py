@@ -0,0 +1,248 @@
+import collections
+import threading
+import time
+from telemetry import telemetry
+
+# Commands where only the last one of a run matters
+LAST_WINS = {"set_volume", "seek", "select", "poll"}
+# Commands whose values add up
+ADDITIVE = {"volume", "skip"}
+# Play and pause cancel each other out within a run
+TRANSPORT = {"play", "pause"}
+# Commands that leave a pending skip alone
+BROWSE_SAFE = {"skip", "volume", "set_volume", "poll"}
+# Commands that do not touch the mixer, left out of its timings
+NO_MIXER = {"poll", "call", "skip"}
+# Volume changes do not depend on anything but arbitrary calls, so they
+# merge across other commands
+VOLUME = {"volume", "set_volume"}
+
+# Gesture events as (actor command, argument, status message)
+GESTURE_COMMANDS = {
+    "play": ("play", None, "Gesture: Play"),
+    "pause": ("pause", None, "Gesture: Pause"),
+    "stop": ("stop", None, "Gesture: Stop"),
+    "next": ("skip", 1, "Gesture: Next Track"),
+    "previous": ("skip", -1, "Gesture: Previous Track"),
+}
+
+
+def send_gesture(actor, name, value, stamp=None, user=None):
+    # Forward one gesture event to the actor, returns the status message,
+    # or None when the arbiter turned it down. `stamp` is the time.time()
+    # the gesture was detected, for telemetry; `user` the camera that saw it.
+    if name == "volume":
+        command, argument = "volume", value
+        message = f"Gesture volume: {'up' if value > 0 else 'down'}"
+    else:
+        command, argument, message = GESTURE_COMMANDS[name]
+    if actor.send(command, argument, stamp, user) is False:
+        return None
+    return message
+
+
+def merge(previous, command):
+    # The single command equivalent to `previous` then `command`, or None
+    (last_name, last_value), (name, value) = previous, command
+    if name == last_name and name in ADDITIVE:
+        return name, last_value + value
+    if name == last_name and name in LAST_WINS:
+        return command
+    if name in TRANSPORT and last_name in TRANSPORT:
+        return command
+    if name == "set_volume" and last_name == "volume":
+        return command
+    if name == "volume" and last_name == "set_volume":
+        return last_name, last_value + value
+    return None
+
+
+def coalesce(commands):
+    # Merge redundant (name, value, stamp) commands so a burst costs one
+    # player call each. A merged command keeps the oldest stamp.
+    merged = []
+    for name, value, stamp in commands:
+        position = len(merged) - 1
+        if name in VOLUME:
+            # Look past unrelated commands for the last volume change
+            while position >= 0 and merged[position][0] not in VOLUME and merged[position][0] != "call":
+                position -= 1
+        combined = merge(merged[position][:2], (name, value)) if position >= 0 else None
+        if combined is None:
+            merged.append((name, value, stamp))
+        else:
+            stamps = [s for s in (merged[position][2], stamp) if s is not None]
+            merged[position] = combined + (min(stamps) if stamps else None,)
+    return [command for command in merged if not (command[0] in ADDITIVE and command[1] == 0)]
+
+
+class PlayerActor:
+    # Owns the MusicPlayer on a thread of its own. The Tk and gesture
+    # threads only send() commands, and everything queued since the last
+    # wake-up is coalesced and applied in one go. Results are reported with
+    # on_event(name, state) from the actor thread: 'advanced' and 'ended'
+    # from the mixer, then 'state' after every batch.
+    #
+    # Skips are debounced: they only move a target index (reported as the
+    # state's track right away, with pending_skip set) and the track is
+    # loaded once no further skip arrived for `settle` seconds, so browsing
+    # past tracks never decodes them. 'advance' moves on at once, for the
+    # end of a track.
+    def __init__(self, player, on_event, settle=0.25):
+        self.player = player
+        self.on_event = on_event
+        self.settle = settle
+        self.target = None
+        self.target_stamp = None
+        self.deadline = None
+        self.commands = collections.deque()
+        self.cond = threading.Condition()
+        self.stopped = False
+        # Set by sessions.GestureSession while several users share control
+        self.arbiter = None
+        self.handlers = {
+            "play": self.do_play,
+            "pause": self.do_pause,
+            "stop": lambda value: self.player.stop(),
+            "volume": lambda value: self.do_set_volume(self.player.get_volume() + value),
+            "set_volume": self.do_set_volume,
+            "skip": self.do_skip,
+            "advance": self.do_advance,
+            "select": self.player.select_track,
+            "seek": self.player.seek,
+            "poll": self.do_poll,
+            "call": lambda value: value[0](*value[1]),
+        }
+        self.thread = threading.Thread(target=self.run, name="player", daemon=True)
+        self.thread.start()
+
+    def send(self, name, value=None, stamp=None, user=None):
+        # Commands from a user (gestures) pass the arbiter first, if there
+        # is one; False when it turned the command down
+        if user is not None and self.arbiter is not None and not self.arbiter.admit(user, name):
+            return False
+        with self.cond:
+            self.commands.append((name, value, stamp))
+            self.cond.notify()
+        return True
+
+    def call(self, function, *args):
+        # Run any other player method on the actor thread, in order with the rest
+        self.send("call", (function, args))
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.commands and not self.stopped:
+                    if self.deadline is None:
+                        self.cond.wait()
+                    else:
+                        remaining = self.deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.cond.wait(remaining)
+                if self.stopped:
+                    return
+                batch = list(self.commands)
+                self.commands.clear()
+            events = []
+            if not batch:
+                # Navigation settled
+                self.flush_skip()
+            for name, value, stamp in coalesce(batch):
+                if self.target is not None and name not in BROWSE_SAFE:
+                    if name == "select":
+                        self.target = self.deadline = None
+                    else:
+                        self.flush_skip()
+                start = telemetry.now()
+                try:
+                    result = self.handlers[name](value)
+                except Exception as e:
+                    print(f"Player error: {e}")
+                    continue
+                if name == "skip":
+                    if stamp is not None and self.target_stamp is None:
+                        self.target_stamp = stamp
+                elif name not in NO_MIXER:
+                    telemetry.record("mixer", start)
+                    if stamp is not None:
+                        telemetry.observe("gesture_to_action", time.time() - stamp)
+                if name == "poll":
+                    events.extend(result)
+            for event in events:
+                self.on_event(event, self.state())
+            self.on_event("state", self.state())
+
+    def do_play(self, value):
+        if self.player.is_paused:
+            self.player.resume()
+        else:
+            self.player.play()
+
+    def do_skip(self, steps):
+        player = self.player
+        if not player.playlist or steps == 0:
+            return
+        self.target = player.step(steps, self.target)
+        self.deadline = time.monotonic() + self.settle
+
+    def do_advance(self, steps):
+        # The track ended: the next one starts without the skip debounce
+        player = self.player
+        if player.playlist and steps:
+            player.jump(player.step(steps))
+
+    def flush_skip(self):
+        # Load the track the user settled on
+        target, stamp = self.target, self.target_stamp
+        self.target = self.deadline = self.target_stamp = None
+        if target is not None:
+            start = telemetry.now()
+            self.player.jump(target)
+            telemetry.record("mixer", start)
+            if stamp is not None:
+                telemetry.observe("gesture_to_action", time.time() - stamp)
+
+    def do_pause(self, value):
+        self.player.pause()
+
+    def do_set_volume(self, volume):
+        volume = min(max(volume, 0.0), 1.0)
+        if volume != self.player.get_volume():
+            self.player.set_volume(volume)
+
+    def do_poll(self, value):
+        # The old track keeps playing while browsing, its events are stale
+        if self.target is not None:
+            return []
+        return self.player.poll()
+
+    def state(self):
+        # Snapshot for the UI, taken on the actor thread
+        player = self.player
+        if self.target is not None:
+            return {
+                "index": self.target,
+                "track": player.playlist[self.target],
+                "is_playing": True,
+                "is_paused": False,
+                "volume": player.get_volume(),
+                "position": 0.0,
+                "pending_skip": True,
+            }
+        return {
+            "index": player.current_track_index,
+            "track": player.music_file,
+            "is_playing": player.is_playing,
+            "is_paused": player.is_paused,
+            "volume": player.get_volume(),
+            "position": player.get_position(),
+            "pending_skip": False,
+        }
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        self.thread.join(timeout=1.0)
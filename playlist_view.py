@@ -0,0 +1,138 @@
+import tkinter as tk
+
+
+class PlaylistView(tk.Frame):
+    # Listbox lookalike that only holds the visible rows. Row text comes
+    # from row_text(index) on demand, so the playlist can be any length.
+    # Selecting a row fires <<ListboxSelect>> on the view.
+    def __init__(self, master, rows=10, **listbox_options):
+        bg = listbox_options.get("bg", "#1e1e1e")
+        super().__init__(master, bg=bg)
+        self.rows = rows
+        self.count = 0
+        self.top = 0
+        self.selected = None
+        self.row_text = lambda index: ""
+
+        self.listbox = tk.Listbox(self, height=rows, exportselection=False, activestyle="none", **listbox_options)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        self.listbox.bind("<<ListboxSelect>>", self.on_listbox_select)
+        self.listbox.bind("<MouseWheel>", self.on_mousewheel)
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(3))
+        self.listbox.bind("<Up>", lambda event: self.move_selection(-1))
+        self.listbox.bind("<Down>", lambda event: self.move_selection(1))
+        self.listbox.bind("<Prior>", lambda event: self.scroll(-self.rows))
+        self.listbox.bind("<Next>", lambda event: self.scroll(self.rows))
+
+    def set_model(self, count, row_text):
+        # Show `count` rows whose text comes from row_text(index)
+        self.count = count
+        self.row_text = row_text
+        if self.selected is not None and self.selected >= count:
+            self.selected = None
+        self.top = max(0, min(self.top, count - self.rows))
+        self.render()
+
+    def append(self, added):
+        # Rows were added at the end of the model
+        old_count = self.count
+        self.count += added
+        if old_count < self.top + self.rows:
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def render(self):
+        # Redraw the visible window only
+        end = min(self.top + self.rows, self.count)
+        self.listbox.delete(0, tk.END)
+        if end > self.top:
+            self.listbox.insert(tk.END, *[self.row_text(index) for index in range(self.top, end)])
+        if self.selected is not None and self.top <= self.selected < end:
+            self.listbox.selection_set(self.selected - self.top)
+        self.update_scrollbar()
+
+    def refresh(self):
+        # Row texts changed, e.g. when metadata arrived
+        self.render()
+
+    def refresh_row(self, index):
+        if self.top <= index < min(self.top + self.rows, self.count):
+            row = index - self.top
+            self.listbox.delete(row)
+            self.listbox.insert(row, self.row_text(index))
+            if index == self.selected:
+                self.listbox.selection_set(row)
+
+    def update_scrollbar(self):
+        if self.count <= 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / self.count, min(self.top + self.rows, self.count) / self.count)
+
+    def yview(self, *args):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units" / "pages")
+        if not args or self.count <= self.rows:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.count))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self.scroll(step * self.rows if args[2] == "pages" else step)
+
+    def scroll(self, rows):
+        self.scroll_to(self.top + rows)
+        return "break"
+
+    def scroll_to(self, top):
+        top = max(0, min(top, self.count - self.rows))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def on_mousewheel(self, event):
+        return self.scroll(-1 if event.delta > 0 else 1)
+
+    def see(self, index):
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + self.rows:
+            self.scroll_to(index - self.rows + 1)
+
+    def select(self, index, see=True):
+        # Move the selection without redrawing other rows
+        if index == self.selected:
+            return
+        old = self.selected
+        self.selected = index
+        if see and index is not None and not (self.top <= index < self.top + self.rows):
+            self.see(index)
+            return
+        end = self.top + self.rows
+        if old is not None and self.top <= old < end:
+            self.listbox.selection_clear(old - self.top)
+        if index is not None and self.top <= index < end:
+            self.listbox.selection_set(index - self.top)
+
+    def move_selection(self, step):
+        if self.count:
+            current = self.selected if self.selected is not None else self.top
+            self.select(max(0, min(current + step, self.count - 1)))
+            self.event_generate("<<ListboxSelect>>")
+        return "break"
+
+    def on_listbox_select(self, event):
+        rows = self.listbox.curselection()
+        if not rows:
+            return
+        index = self.top + rows[0]
+        if index < self.count:
+            self.selected = index
+            self.event_generate("<<ListboxSelect>>")
+
+    def curselection(self):
+        return (self.selected,) if self.selected is not None else ()
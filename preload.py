@@ -0,0 +1,57 @@
+import collections
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TrackPreloader:
+    # Reads upcoming tracks into memory on a background thread so the
+    # mixer can switch to them without touching the disk
+    def __init__(self, max_tracks=3, max_bytes=64 * 1024 * 1024):
+        self.max_tracks = max_tracks
+        self.max_bytes = max_bytes
+        self.cache = collections.OrderedDict()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preload")
+
+    def request(self, path):
+        # Start reading `path` in the background if it is not cached yet
+        if not path:
+            return
+        with self.lock:
+            if path in self.cache:
+                self.cache.move_to_end(path)
+                return
+            if path in self.pending:
+                return
+            self.pending.add(path)
+        self.executor.submit(self._read, path)
+
+    def _read(self, path):
+        data = None
+        try:
+            if os.path.getsize(path) <= self.max_bytes:
+                with open(path, "rb") as f:
+                    data = f.read()
+        except OSError as e:
+            print(f"Preload error: {e}")
+        with self.lock:
+            self.pending.discard(path)
+            if data is not None:
+                self.cache[path] = data
+                self.cache.move_to_end(path)
+                while len(self.cache) > self.max_tracks:
+                    self.cache.popitem(last=False)
+
+    def source(self, path):
+        # (file object, name hint) for the mixer if `path` is in memory, else the path
+        with self.lock:
+            data = self.cache.get(path)
+        if data is None:
+            return path, None
+        return io.BytesIO(data), os.path.splitext(path)[1].lstrip(".").lower()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
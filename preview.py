@@ -0,0 +1,42 @@
+import tkinter as tk
+
+
+class PreviewPanel(tk.Label):
+    # Camera preview inside the Tk window. Frames come from a frame ring
+    # (see shared_ring.FrameRing) as RGB and are shown at most `fps` times a
+    # second through one PhotoImage allocated up front.
+    def __init__(self, master, width=320, height=240, fps=15, **options):
+        super().__init__(master, **options)
+        self.fps = fps
+        self.photo = tk.PhotoImage(width=width, height=height)
+        self.config(image=self.photo)
+        self.shape = (height, width, 3)
+        self.header = f"P6 {width} {height} 255\n".encode("ascii")
+        self.source = None
+        self.job = None
+
+    def attach(self, source):
+        # Start showing frames from `source` (anything with latest())
+        self.source = source
+        if self.job is None:
+            self.job = self.after(0, self.tick)
+
+    def detach(self):
+        self.source = None
+        if self.job is not None:
+            self.after_cancel(self.job)
+            self.job = None
+        self.photo.blank()
+
+    def tick(self):
+        self.job = None
+        if self.source is None:
+            return
+        frame = self.source.latest()
+        if frame is not None:
+            image = frame[1]
+            if image.shape == self.shape:
+                # Tkinter only passes bytes to Tk, so the ring's view is
+                # joined to the header in one copy, which Tk copies once
+                self.photo.configure(data=b"".join((self.header, image.data)), format="PPM")
+        self.job = self.after(int(1000 / self.fps), self.tick)
@@ -0,0 +1,59 @@
+import struct
+import numpy as np
+
+# File layout: MAGIC, then one record per frame of
+# timestamp (float64), hand count (uint8) and count * 21 * 3 float32 landmarks
+MAGIC = b"CNDLMK01"
+RECORD_HEADER = struct.Struct("<dB")
+HAND_SIZE = 21 * 3 * 4
+
+
+class LandmarkRecorder:
+    # Appends timestamped landmark frames to a compact binary file
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.frames = 0
+
+    def write(self, timestamp, hands):
+        hands = np.asarray(hands, dtype="<f4").reshape(-1, 21, 3)
+        self.file.write(RECORD_HEADER.pack(timestamp, len(hands)))
+        self.file.write(hands.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_landmarks(path):
+    # Yield (timestamp, hands) pairs from a recording
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Not a landmark recording: {path}")
+    offset = len(MAGIC)
+    while offset + RECORD_HEADER.size <= len(data):
+        timestamp, count = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        size = count * HAND_SIZE
+        hands = np.frombuffer(data, dtype="<f4", count=count * 63, offset=offset).reshape(count, 21, 3)
+        offset += size
+        yield timestamp, hands
+
+
+def load_landmarks(path):
+    # Whole recording as (timestamps, list of hand arrays)
+    timestamps = []
+    frames = []
+    for timestamp, hands in read_landmarks(path):
+        timestamps.append(timestamp)
+        frames.append(hands)
+    return np.array(timestamps), frames
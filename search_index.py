@@ -0,0 +1,129 @@
+import threading
+import unicodedata
+from array import array
+
+
+def normalise(text):
+    # Case and accents folded, whitespace collapsed: "Beyoncé" matches "BEYONCE"
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(text.split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrackSearchIndex:
+    # Trigram index over the playlist's searchable text (file name and tags).
+    # Track ids are playlist indices. Postings are append-only arrays and
+    # every candidate is checked against its current text, so updates only
+    # ever add trigrams.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.texts = []
+        self.postings = {}
+        self.ids = {}
+        self.pending = []
+        self.ready = True
+        self.generation = 0
+
+    def build_async(self, keys, text_for):
+        # Rebuild for a new playlist on a background thread. Changes made
+        # meanwhile are replayed once it finishes.
+        with self.lock:
+            self.generation += 1
+            self.ready = False
+            self.pending = []
+            generation = self.generation
+        threading.Thread(target=self._build, args=(generation, list(keys), text_for), daemon=True).start()
+
+    def _build(self, generation, keys, text_for):
+        texts = []
+        postings = {}
+        ids = {}
+        for track_id, key in enumerate(keys):
+            text = normalise(text_for(key))
+            texts.append(text)
+            ids.setdefault(key, []).append(track_id)
+            for gram in trigrams(text):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("I")
+                posting.append(track_id)
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.texts = texts
+            self.postings = postings
+            self.ids = ids
+            for method, key, text in self.pending:
+                method(key, text)
+            self.pending = []
+            self.ready = True
+
+    def add(self, key, text):
+        # Append one track at the next id
+        with self.lock:
+            if not self.ready:
+                self.pending.append((self._add, key, text))
+            else:
+                self._add(key, text)
+
+    def _add(self, key, text):
+        text = normalise(text)
+        track_id = len(self.texts)
+        self.texts.append(text)
+        self.ids.setdefault(key, []).append(track_id)
+        self._index(track_id, trigrams(text))
+
+    def update(self, key, text):
+        # New searchable text for every track with this key, e.g. when tags arrive
+        with self.lock:
+            if not self.ready:
+                self.pending.append((self._update, key, text))
+            else:
+                self._update(key, text)
+
+    def _update(self, key, text):
+        text = normalise(text)
+        for track_id in self.ids.get(key, ()):
+            old = self.texts[track_id]
+            self.texts[track_id] = text
+            self._index(track_id, trigrams(text) - trigrams(old))
+
+    def _index(self, track_id, grams):
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array("I")
+            if not posting or posting[-1] != track_id:
+                posting.append(track_id)
+
+    def search(self, query, limit=None):
+        # Track ids containing every word of the query, in playlist order.
+        # None while a rebuild is still running.
+        words = normalise(query).split()
+        with self.lock:
+            if not self.ready:
+                return None
+            if not words:
+                return []
+            candidates = None
+            for word in words:
+                for gram in trigrams(word):
+                    posting = self.postings.get(gram)
+                    if posting is None:
+                        return []
+                    if candidates is None or len(posting) < len(candidates):
+                        candidates = posting
+            ids = sorted(set(candidates)) if candidates is not None else range(len(self.texts))
+            results = []
+            for track_id in ids:
+                text = self.texts[track_id]
+                if all(word in text for word in words):
+                    results.append(track_id)
+                    if limit is not None and len(results) >= limit:
+                        break
+            return results
@@ -0,0 +1,210 @@
+import io
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from storage import data_path, file_identity
+
+# Layer III bitrates in kbit/s, by MPEG version (1 or 2/2.5)
+BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# Frame tables kept in memory, least recently used dropped first; the
+# SQLite cache still has them
+MAX_INDEXES = 32
+
+
+def parse_header(data, offset):
+    # (frame length, sample rate, samples per frame) of the Layer III frame
+    # header at `offset`, or None if there is none
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 3
+    layer = (data[offset + 1] >> 1) & 3
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 3
+    padding = (data[offset + 2] >> 1) & 1
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    samples = 1152 if mpeg1 else 576
+    length = (samples // 8) * bitrate // sample_rate + padding
+    return length, sample_rate, samples
+
+
+def id3v2_size(data):
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return size + (20 if data[5] & 0x10 else 10)
+
+
+def build_frame_index(data):
+    # Byte offset of every audio frame in an MP3, plus its timing, or None
+    # if this is not a Layer III stream
+    offset = id3v2_size(data)
+    end = len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+    offsets = array("I")
+    sample_rate = samples = None
+    while offset + 4 <= end:
+        header = parse_header(data, offset)
+        if header is None or (sample_rate is not None and header[1:] != (sample_rate, samples)):
+            # Junk between frames, resync on the next frame header
+            offset = data.find(b"\xff", offset + 1, end)
+            if offset < 0:
+                break
+            continue
+        length, sample_rate, samples = header
+        if offset + length > end:
+            break
+        if offsets or not is_info_frame(data, offset, length):
+            offsets.append(offset)
+        offset += length
+    if not offsets:
+        return None
+    return SeekIndex(offsets, sample_rate, samples)
+
+
+def is_info_frame(data, offset, length):
+    # The Xing / Info header frame carries no audio
+    frame = data[offset:offset + length]
+    return b"Xing" in frame[:64] or b"Info" in frame[:64]
+
+
+class SeekIndex:
+    # Frame table of one track: seconds map to the byte offset of the frame
+    # that starts there, and back to the exact time of that frame
+    def __init__(self, offsets, sample_rate, samples_per_frame):
+        self.offsets = offsets
+        self.sample_rate = sample_rate
+        self.samples_per_frame = samples_per_frame
+        self.frame_duration = samples_per_frame / sample_rate
+
+    def duration(self):
+        return len(self.offsets) * self.frame_duration
+
+    def locate(self, seconds):
+        # (byte offset, true position in seconds) for a seek to `seconds`
+        frame = max(0, min(int(seconds / self.frame_duration), len(self.offsets) - 1))
+        return self.offsets[frame], frame * self.frame_duration
+
+
+class OffsetFile(io.RawIOBase):
+    # Read-only view of a file starting at `start`, so the decoder sees the
+    # stream as if it began at that frame. With close_source=False closing
+    # the view leaves `source` open for the next one.
+    def __init__(self, source, start, close_source=True):
+        self.source = source
+        self.start = start
+        self.close_source = close_source
+        self.source.seek(0, os.SEEK_END)
+        self.size = self.source.tell() - start
+        self.source.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.source.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.tell()
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.source.seek(self.start + max(0, offset))
+        return self.tell()
+
+    def tell(self):
+        return self.source.tell() - self.start
+
+    def close(self):
+        if self.close_source:
+            self.source.close()
+        super().close()
+
+
+class SeekIndexService:
+    # Builds frame tables in the background and keeps them in an SQLite
+    # cache checked against the file's size and mtime. At most max_indexes
+    # tables stay in memory.
+    def __init__(self, path=None, max_indexes=MAX_INDEXES):
+        self.db = sqlite3.connect(path or data_path("seekindex.db"), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS frames (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, "
+            "sample_rate INTEGER, samples INTEGER, offsets BLOB)"
+        )
+        self.lock = threading.Lock()
+        self.indexes = OrderedDict()
+        self.max_indexes = max_indexes
+        self.pending = set()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="seekindex")
+
+    def request(self, path):
+        # Make the index of `path` available soon, MP3 files only
+        if not path or os.path.splitext(path)[1].lower() != ".mp3":
+            return
+        with self.lock:
+            if path in self.indexes or path in self.pending:
+                return
+            self.pending.add(path)
+        self.executor.submit(self._load, path)
+
+    def _load(self, path):
+        index = None
+        try:
+            identity = file_identity(path)
+            index = self._cached(path, identity)
+            if index is None:
+                with open(path, "rb") as f:
+                    index = build_frame_index(f.read())
+                if index is not None:
+                    self._store(path, identity, index)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Seek index error: {e}")
+        with self.lock:
+            self.pending.discard(path)
+            self.indexes[path] = index
+            self.indexes.move_to_end(path)
+            while len(self.indexes) > self.max_indexes:
+                self.indexes.popitem(last=False)
+
+    def _cached(self, path, identity):
+        with self.lock:
+            row = self.db.execute("SELECT size, mtime, sample_rate, samples, offsets FROM frames WHERE path = ?",
+                                  (path,)).fetchone()
+        if row is None or (row[0], row[1]) != identity:
+            return None
+        offsets = array("I")
+        offsets.frombytes(row[4])
+        return SeekIndex(offsets, row[2], row[3])
+
+    def _store(self, path, identity, index):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO frames VALUES (?, ?, ?, ?, ?, ?)",
+                            (path, identity[0], identity[1], index.sample_rate, index.samples_per_frame,
+                             index.offsets.tobytes()))
+
+    def get(self, path):
+        # The finished index, None while it is being built or for other formats
+        with self.lock:
+            index = self.indexes.get(path)
+            if index is not None:
+                self.indexes.move_to_end(path)
+            return index
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            self.db.close()
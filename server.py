@@ -0,0 +1,344 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# Outgoing updates are collected for this long and sent as one message
+BATCH_INTERVAL = 0.05
+# Subscribers further behind than this many bytes are dropped
+MAX_BACKLOG = 1 << 20
+MAX_BODY = 1 << 20
+
+# POST /<name> -> player actor command, and the JSON field holding its value
+TRANSPORT = {
+    "play": ("play", None),
+    "pause": ("pause", None),
+    "stop": ("stop", None),
+    "next": ("skip", None),
+    "previous": ("skip", None),
+    "seek": ("seek", "position"),
+    "volume": ("set_volume", "volume"),
+    "select": ("select", "index"),
+}
+STATUS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+          413: "Payload Too Large"}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def ws_frame(payload, opcode=1):
+    # One unmasked, unfragmented server frame
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def ws_read(reader):
+    # (opcode, payload) of the next client frame, unmasked
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_BODY:
+        raise RequestError(413, "frame too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask and length:
+        mask = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, "big") ^ int.from_bytes(mask, "big")).to_bytes(length, "big")
+    return first & 0x0F, payload
+
+
+def local_origin(origin):
+    # Browsers on other sites must not drive the player
+    if not origin:
+        return True
+    host = urlsplit(origin).hostname
+    return host in ("localhost", "127.0.0.1", "::1")
+
+
+def local_host(host, port):
+    # A page on another site whose name was rebound to 127.0.0.1 still sends
+    # its own name as Host, so only loopback names on our port are served
+    if not host:
+        return False
+    try:
+        url = urlsplit("//" + host)
+        return url.hostname in ("localhost", "127.0.0.1", "::1") and (url.port or 80) == port
+    except ValueError:
+        return False
+
+
+class ControlServer:
+    # Local HTTP / WebSocket control API on its own asyncio thread, so the
+    # Tk loop never waits on a client. Transport commands go straight into
+    # the player actor. Playlist changes run on the Tk thread through
+    # `after`. State changes and gesture events are published from any
+    # thread and sent to WebSocket subscribers in batches: one message
+    # every BATCH_INTERVAL, encoded once for all of them, holding the
+    # newest state and the events since the last batch.
+    #
+    #     GET  /state, /playlist?offset=0&limit=100
+    #     POST /play, /pause, /stop, /next, /previous
+    #     POST /seek {"position": s}, /volume {"volume": 0..1}, /select {"index": i}
+    #     POST /playlist {"paths": [...]}, /playlist/add, /playlist/remove
+    #     GET  /ws  (WebSocket; clients may send {"command": "next", ...})
+    def __init__(self, gui, host="127.0.0.1", port=8765):
+        self.gui = gui
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.state = None
+        self.events = []
+        self.flush_pending = False
+        self.subscribers = set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="control-server", daemon=True)
+        self.thread.start()
+        self.ready.wait(2.0)
+        return self.server is not None
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle, self.host, self.port, limit=MAX_BODY))
+            self.port = self.server.sockets[0].getsockname()[1]
+        except OSError as e:
+            print(f"Control server error: {e}")
+            self.ready.set()
+            self.loop.close()
+            return
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            # Open connections, WebSockets included, end with the loop
+            self.server.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join(2.0)
+
+    # Publishing, from any thread
+
+    def publish_state(self, state):
+        with self.lock:
+            self.state = state
+        self.schedule_flush()
+
+    def publish_event(self, kind, **data):
+        with self.lock:
+            self.events.append(dict(data, type=kind))
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        # At most one flush pending, and nothing kept while nobody listens
+        with self.lock:
+            if not self.subscribers:
+                self.events.clear()
+                return
+            if self.flush_pending:
+                return
+            self.flush_pending = True
+        try:
+            self.loop.call_soon_threadsafe(self.loop.call_later, BATCH_INTERVAL, self.flush)
+        except RuntimeError:
+            pass
+
+    def flush(self):
+        # Loop thread: one frame with everything since the last flush
+        with self.lock:
+            self.flush_pending = False
+            events, self.events = self.events, []
+            state = self.state
+            subscribers = list(self.subscribers)
+        frame = ws_frame(json.dumps({"state": state, "events": events}).encode())
+        for writer in subscribers:
+            if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                with self.lock:
+                    self.subscribers.discard(writer)
+                writer.close()
+            else:
+                writer.write(frame)
+
+    # HTTP
+
+    async def handle(self, reader, writer):
+        try:
+            method, path, headers, body = await self.read_request(reader)
+            if not local_host(headers.get("host"), self.port):
+                raise RequestError(403, "Host must be localhost, 127.0.0.1 or [::1] on the API port")
+            url = urlsplit(path)
+            if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self.websocket(reader, writer, headers)
+                return
+            status, result = 200, self.route(method, url, headers, body)
+        except RequestError as e:
+            status, result = e.status, {"error": str(e)}
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError, ValueError,
+                asyncio.CancelledError):
+            # Malformed requests, and connections still open when the server stops
+            writer.close()
+            return
+        payload = json.dumps(result).encode()
+        writer.write(f"HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            raise RequestError(413, "body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path, headers, body
+
+    def route(self, method, url, headers, body):
+        name = url.path.strip("/")
+        if method == "GET":
+            if name == "state":
+                with self.lock:
+                    return self.state
+            if name == "playlist":
+                query = parse_qs(url.query)
+                try:
+                    offset = max(int(query.get("offset", ["0"])[0]), 0)
+                    limit = max(int(query.get("limit", ["100"])[0]), 0)
+                except ValueError:
+                    raise RequestError(400, "offset and limit must be integers")
+                playlist = self.gui.playlist
+                return {"total": len(playlist), "offset": offset, "tracks": playlist[offset:offset + limit]}
+            raise RequestError(404, f"no such resource: {url.path}")
+        if method != "POST":
+            raise RequestError(405, "use GET or POST")
+        # JSON only: cross-site pages cannot send that without a preflight
+        if not headers.get("content-type", "").startswith("application/json") or not local_origin(headers.get("origin")):
+            raise RequestError(403, "POST needs Content-Type: application/json from a local origin")
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise RequestError(400, "invalid JSON")
+        return self.command(name, data)
+
+    def command(self, name, data):
+        # Shared by HTTP and WebSocket clients
+        actor = self.gui.actor
+        if name in TRANSPORT:
+            command, field = TRANSPORT[name]
+            if name in ("next", "previous"):
+                value = 1 if name == "next" else -1
+            elif field is None:
+                value = None
+            elif field not in data:
+                raise RequestError(400, f"missing field: {field}")
+            else:
+                value = data[field]
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    raise RequestError(400, f"{field} must be a number")
+                if name == "select":
+                    value = int(value)
+                    if not 0 <= value < len(self.gui.playlist):
+                        raise RequestError(400, "index out of range")
+            actor.send(command, value)
+            return {"ok": True}
+        if name in ("playlist", "playlist/add", "playlist/remove"):
+            paths = data.get("paths")
+            if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+                raise RequestError(400, "paths must be a list of strings")
+            master = self.gui.master
+            if name == "playlist":
+                paths = [path for path in paths if self.gui.player.is_audio_file(path)]
+                if not paths:
+                    raise RequestError(400, "no audio files")
+                master.after(0, lambda: self.gui.set_playlist(paths, f"Loaded {len(paths)} tracks remotely"))
+            elif name == "playlist/add":
+                master.after(0, lambda: self.gui.apply_library_changes(paths, []))
+            else:
+                master.after(0, lambda: self.gui.apply_library_changes([], paths))
+            return {"ok": True}
+        raise RequestError(404, f"no such command: {name}")
+
+    # WebSocket
+
+    async def websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if not key or not local_origin(headers.get("origin")):
+            writer.write(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            writer.close()
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        # Subscribed first: batches are flushed on this loop, so none can
+        # overtake the current state sent right after
+        with self.lock:
+            self.subscribers.add(writer)
+            state = self.state
+        writer.write(ws_frame(json.dumps({"state": state, "events": []}).encode()))
+        try:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == 8:
+                    writer.write(ws_frame(payload[:2], opcode=8))
+                    break
+                if opcode == 9:
+                    writer.write(ws_frame(payload, opcode=10))
+                elif opcode == 1:
+                    writer.write(ws_frame(json.dumps(self.ws_command(payload)).encode()))
+        except (asyncio.IncompleteReadError, ConnectionError, RequestError, asyncio.CancelledError):
+            # Gone, broken, or the server is stopping
+            pass
+        finally:
+            with self.lock:
+                self.subscribers.discard(writer)
+            writer.close()
+
+    def ws_command(self, payload):
+        try:
+            data = json.loads(payload)
+            name = data.pop("command")
+            return dict(self.command(name, data), reply=name)
+        except RequestError as e:
+            return {"error": str(e)}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return {"error": "expected {\"command\": name, ...}"}
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+from storage import data_path
+
+# Bump when the layout changes, older snapshots are then discarded
+VERSION = 1
+
+DEFAULTS = {
+    "index": 0,
+    "position": 0.0,
+    "volume": 0.5,
+    "loop_mode": "Off",
+    "shuffle_mode": False,
+}
+
+
+def encode_paths(paths):
+    return "\0".join(paths).encode("utf-8", "surrogateescape")
+
+
+def decode_paths(blob):
+    return blob.decode("utf-8", "surrogateescape").split("\0") if blob else []
+
+
+class SessionStore:
+    # The last session in SQLite: the playlist as a single blob row that is
+    # only rewritten when the playlist changes, the shuffle permutation as
+    # another, and small key/value rows for the rest. Changes are collected
+    # and written together at most every `interval` seconds on a timer
+    # thread; each write is one transaction, so a crash leaves either the
+    # previous snapshot or the new one.
+    def __init__(self, path=None, interval=2.0):
+        self.db = sqlite3.connect(path or data_path("session.db"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != VERSION:
+            with self.db:
+                for table in ("meta", "playlist", "shuffle"):
+                    self.db.execute(f"DROP TABLE IF EXISTS {table}")
+                self.db.execute(f"PRAGMA user_version = {VERSION}")
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS playlist (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                            "count INTEGER, paths BLOB)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS shuffle (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                            "info TEXT, orders BLOB)")
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.fields = {}
+        self.playlist = None
+        self.shuffle = None
+        self.timer = None
+
+    def load(self):
+        # The saved session as a dict, or None when there is none
+        with self.lock:
+            row = self.db.execute("SELECT paths FROM playlist WHERE id = 0").fetchone()
+            if row is None:
+                return None
+            session = dict(DEFAULTS)
+            for key, value in self.db.execute("SELECT key, value FROM meta"):
+                session[key] = json.loads(value)
+            session["playlist"] = decode_paths(row[0])
+            session["shuffle"] = None
+            shuffle = self.db.execute("SELECT info, orders FROM shuffle WHERE id = 0").fetchone()
+        if shuffle is not None and shuffle[0]:
+            session["shuffle"] = dict(json.loads(shuffle[0]), order=shuffle[1])
+        return session
+
+    def save_playlist(self, paths):
+        with self.lock:
+            self.playlist = list(paths)
+            self.schedule()
+
+    def save_shuffle(self, state):
+        # ShuffleEngine.state(), or None when shuffle is off
+        with self.lock:
+            self.shuffle = state if state is not None else {}
+            self.schedule()
+
+    def update(self, **fields):
+        # Small values: index, position, volume, loop_mode, shuffle_mode
+        with self.lock:
+            self.fields.update(fields)
+            self.schedule()
+
+    def schedule(self):
+        if self.timer is None:
+            self.timer = threading.Timer(self.interval, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        # Write everything changed since the last flush in one transaction
+        with self.lock:
+            self.timer = None
+            fields, self.fields = self.fields, {}
+            playlist, self.playlist = self.playlist, None
+            shuffle, self.shuffle = self.shuffle, None
+            if not fields and playlist is None and shuffle is None:
+                return
+            try:
+                with self.db:
+                    if playlist is not None:
+                        self.db.execute("INSERT OR REPLACE INTO playlist VALUES (0, ?, ?)",
+                                        (len(playlist), encode_paths(playlist)))
+                    if shuffle is not None:
+                        info = {key: value for key, value in shuffle.items() if key != "order"}
+                        self.db.execute("INSERT OR REPLACE INTO shuffle VALUES (0, ?, ?)",
+                                        (json.dumps(info) if info else None, shuffle.get("order")))
+                    self.db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                        [(key, json.dumps(value)) for key, value in fields.items()])
+            except sqlite3.Error as e:
+                print(f"Session save error: {e}")
+
+    def close(self):
+        with self.lock:
+            timer = self.timer
+        if timer is not None:
+            timer.cancel()
+        self.flush()
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,75 @@
+import threading
+import time
+from gesture_worker import GestureWorker
+
+# Hands tracked per camera
+MAX_HANDS = 4
+
+
+class GestureArbiter:
+    # Decides which camera's gestures reach the player when several cameras
+    # see hands. Users are source ids: hand track ids change whenever a hand
+    # leaves the frame for a moment, and a person's two hands are two
+    # tracks, so they cannot tell people apart. The first camera to see a
+    # gesture holds control until it has been idle for `hold` seconds and
+    # the others are turned down meanwhile, which also drops the copy of a
+    # gesture that a second camera saw.
+    def __init__(self, hold=1.5):
+        self.hold = hold
+        self.lock = threading.Lock()
+        self.owner = None
+        self.last = 0.0
+
+    def admit(self, user, name, now=None):
+        # True when `user` may send `name` now
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if self.owner is not None and user != self.owner and now - self.last < self.hold:
+                return False
+            self.owner = user
+            self.last = now
+            return True
+
+
+class GestureSession:
+    # Gesture control from one or more cameras. Every camera gets its own
+    # GestureWorker process, so capture and inference use as many cores as
+    # there are cameras, and each worker tracks every hand it sees as a
+    # separate user. All of them send to the player actor; with more than
+    # one camera an arbiter picks whose gestures count. Offers the
+    # GestureWorker interface, the in-app preview shows the first camera.
+    def __init__(self, gui, status_callback, sources=(0,), hold=1.5, max_hands=MAX_HANDS, share_frames=False,
+                 **worker_options):
+        self.gui = gui
+        self.arbiter = GestureArbiter(hold) if len(sources) > 1 else None
+        self.workers = [GestureWorker(gui, status_callback, source=source, source_id=i, max_hands=max_hands,
+                                      share_frames=share_frames and i == 0, **worker_options)
+                        for i, source in enumerate(sources)]
+
+    @property
+    def frames(self):
+        return self.workers[0].frames
+
+    def start(self):
+        if self.arbiter is not None:
+            self.gui.actor.arbiter = self.arbiter
+        for worker in self.workers:
+            worker.start()
+
+    def set_volume(self, volume):
+        for worker in self.workers:
+            worker.set_volume(volume)
+
+    def set_telemetry(self, enabled):
+        for worker in self.workers:
+            worker.set_telemetry(enabled)
+
+    def stop(self):
+        # Signal every worker first so they shut down in parallel
+        for worker in self.workers:
+            worker.stop_event.set()
+        for worker in self.workers:
+            worker.stop()
+        if self.arbiter is not None and self.gui.actor.arbiter is self.arbiter:
+            self.gui.actor.arbiter = None
@@ -0,0 +1,104 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedRing:
+    # Fixed-size slots in shared memory, written by one process and read by
+    # another without locks. Every slot starts with the sequence number of
+    # the write that filled it; the reader checks it before and after
+    # copying, so a slot overwritten mid-read is detected and skipped.
+    def __init__(self, slot_size, slots=4, name=None):
+        self.slot_size = slot_size
+        self.slots = slots
+        self.stride = 8 + slot_size
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=8 + slots * self.stride)
+        self.buffer = np.ndarray((self.shm.size,), dtype=np.uint8, buffer=self.shm.buf)
+        self.counter = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf)
+        self.sequences = [np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf, offset=8 + i * self.stride)
+                          for i in range(slots)]
+        if self.owner:
+            self.counter[0] = 0
+        self.last_read = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def payload(self, slot):
+        start = 8 + slot * self.stride + 8
+        return self.buffer[start:start + self.slot_size]
+
+    def begin_write(self):
+        # (sequence, payload view) of the next slot, filled in place and
+        # published with commit(sequence)
+        sequence = int(self.counter[0]) + 1
+        slot = sequence % self.slots
+        self.sequences[slot][0] = 0
+        return sequence, self.payload(slot)
+
+    def commit(self, sequence):
+        self.sequences[sequence % self.slots][0] = sequence
+        self.counter[0] = sequence
+
+    def write(self, data):
+        # Copy `data` (bytes-like, at most slot_size) into the next slot
+        sequence, payload = self.begin_write()
+        data = np.frombuffer(data, dtype=np.uint8)
+        payload[:len(data)] = data
+        self.commit(sequence)
+
+    def read_latest(self, out):
+        # Copy the newest slot into `out` (uint8 array of slot_size), returns
+        # its sequence number, or None when nothing new was written
+        sequence = int(self.counter[0])
+        if sequence == 0 or sequence == self.last_read:
+            return None
+        slot = sequence % self.slots
+        if int(self.sequences[slot][0]) != sequence:
+            return None
+        out[:] = self.payload(slot)
+        if int(self.sequences[slot][0]) != sequence:
+            return None
+        self.last_read = sequence
+        return sequence
+
+    def close(self):
+        # Only the creating process unlinks the block. Child processes share
+        # its resource tracker, so they must not unregister it either.
+        self.buffer = self.counter = None
+        self.sequences = []
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class FrameRing:
+    # Latest preview frames of the gesture worker, fixed size RGB images
+    def __init__(self, width=640, height=480, name=None, slots=3):
+        self.shape = (height, width, 3)
+        self.ring = SharedRing(16 + height * width * 3, slots, name)
+        self.scratch = np.zeros(self.ring.slot_size, dtype=np.uint8)
+        self.header = np.zeros(2, dtype=np.float64)
+
+    @property
+    def name(self):
+        return self.ring.name
+
+    def write(self, timestamp, image):
+        # `image` must already have the ring's shape
+        self.header[0] = timestamp
+        sequence, payload = self.ring.begin_write()
+        payload[:16] = self.header.view(np.uint8)
+        payload[16:] = image.reshape(-1)
+        self.ring.commit(sequence)
+
+    def latest(self):
+        # (timestamp, image) written since the last call, or None. The image
+        # is a view that stays valid until the next call.
+        if self.ring.read_latest(self.scratch) is None:
+            return None
+        return float(self.scratch[:8].view(np.float64)[0]), self.scratch[16:].reshape(self.shape)
+
+    def close(self):
+        self.ring.close()
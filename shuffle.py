@@ -0,0 +1,136 @@
+import collections
+import random
+from array import array
+
+
+class ShuffleEngine:
+    # Shuffle order drawn one step at a time from a Fisher-Yates permutation.
+    # Every track plays once per cycle, each step is O(1), and back/forward
+    # history is kept in fixed-size ring buffers.
+    def __init__(self, size, start=None, seed=None, history_size=200):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.history = collections.deque(maxlen=history_size)
+        self.forward = collections.deque(maxlen=history_size)
+        self.reset(size, start)
+
+    def reset(self, size, start=None):
+        # New permutation over `size` tracks, `start` counts as already played
+        self.size = size
+        self.order = array("I", range(size))
+        self.position = array("I", range(size))
+        self.drawn = 0
+        self.upcoming = None
+        self.current = start
+        self.history.clear()
+        self.forward.clear()
+        if start is not None and 0 <= start < size:
+            self.claim(start)
+
+    def swap(self, i, j):
+        a, b = self.order[i], self.order[j]
+        self.order[i], self.order[j] = b, a
+        self.position[a], self.position[b] = j, i
+
+    def claim(self, index):
+        # Move `index` into the played part of this cycle
+        pos = self.position[index]
+        if pos >= self.drawn:
+            self.swap(pos, self.drawn)
+            self.drawn += 1
+
+    def draw(self):
+        # Fix the next slot of the permutation
+        if self.size == 0:
+            return None
+        if self.drawn >= self.size:
+            # Cycle finished, the next one reshuffles the same array lazily
+            self.drawn = 0
+        self.swap(self.drawn, self.rng.randrange(self.drawn, self.size))
+        if self.drawn == 0 and self.size > 1 and self.order[0] == self.current:
+            self.swap(0, self.rng.randrange(1, self.size))
+        index = self.order[self.drawn]
+        self.drawn += 1
+        return index
+
+    def peek(self):
+        # Track next() will return, without moving
+        if self.forward:
+            return self.forward[-1]
+        if self.upcoming is None:
+            self.upcoming = self.draw()
+        return self.upcoming
+
+    def next(self):
+        index = self.peek()
+        if self.forward:
+            self.forward.pop()
+        else:
+            self.upcoming = None
+        if self.current is not None:
+            self.history.append(self.current)
+        self.current = index
+        return index
+
+    def previous(self):
+        # Step back through history, None when it is exhausted
+        if not self.history:
+            return None
+        if self.current is not None:
+            self.forward.append(self.current)
+        self.current = self.history.pop()
+        return self.current
+
+    def select(self, index):
+        # The user picked a track directly
+        if index == self.current:
+            return
+        if self.current is not None:
+            self.history.append(self.current)
+        self.forward.clear()
+        if index == self.upcoming:
+            self.upcoming = None
+        else:
+            self.claim(index)
+        self.current = index
+
+    def extend(self, added):
+        # Tracks were appended to the playlist, they join the unplayed part
+        start = self.size
+        self.size += added
+        self.order.extend(range(start, self.size))
+        self.position.extend(range(start, self.size))
+
+    def state(self):
+        # Plain data for a saved session, see from_state()
+        return {
+            "seed": self.seed,
+            "size": self.size,
+            "order": self.order.tobytes(),
+            "drawn": self.drawn,
+            "upcoming": self.upcoming,
+            "current": self.current,
+            "history": list(self.history),
+            "forward": list(self.forward),
+            "history_size": self.history.maxlen,
+            "rng": self.rng.getstate(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        # Continue exactly where state() left off, same order and history
+        engine = cls(0, seed=state["seed"], history_size=state["history_size"])
+        engine.size = state["size"]
+        engine.order = array("I")
+        engine.order.frombytes(state["order"])
+        engine.position = array("I", engine.order)
+        for slot, index in enumerate(engine.order):
+            engine.position[index] = slot
+        engine.drawn = state["drawn"]
+        engine.upcoming = state["upcoming"]
+        engine.current = state["current"]
+        engine.history.extend(state["history"])
+        engine.forward.extend(state["forward"])
+        version, internal, gauss = state["rng"]
+        engine.rng.setstate((version, tuple(internal), gauss))
+        return engine
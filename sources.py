@@ -0,0 +1,89 @@
+import os
+import time
+import cv2
+
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.bmp']
+
+
+class FrameDirectorySource:
+    # Reads a sorted directory of images like a cv2.VideoCapture
+    def __init__(self, path, fps=30.0):
+        self.path = path
+        self.fps = fps
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+        )
+        self.position = 0
+        self.opened = bool(self.files)
+
+    def isOpened(self):
+        return self.opened and self.position < len(self.files)
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+        image = cv2.imread(self.files[self.position])
+        self.position += 1
+        return image is not None, image
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.files)
+        return 0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.opened = False
+
+
+class CaptureSource:
+    # Uniform wrapper over a camera, video file or frame directory.
+    # Files report their own timeline so replays are deterministic.
+    def __init__(self, spec=0, fps=None):
+        self.spec = spec
+        self.live = False
+        if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+            self.cap = cv2.VideoCapture(int(spec))
+            self.live = True
+        elif os.path.isdir(spec):
+            self.cap = FrameDirectorySource(spec, fps or 30.0)
+        else:
+            self.cap = cv2.VideoCapture(spec)
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frames = 0
+        self.started = time.time()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        success, image = self.cap.read()
+        if success:
+            self.frames += 1
+        return success, image
+
+    def timestamp(self):
+        # Seconds since the start of the stream for the last frame read
+        if self.live:
+            return time.time() - self.started
+        return (self.frames - 1) / self.fps
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(spec=0, fps=None):
+    return CaptureSource(spec, fps)
@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+
+
+def data_dir():
+    # Per-user directory for caches and indexes, overridable with CONDUCTIFY_HOME
+    path = Path(os.environ.get("CONDUCTIFY_HOME") or Path.home() / ".conductify")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def data_path(name):
+    return str(data_dir() / name)
+
+
+def file_identity(path):
+    # (size, mtime) used to tell whether a cached entry is still valid
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
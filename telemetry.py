@@ -0,0 +1,196 @@
+import csv
+import json
+import math
+import os
+import threading
+import time
+
+# Histogram buckets: 20 per decade from 10 us to 100 s
+BUCKET_MIN = 1e-5
+BUCKETS_PER_DECADE = 20
+BUCKET_COUNT = 7 * BUCKETS_PER_DECADE + 1
+
+
+class Histogram:
+    # Log-bucketed latency histogram, constant memory and O(1) per sample
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= BUCKET_MIN:
+            index = 0
+        else:
+            index = min(int(math.log10(seconds / BUCKET_MIN) * BUCKETS_PER_DECADE) + 1, BUCKET_COUNT - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        # Upper edge of the bucket holding the p-th percentile, in seconds
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100.0
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(BUCKET_MIN * 10 ** (index / BUCKETS_PER_DECADE), self.max)
+        return self.max
+
+    def summary(self):
+        # Milliseconds, as exported
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.total / self.count * 1000,
+            "p50": self.percentile(50) * 1000,
+            "p95": self.percentile(95) * 1000,
+            "p99": self.percentile(99) * 1000,
+            "max": self.max * 1000,
+        }
+
+    def merge(self, other):
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {"buckets": self.buckets, "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = list(data["buckets"])
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class Telemetry:
+    # Process-wide stage timings and counters. Every hook returns at once
+    # while disabled, so call sites stay in place in production:
+    #
+    #     start = telemetry.now()
+    #     ...
+    #     telemetry.record("inference", start)
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+            self.remote = {}
+            self.started = time.time()
+
+    def now(self):
+        # Start timestamp for record(), 0.0 while disabled
+        return time.perf_counter() if self.enabled else 0.0
+
+    def record(self, stage, start):
+        if not self.enabled or not start:
+            return
+        self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        # Add a duration measured some other way, e.g. across processes
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.add(seconds)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        # Counter kept elsewhere (e.g. LatestQueue.dropped), stored as is
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = value
+
+    def state(self):
+        # Raw histograms and counters, to be merged by another process
+        with self.lock:
+            return {
+                "histograms": {stage: h.to_dict() for stage, h in self.histograms.items()},
+                "counters": dict(self.counters),
+            }
+
+    def merge_remote(self, source, state):
+        # Latest state() of another process, e.g. the gesture worker
+        with self.lock:
+            self.remote[source] = state
+
+    def combined(self):
+        with self.lock:
+            histograms = {stage: Histogram.from_dict(h.to_dict()) for stage, h in self.histograms.items()}
+            counters = dict(self.counters)
+            remote = list(self.remote.values())
+        for state in remote:
+            for stage, data in state["histograms"].items():
+                histogram = histograms.setdefault(stage, Histogram())
+                histogram.merge(Histogram.from_dict(data))
+            for name, value in state["counters"].items():
+                counters[name] = counters.get(name, 0) + value
+        return histograms, counters
+
+    def report(self):
+        histograms, counters = self.combined()
+        return {
+            "started": self.started,
+            "duration": time.time() - self.started,
+            "stages": {stage: histograms[stage].summary() for stage in sorted(histograms)},
+            "counters": counters,
+        }
+
+    def lines(self):
+        # Short text for the on-screen overlay
+        report = self.report()
+        lines = []
+        for stage, s in report["stages"].items():
+            if s["count"]:
+                lines.append(f"{stage:<18} n={s['count']:<6} p50 {s['p50']:7.2f}  p95 {s['p95']:7.2f}  max {s['max']:7.2f} ms")
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f"{name:<18} {value}")
+        return lines
+
+    def export(self, path):
+        # JSON, or CSV when the path ends in .csv
+        report = self.report()
+        if os.path.splitext(path)[1].lower() == ".csv":
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+                for stage, s in report["stages"].items():
+                    if s["count"]:
+                        writer.writerow([stage, s["count"], f"{s['mean']:.3f}", f"{s['p50']:.3f}",
+                                         f"{s['p95']:.3f}", f"{s['p99']:.3f}", f"{s['max']:.3f}"])
+                for name, value in sorted(report["counters"].items()):
+                    writer.writerow([name, value, "", "", "", "", ""])
+        else:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+        return path
+
+
+# CONDUCTIFY_TELEMETRY=1 enables collection, or names a .json / .csv file
+# the GUI writes the report to on exit
+telemetry = Telemetry(enabled=bool(os.environ.get("CONDUCTIFY_TELEMETRY")))
@@ -0,0 +1,43 @@
+import numpy as np
+
+# Finger columns (x) and joint rows (y) of an upright right hand facing the
+# camera, in normalised image coordinates
+FINGER_X = {1: 0.45, 2: 0.50, 3: 0.55, 4: 0.60}
+MCP_Y, PIP_Y, DIP_Y = 0.60, 0.50, 0.45
+TIP_RAISED_Y, TIP_CURLED_Y = 0.35, 0.62
+
+
+def make_hand(raised=(True, True, True, True, True), pinch=False, dx=0.0, dy=0.0):
+    # (21, 3) landmarks with the given fingers (thumb first) raised, moved by
+    # (dx, dy). A pinch puts the thumb tip on the raised index tip.
+    hand = np.zeros((21, 3), dtype=np.float32)
+    hand[0] = (0.50, 0.80, 0.0)
+    hand[1] = (0.44, 0.75, 0.0)
+    hand[2] = (0.42, 0.70, 0.0)
+    hand[3] = (0.40, 0.66, 0.0)
+    hand[4] = (0.35, 0.62, 0.0) if raised[0] else (0.43, 0.72, 0.0)
+    for finger, x in FINGER_X.items():
+        base = 1 + finger * 4
+        tip_y = TIP_RAISED_Y if raised[finger] else TIP_CURLED_Y
+        hand[base] = (x, MCP_Y, 0.0)
+        hand[base + 1] = (x, PIP_Y, 0.0)
+        hand[base + 2] = (x, DIP_Y if raised[finger] else 0.55, 0.0)
+        hand[base + 3] = (x, tip_y, 0.0)
+    if pinch:
+        hand[4] = hand[8] + (0.01, 0.01, 0.0)
+    hand[:, 0] += dx
+    hand[:, 1] += dy
+    return hand
+
+
+OPEN = (True, True, True, True, True)
+FIST = (False, False, False, False, False)
+POINT = (False, True, False, False, False)
+PEACE = (False, True, True, False, False)
+
+
+def hands(*items):
+    # Stack single hands into a (hands, 21, 3) frame
+    if not items:
+        return np.empty((0, 21, 3), dtype=np.float32)
+    return np.stack(items)
@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+from audio_engine import AudioEngine, GainRamp, RingBuffer, Track, Voice
+
+
+def frames(*values):
+    # (n, 2) float32 block, both channels equal
+    return np.repeat(np.asarray(values, dtype=np.float32)[:, None], 2, axis=1)
+
+
+def constant_track(name, length, value):
+    # int16 samples that mix to `value` at level 1.0
+    return Track(name, None, np.full((length, 2), int(value * 32768), dtype=np.int16))
+
+
+def test_ring_buffer_wraps_around():
+    ring = RingBuffer(8)
+    ring.write(frames(1, 2, 3, 4, 5))
+    out = np.zeros((3, 2), dtype=np.float32)
+    assert ring.read(out) == 3
+    np.testing.assert_array_equal(out, frames(1, 2, 3))
+    # Five more: three at the end of the array, two from the start
+    ring.write(frames(6, 7, 8, 9, 10))
+    assert ring.available() == 7 and ring.space() == 1
+    np.testing.assert_array_equal(ring.data[:2], frames(9, 10))
+    out = np.zeros((7, 2), dtype=np.float32)
+    assert ring.read(out) == 7
+    np.testing.assert_array_equal(out, frames(4, 5, 6, 7, 8, 9, 10))
+    assert (ring.read_pos, ring.write_pos) == (10, 10)
+
+
+def test_ring_buffer_truncate():
+    ring = RingBuffer(8)
+    ring.write(frames(1, 2, 3, 4, 5, 6))
+    ring.read(np.zeros((2, 2), dtype=np.float32))
+    ring.truncate(1)
+    out = np.zeros((4, 2), dtype=np.float32)
+    assert ring.read(out) == 1
+    np.testing.assert_array_equal(out[:1], frames(3))
+    # Keeping more than is buffered changes nothing
+    ring.write(frames(7))
+    ring.truncate(5)
+    assert ring.available() == 1
+
+
+def test_underrun_fills_silence():
+    engine = AudioEngine(rate=1000, block=4)
+    engine.volume.current = engine.volume.target = 1.0
+    engine.ring.write(frames(0.1, 0.2))
+    out = np.full((4, 2), 9.0, dtype=np.float32)
+    engine.callback(out, 4, None, None)
+    np.testing.assert_allclose(out, frames(0.1, 0.2, 0, 0))
+    # Nothing buffered at all
+    out.fill(9.0)
+    engine.callback(out, 4, None, None)
+    assert not out.any()
+    engine.close()
+
+
+def test_paused_output_is_silent_once_ramped_down():
+    engine = AudioEngine(rate=1000, block=4)
+    engine.ring.write(frames(0.5, 0.5, 0.5, 0.5))
+    engine.pause()
+    engine.volume.current = 0.0
+    out = np.full((4, 2), 9.0, dtype=np.float32)
+    engine.callback(out, 4, None, None)
+    assert not out.any()
+    # and the buffered audio is still there for resume()
+    assert engine.ring.available() == 4
+    engine.close()
+
+
+def test_gain_ramp_reaches_its_target_on_the_last_frame():
+    ramp = GainRamp(0.0, seconds=0.004, rate=1000, block=4)
+    ramp.target = 1.0
+    out = frames(1, 1, 1, 1)
+    ramp.apply(out)
+    np.testing.assert_allclose(out[:, 0], [0.25, 0.5, 0.75, 1.0])
+    assert ramp.current == 1.0
+    # At the target: a plain gain, 1.0 leaves the block alone
+    out = frames(1, 1, 1, 1)
+    ramp.apply(out)
+    np.testing.assert_array_equal(out, frames(1, 1, 1, 1))
+
+
+def test_gain_ramp_is_limited_per_block():
+    ramp = GainRamp(1.0, seconds=0.008, rate=1000, block=4)
+    ramp.target = 0.0
+    out = frames(1, 1, 1, 1)
+    ramp.apply(out)
+    np.testing.assert_allclose(out[:, 0], [0.875, 0.75, 0.625, 0.5])
+    assert ramp.current == pytest.approx(0.5)
+    out = frames(1, 1, 1, 1)
+    ramp.apply(out)
+    np.testing.assert_allclose(out[:, 0], [0.375, 0.25, 0.125, 0.0], atol=1e-7)
+    assert ramp.current == 0.0
+    out = frames(1, 1, 1, 1)
+    ramp.apply(out)
+    assert not out.any()
+
+
+def test_voice_applies_level_and_stops_at_the_end():
+    voice = Voice(constant_track("a", 6, 0.5), 1, rate=1000, block=4, level=0.5)
+    out = np.zeros((4, 2), dtype=np.float32)
+    scratch = np.zeros((4, 2), dtype=np.float32)
+    assert voice.mix(out, scratch) == 4
+    np.testing.assert_allclose(out, 0.25)
+    out.fill(0)
+    assert voice.mix(out, scratch) == 2
+    np.testing.assert_allclose(out, frames(0.25, 0.25, 0, 0))
+    assert voice.finished()
+
+
+def mixed_output(engine, blocks):
+    engine.start()
+    with engine.lock:
+        for _ in range(blocks):
+            engine.render()
+    out = np.zeros((engine.ring.available(), 2), dtype=np.float32)
+    engine.ring.read(out)
+    return out[:, 0]
+
+
+def start(engine, first, second):
+    # Play `first` with `second` queued, skipping the decoder
+    engine.serial = 2
+    engine.voices = [Voice(first, 1, rate=engine.rate, block=engine.block)]
+    engine.queued_serial = 2
+    engine.queued = Voice(second, 2, gain=0.0 if engine.crossfade else 1.0, fade=engine.crossfade or 0.03,
+                          rate=engine.rate, block=engine.block)
+
+
+def test_gapless_handover():
+    engine = AudioEngine(rate=1000, block=10, buffer_blocks=40)
+    start(engine, constant_track("a", 95, 0.25), constant_track("b", 100, 0.5))
+    out = mixed_output(engine, 25)
+    np.testing.assert_allclose(out[:95], 0.25, atol=1e-4)
+    np.testing.assert_allclose(out[95:195], 0.5, atol=1e-4)
+    assert not out[195:].any()
+    engine.close()
+
+
+def test_crossfade_sums_to_a_constant_level():
+    # Both tracks at the same level: the fade out and the fade in add up
+    engine = AudioEngine(rate=1000, block=10, buffer_blocks=40, crossfade=0.05)
+    start(engine, constant_track("a", 100, 0.5), constant_track("b", 200, 0.5))
+    out = mixed_output(engine, 30)
+    np.testing.assert_allclose(out[:250], 0.5, atol=1e-3)
+    assert not out[250:].any()
+    engine.close()
+
+
+def test_crossfade_gains():
+    # Different levels show each track's share: linear out, linear in
+    engine = AudioEngine(rate=1000, block=10, buffer_blocks=40, crossfade=0.05)
+    start(engine, constant_track("a", 100, 0.5), constant_track("b", 200, 0.25))
+    out = mixed_output(engine, 30)
+    k = np.arange(1, 51) / 50
+    np.testing.assert_allclose(out[:50], 0.5, atol=1e-3)
+    np.testing.assert_allclose(out[50:100], 0.5 * (1 - k) + 0.25 * k, atol=1e-3)
+    np.testing.assert_allclose(out[100:250], 0.25, atol=1e-3)
+    engine.close()
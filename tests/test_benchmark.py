@@ -0,0 +1,61 @@
+import pytest
+from benchmark import replay_landmarks, score_events
+from recorder import LandmarkRecorder
+
+
+def events(*items):
+    return [{"time": time, "gesture": gesture} for time, gesture in items]
+
+
+def test_perfect_match():
+    labels = events((1.0, "play"), (2.0, "next"))
+    score = score_events(events((1.1, "play"), (1.9, "next")), labels)
+    assert score["matched"] == 2
+    assert score["precision"] == score["recall"] == 1.0
+    assert score["missed"] == score["false_positives"] == []
+
+
+def test_wrong_gesture_and_late_event():
+    labels = events((1.0, "play"), (2.0, "next"))
+    score = score_events(events((1.0, "pause"), (2.5, "next")), labels)
+    assert score["matched"] == 0
+    assert score["missed"] == labels
+    assert score["precision"] == score["recall"] == 0.0
+
+
+def test_each_event_matches_one_label():
+    labels = events((1.0, "next"), (1.2, "next"))
+    score = score_events(events((1.1, "next")), labels)
+    assert score["matched"] == 1
+    assert score["recall"] == 0.5
+    assert score["precision"] == 1.0
+
+
+def test_closest_event_is_matched():
+    labels = events((1.0, "play"))
+    recognised = events((0.8, "play"), (1.05, "play"))
+    score = score_events(recognised, labels)
+    assert score["false_positives"] == [recognised[0]]
+    assert score["precision"] == 0.5
+
+
+def test_tolerance():
+    labels = events((1.0, "play"))
+    assert score_events(events((1.5, "play")), labels, tolerance=0.6)["matched"] == 1
+    assert score_events(events((1.5, "play")), labels)["matched"] == 0
+
+
+def test_empty():
+    assert score_events([], [])["precision"] == 1.0
+    assert score_events([], events((1.0, "play")))["recall"] == 0.0
+
+
+def test_replay_empty_recording(tmp_path):
+    path = tmp_path / "empty.lmk"
+    with LandmarkRecorder(path) as recorder:
+        for i in range(5):
+            recorder.write(i / 30, [])
+    frames, timings, recognised = replay_landmarks(str(path))
+    assert frames == 5
+    assert len(timings["classify"]) == 5
+    assert recognised == []
@@ -0,0 +1,115 @@
+import math
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from classifier import classify, classify_batch, hand_to_array, results_to_arrays
+from synthetic_hands import FIST, OPEN, PEACE, POINT, hands, make_hand
+
+
+# The predicates of the original gestures.py, kept here as the reference
+# the NumPy classifier has to agree with
+
+def baseline_count_fingers(hand_landmarks):
+    fingers = []
+    tips_ids = [4, 8, 12, 16, 20]
+    if hand_landmarks.landmark[tips_ids[0]].x < hand_landmarks.landmark[tips_ids[0] - 1].x:
+        fingers.append(1)
+    else:
+        fingers.append(0)
+    for id in range(1, 5):
+        if hand_landmarks.landmark[tips_ids[id]].y < hand_landmarks.landmark[tips_ids[id] - 2].y:
+            fingers.append(1)
+        else:
+            fingers.append(0)
+    return fingers
+
+
+def baseline_is_pinch(landmarks):
+    thumb_tip = landmarks.landmark[4]
+    index_tip = landmarks.landmark[8]
+    return math.hypot(thumb_tip.x - index_tip.x, thumb_tip.y - index_tip.y) < 0.04
+
+
+def as_landmarks(hand):
+    # MediaPipe-like object for one (21, 3) array
+    return SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in hand])
+
+
+def pinch_at(distance):
+    # Open hand with the thumb tip `distance` to the right of the index tip
+    hand = make_hand(OPEN)
+    hand[4] = hand[8] + (distance, 0.0, 0.0)
+    return hand
+
+
+def level(finger):
+    # Open hand with one finger's tip exactly level with its pip
+    hand = make_hand(OPEN)
+    hand[4 + finger * 4, 1] = hand[2 + finger * 4, 1]
+    return hand
+
+
+CASES = [
+    # name, hand, raised fingers (thumb first), fist, open palm, pinch
+    ("open", make_hand(OPEN), [1, 1, 1, 1, 1], False, True, False),
+    ("fist", make_hand(FIST), [0, 0, 0, 0, 0], True, False, False),
+    ("point", make_hand(POINT), [0, 1, 0, 0, 0], False, False, False),
+    ("peace", make_hand(PEACE), [0, 1, 1, 0, 0], False, False, False),
+    ("thumb only", make_hand((True, False, False, False, False)), [1, 0, 0, 0, 0], False, False, False),
+    ("pinch", make_hand(POINT, pinch=True), [0, 1, 0, 0, 0], False, False, True),
+    ("pinch just inside", pinch_at(0.039), [0, 1, 1, 1, 1], False, False, True),
+    ("pinch just outside", pinch_at(0.041), [0, 1, 1, 1, 1], False, False, False),
+    ("tip level with pip", level(2), [1, 1, 0, 1, 1], False, False, False),
+    ("moved", make_hand(OPEN, dx=0.3, dy=-0.2), [1, 1, 1, 1, 1], False, True, False),
+]
+
+
+@pytest.mark.parametrize("name, hand, fingers, fist, open_palm, pinch", CASES, ids=[case[0] for case in CASES])
+def test_single_hand(name, hand, fingers, fist, open_palm, pinch):
+    features = classify(hand)
+    assert features['fingers'].astype(int).tolist() == fingers
+    assert bool(features['fist']) == fist
+    assert bool(features['open_palm']) == open_palm
+    assert bool(features['pinch']) == pinch
+
+
+@pytest.mark.parametrize("name, hand", [case[:2] for case in CASES], ids=[case[0] for case in CASES])
+def test_matches_baseline(name, hand):
+    landmarks = as_landmarks(hand)
+    fingers = baseline_count_fingers(landmarks)
+    features = classify(hand_to_array(landmarks))
+    assert features['fingers'].astype(int).tolist() == fingers
+    assert bool(features['fist']) == (sum(fingers) == 0)
+    assert bool(features['open_palm']) == (sum(fingers) == 5)
+    assert bool(features['pinch']) == baseline_is_pinch(landmarks)
+
+
+def test_batch_matches_single_hands():
+    batch = hands(*[case[1] for case in CASES])
+    features = classify(batch)
+    for i, (name, hand, fingers, fist, open_palm, pinch) in enumerate(CASES):
+        assert features['fingers'][i].astype(int).tolist() == fingers, name
+        assert bool(features['pinch'][i]) == pinch, name
+    palm = batch[:, [0, 5, 9, 13, 17], :2].mean(axis=1)
+    np.testing.assert_allclose(features['palm_centre'], palm)
+    np.testing.assert_array_equal(features['index_tip'], batch[:, 8, :2])
+
+
+def test_results_to_arrays():
+    assert results_to_arrays(None).shape == (0, 21, 3)
+    assert results_to_arrays(SimpleNamespace(multi_hand_landmarks=None)).shape == (0, 21, 3)
+    open_hand, fist = make_hand(OPEN), make_hand(FIST)
+    results = SimpleNamespace(multi_hand_landmarks=[as_landmarks(open_hand), as_landmarks(fist)])
+    np.testing.assert_allclose(results_to_arrays(results), hands(open_hand, fist))
+
+
+def test_velocity():
+    first, second = make_hand(OPEN), make_hand(OPEN, dx=0.1)
+    assert not classify(first)['tip_velocity'].any()
+    velocity = classify(second, first, 0.5)['tip_velocity']
+    np.testing.assert_allclose(velocity[:, 0], 0.2, rtol=1e-5)
+    np.testing.assert_allclose(velocity[:, 1], 0.0, atol=1e-6)
+    # Recorded streams: per-frame steps, non-increasing timestamps give zero
+    batch = classify_batch(hands(first, second, second), [0.0, 0.5, 0.5])['tip_velocity']
+    assert not batch[0].any() and not batch[2].any()
+    np.testing.assert_allclose(batch[1][:, 0], 0.2, rtol=1e-5)
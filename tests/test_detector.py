@@ -0,0 +1,99 @@
+import pytest
+from detector import GestureDetector, HandState, POSE_EVENTS
+from synthetic_hands import FIST, OPEN, POINT, hands, make_hand
+
+
+def state(now=0.0, pose_events=POSE_EVENTS):
+    return HandState(now, pose_events, confirm=0.1, swipe_window=0.3, swipe_distance=0.15, rest_distance=0.04)
+
+
+def run(hand_state, steps):
+    # steps: (time, pose, index y, palm x) -> all event names with values
+    events = []
+    for now, pose, index_y, palm_x in steps:
+        events.extend(hand_state.step(pose, index_y, palm_x, now))
+    return events
+
+
+def test_pose_fires_after_confirm():
+    hand = state()
+    assert hand.step("open", 0.5, 0.5, 0.0) == []
+    assert hand.step("open", 0.5, 0.5, 0.05) == []
+    assert hand.step("open", 0.5, 0.5, 0.1) == [("play", None)]
+    assert hand.pose == "open"
+
+
+def test_held_pose_fires_once():
+    hand = state()
+    events = run(hand, [(i * 0.05, "open", 0.5, 0.5) for i in range(40)])
+    assert events == [("play", None)]
+
+
+def test_flicker_shorter_than_confirm_is_ignored():
+    hand = state()
+    run(hand, [(i * 0.05, "open", 0.5, 0.5) for i in range(4)])
+    events = run(hand, [(0.2, "fist", 0.5, 0.5), (0.25, "open", 0.5, 0.5), (0.4, "open", 0.5, 0.5)])
+    assert events == []
+    assert hand.pose == "open"
+
+
+def test_pose_transitions():
+    hand = state()
+    steps = [(i * 0.05, "open", 0.5, 0.5) for i in range(4)]
+    steps += [(0.2 + i * 0.05, "fist", 0.5, 0.5) for i in range(4)]
+    steps += [(0.4 + i * 0.05, None, 0.5, 0.5) for i in range(4)]
+    steps += [(0.6 + i * 0.05, "open", 0.5, 0.5) for i in range(4)]
+    assert run(hand, steps) == [("play", None), ("pause", None), ("play", None)]
+
+
+def test_mapped_poses():
+    hand = state(pose_events={**POSE_EVENTS, "peace": "next", "open": "stop"})
+    events = run(hand, [(0.0, "peace", 0.5, 0.5), (0.1, "peace", 0.5, 0.5),
+                        (0.2, "open", 0.5, 0.5), (0.35, "open", 0.5, 0.5)])
+    assert events == [("next", None), ("stop", None)]
+
+
+def test_swipe_fires_once_and_rearms_at_rest():
+    hand = state()
+    # Right across 0.2 in 0.2 s, then keeps drifting: one "next"
+    steps = [(i * 0.05, None, 0.5, 0.3 + i * 0.05) for i in range(5)]
+    steps += [(0.25 + i * 0.05, None, 0.5, 0.55 + i * 0.01) for i in range(3)]
+    assert run(hand, steps) == [("next", None)]
+    # Still for a moment, then a swipe to the left
+    steps = [(0.4 + i * 0.05, None, 0.5, 0.57) for i in range(8)]
+    steps += [(0.8 + i * 0.05, None, 0.5, 0.57 - i * 0.05) for i in range(5)]
+    assert run(hand, steps) == [("previous", None)]
+
+
+def test_slow_drift_is_not_a_swipe():
+    hand = state()
+    assert run(hand, [(i * 0.05, None, 0.5, 0.3 + i * 0.005) for i in range(60)]) == []
+
+
+def test_pinch_drag_volume_without_swipes():
+    hand = state()
+    steps = [(0.0, "pinch", 0.5, 0.5), (0.1, "pinch", 0.5, 0.5)]
+    # Up by 0.05 while also moving sideways
+    steps += [(0.15, "pinch", 0.45, 0.6), (0.2, "pinch", 0.445, 0.7)]
+    events = run(hand, steps)
+    assert [name for name, value in events] == ["volume"]
+    assert events[0][1] == pytest.approx(0.1)
+
+
+def test_detector_users_have_their_own_state():
+    detector = GestureDetector()
+    left, right = make_hand(OPEN, dx=-0.3), make_hand(FIST, dx=0.3)
+    events = []
+    for i in range(4):
+        events += detector.detect_users(hands(left, right), i * 0.05)
+    assert sorted(events) == [(1, "play", None), (2, "pause", None)]
+    # detect() drops the track ids; a pose without an event fires nothing
+    detector = GestureDetector()
+    events = []
+    for i in range(4):
+        events += detector.detect(hands(make_hand(OPEN), make_hand(POINT, dx=0.3)), i * 0.05)
+    assert events == [("play", None)]
+
+
+def test_detector_without_hands():
+    assert GestureDetector().detect_users(hands(), 0.0) == []
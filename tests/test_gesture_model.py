@@ -0,0 +1,119 @@
+import json
+import numpy as np
+import pytest
+from gesture_model import (DEFAULT_MAPPING, KNNGestureModel, landmark_features, load_mapping, load_model,
+                           model_path, train)
+from recorder import LandmarkRecorder
+from synthetic_hands import FIST, OPEN, PEACE, POINT, hands, make_hand
+
+POSES = {"fist": FIST, "open": OPEN, "peace": PEACE, "point": POINT}
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # Everything under data_path() goes to a temporary directory
+    monkeypatch.setenv("CONDUCTIFY_HOME", str(tmp_path))
+    return tmp_path
+
+
+def jittered(pose, count, seed):
+    # `count` samples of one pose, shifted, scaled and with landmark noise
+    rng = np.random.default_rng(seed)
+    samples = []
+    for i in range(count):
+        hand = make_hand(pose, dx=rng.uniform(-0.2, 0.2), dy=rng.uniform(-0.1, 0.1))
+        centre = hand[0].copy()
+        hand = (hand - centre) * rng.uniform(0.7, 1.3) + centre
+        hand[:, :2] += rng.normal(0, 0.003, (21, 2))
+        samples.append(hand)
+    return np.stack(samples).astype(np.float32)
+
+
+def record(root, name, frames):
+    directory = root / "gestures" / name
+    directory.mkdir(parents=True)
+    with LandmarkRecorder(str(directory / "take.lmk")) as recorder:
+        for i, hand in enumerate(frames):
+            recorder.write(i / 30, hands(hand))
+        # Frames without exactly one hand are not used
+        recorder.write(len(frames) / 30, hands())
+        recorder.write(len(frames) / 30, hands(frames[0], frames[1]))
+
+
+def test_features_ignore_position_and_scale():
+    hand = make_hand(PEACE)
+    moved = make_hand(PEACE, dx=0.2, dy=-0.1)
+    scaled = (hand - hand[0]) * 1.5 + hand[0]
+    features = landmark_features(hands(hand, moved, scaled))
+    assert features.shape == (3, 63)
+    np.testing.assert_allclose(features[1], features[0], atol=1e-5)
+    np.testing.assert_allclose(features[2], features[0], atol=1e-5)
+
+
+def test_fit_and_predict(data_dir):
+    for i, (name, pose) in enumerate(POSES.items()):
+        record(data_dir, name, jittered(pose, 40, seed=i))
+    model, accuracy = train()
+    assert model.names == sorted(POSES)
+    assert len(model.samples) == 40 * len(POSES)
+    assert accuracy == 1.0
+    unseen = [jittered(pose, 5, seed=100 + i) for i, pose in enumerate(POSES.values())]
+    predicted = model.predict(landmark_features(np.concatenate(unseen)))
+    assert predicted == [name for name in POSES for _ in range(5)]
+    assert model.predict(np.empty((0, 63))) == []
+
+
+def test_rejection_threshold():
+    samples = landmark_features(np.concatenate([jittered(OPEN, 20, 1), jittered(FIST, 20, 2)]))
+    model = KNNGestureModel(samples, [0] * 20 + [1] * 20, ["open", "fist"], k=3)
+    odd = landmark_features(make_hand((True, False, True, False, True)))
+    # Without a threshold every pose gets the nearest label
+    assert model.predict(odd)[0] in ("open", "fist")
+    nearest = np.sqrt(((samples - odd) ** 2).sum(axis=1)).min()
+    model.max_distance = nearest * 0.9
+    assert model.predict(odd) == [None]
+    model.max_distance = nearest * 1.1
+    assert model.predict(odd) != [None]
+
+
+def test_trained_threshold_rejects_unknown_poses(data_dir):
+    record(data_dir, "open", jittered(OPEN, 40, 1))
+    record(data_dir, "fist", jittered(FIST, 40, 2))
+    model, accuracy = train()
+    assert model.max_distance is not None
+    assert model.predict(landmark_features(jittered(OPEN, 3, 3))) == ["open"] * 3
+    assert model.predict(landmark_features(make_hand((True, False, True, False, True)))) == [None]
+
+
+def test_train_without_recordings(data_dir):
+    with pytest.raises(ValueError):
+        train()
+
+
+@pytest.mark.parametrize("max_distance", [None, 1.25])
+def test_save_load_round_trip(data_dir, max_distance):
+    samples = landmark_features(np.concatenate([jittered(OPEN, 10, 1), jittered(POINT, 10, 2)]))
+    model = KNNGestureModel(samples, [0] * 10 + [1] * 10, ["open", "point"], k=3, max_distance=max_distance)
+    assert load_model() is None
+    model.save(model_path())
+    loaded = load_model()
+    np.testing.assert_array_equal(loaded.samples, model.samples)
+    np.testing.assert_array_equal(loaded.labels, model.labels)
+    assert loaded.names == ["open", "point"]
+    assert loaded.k == 3
+    assert loaded.max_distance == max_distance
+    probe = landmark_features(np.concatenate([jittered(OPEN, 2, 5), jittered(POINT, 2, 6)]))
+    assert loaded.predict(probe) == model.predict(probe)
+
+
+def test_broken_model_file(data_dir):
+    with open(model_path(), "wb") as f:
+        f.write(b"not a model")
+    assert load_model() is None
+
+
+def test_mapping(data_dir):
+    assert load_mapping() == DEFAULT_MAPPING
+    assert json.loads((data_dir / "gestures.json").read_text()) == DEFAULT_MAPPING
+    (data_dir / "gestures.json").write_text(json.dumps({"peace": "next", "point": "explode"}))
+    assert load_mapping() == {"peace": "next"}
@@ -0,0 +1,154 @@
+import threading
+import time
+import pytest
+from player_actor import PlayerActor, coalesce, merge
+
+
+def commands(*pairs):
+    return [(name, value, None) for name, value in pairs]
+
+
+def names(merged):
+    return [(name, value) for name, value, stamp in merged]
+
+
+def test_merge():
+    assert merge(("skip", 1), ("skip", 2)) == ("skip", 3)
+    assert merge(("seek", 10), ("seek", 20)) == ("seek", 20)
+    assert merge(("play", None), ("pause", None)) == ("pause", None)
+    assert merge(("volume", 0.1), ("set_volume", 0.5)) == ("set_volume", 0.5)
+    assert merge(("set_volume", 0.5), ("volume", 0.1)) == ("set_volume", 0.6)
+    assert merge(("seek", 10), ("play", None)) is None
+
+
+def test_coalesce_bursts():
+    burst = commands(("volume", 0.1), ("volume", 0.1), ("skip", 1), ("skip", 1), ("skip", -1),
+                     ("play", None), ("pause", None), ("play", None))
+    assert names(coalesce(burst)) == [("volume", 0.2), ("skip", 1), ("play", None)]
+
+
+def test_skips_that_cancel_out_are_dropped():
+    assert coalesce(commands(("skip", 1), ("skip", -1))) == []
+
+
+def test_volume_merges_across_other_commands_but_not_calls():
+    merged = coalesce(commands(("volume", 0.1), ("seek", 5), ("volume", 0.1)))
+    assert names(merged) == [("volume", 0.2), ("seek", 5)]
+    merged = coalesce(commands(("volume", 0.1), ("call", "f"), ("volume", 0.1)))
+    assert names(merged) == [("volume", 0.1), ("call", "f"), ("volume", 0.1)]
+
+
+def test_order_is_kept_for_unrelated_commands():
+    burst = commands(("select", 3), ("seek", 10), ("select", 5))
+    assert names(coalesce(burst)) == [("select", 3), ("seek", 10), ("select", 5)]
+
+
+def test_merged_command_keeps_the_oldest_stamp():
+    merged = coalesce([("skip", 1, 5.0), ("skip", 1, None), ("skip", 1, 3.0)])
+    assert merged == [("skip", 3, 3.0)]
+
+
+class FakePlayer:
+    def __init__(self, tracks=6):
+        self.playlist = [f"{i}.mp3" for i in range(tracks)]
+        self.current_track_index = 0
+        self.music_file = self.playlist[0]
+        self.is_playing = True
+        self.is_paused = False
+        self.volume = 0.5
+        self.jumps = []
+
+    def get_volume(self):
+        return self.volume
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def get_position(self):
+        return 42.0
+
+    def step(self, steps, index=None):
+        index = self.current_track_index if index is None else index
+        return (index + steps) % len(self.playlist)
+
+    def jump(self, index):
+        self.jumps.append((index, time.monotonic()))
+        self.current_track_index = index
+        self.music_file = self.playlist[index]
+
+    select_track = jump
+
+    def pause(self):
+        self.is_playing = False
+        self.is_paused = True
+
+    def seek(self, seconds):
+        pass
+
+    def poll(self):
+        return []
+
+
+class Events:
+    # Collects on_event calls from the actor thread
+    def __init__(self):
+        self.items = []
+        self.cond = threading.Condition()
+
+    def __call__(self, name, state):
+        with self.cond:
+            self.items.append((name, state))
+            self.cond.notify_all()
+
+    def wait(self, predicate, timeout=2.0):
+        with self.cond:
+            assert self.cond.wait_for(lambda: any(predicate(*item) for item in self.items), timeout)
+
+
+@pytest.fixture
+def actor():
+    events = Events()
+    actor = PlayerActor(FakePlayer(), events, settle=0.1)
+    actor.events = events
+    yield actor
+    actor.stop()
+
+
+def test_skips_are_debounced(actor):
+    player = actor.player
+    for _ in range(3):
+        actor.send("skip", 1)
+    actor.events.wait(lambda name, state: state["pending_skip"])
+    pending = [state for name, state in actor.events.items if state["pending_skip"]][-1]
+    assert pending["index"] == 3
+    assert pending["position"] == 0.0
+    actor.events.wait(lambda name, state: not state["pending_skip"] and state["index"] == 3)
+    # Only the track the user settled on is loaded
+    assert [index for index, stamp in player.jumps] == [3]
+
+
+def test_advance_skips_the_debounce(actor):
+    sent = time.monotonic()
+    actor.send("advance", 1)
+    actor.events.wait(lambda name, state: state["index"] == 1)
+    index, jumped = actor.player.jumps[0]
+    assert index == 1
+    assert jumped - sent < actor.settle
+    assert actor.target is None
+
+
+def test_volume_is_clamped(actor):
+    actor.send("volume", 0.4)
+    actor.send("volume", 0.4)
+    actor.events.wait(lambda name, state: state["volume"] == 1.0)
+
+
+def test_arbiter_turns_down_other_users(actor):
+    class Arbiter:
+        def admit(self, user, name):
+            return user == "owner"
+
+    actor.arbiter = Arbiter()
+    assert actor.send("pause", user="someone") is False
+    assert actor.send("pause", user="owner") is True
+    assert actor.send("pause") is True
@@ -0,0 +1,179 @@
+import pytest
+from playlist_view import PlaylistView
+
+
+class FakeListbox:
+    # The parts of tk.Listbox the view uses
+    def __init__(self):
+        self.items = []
+        self.selection = set()
+
+    def delete(self, first, last=None):
+        if last is None:
+            del self.items[first]
+        else:
+            del self.items[first:]
+            self.selection.clear()
+
+    def insert(self, index, *items):
+        if index == "end":
+            self.items.extend(items)
+        else:
+            self.items[index:index] = items
+
+    def selection_set(self, row):
+        self.selection.add(row)
+
+    def selection_clear(self, row):
+        self.selection.discard(row)
+
+    def curselection(self):
+        return tuple(sorted(self.selection))
+
+
+class FakeScrollbar:
+    def __init__(self):
+        self.position = None
+
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+@pytest.fixture
+def view():
+    # The view's logic without a Tk display: state as __init__ sets it up,
+    # with fake widgets
+    view = PlaylistView.__new__(PlaylistView)
+    view.rows = 5
+    view.count = 0
+    view.top = 0
+    view.selected = None
+    view.row_text = lambda index: ""
+    view.listbox = FakeListbox()
+    view.scrollbar = FakeScrollbar()
+    view.events = []
+    view.event_generate = view.events.append
+    return view
+
+
+def text(index):
+    return f"track {index}"
+
+
+def visible(view):
+    return view.listbox.items
+
+
+def test_only_the_visible_window_is_rendered(view):
+    view.set_model(1000, text)
+    assert visible(view) == [text(i) for i in range(5)]
+    assert view.scrollbar.position == (0.0, 5 / 1000)
+
+
+def test_short_model(view):
+    view.set_model(3, text)
+    assert visible(view) == [text(0), text(1), text(2)]
+    assert view.scrollbar.position == (0.0, 1.0)
+    # Nothing to scroll
+    view.scroll(2)
+    assert view.top == 0
+    view.set_model(0, text)
+    assert visible(view) == [] and view.scrollbar.position == (0.0, 1.0)
+
+
+@pytest.mark.parametrize("rows, top", [(3, 3), (-2, 0), (10_000, 95), (94, 94)])
+def test_scroll_is_clamped(view, rows, top):
+    view.set_model(100, text)
+    view.scroll(rows)
+    assert view.top == top
+    assert visible(view) == [text(i) for i in range(top, top + 5)]
+
+
+def test_scrollbar_protocol(view):
+    view.set_model(100, text)
+    view.yview("moveto", "0.5")
+    assert view.top == 50
+    view.yview("scroll", "1", "pages")
+    assert view.top == 55
+    view.yview("scroll", "-2", "units")
+    assert view.top == 53
+    assert view.scrollbar.position == (0.53, 0.58)
+
+
+def test_see(view):
+    view.set_model(100, text)
+    view.see(20)
+    assert view.top == 16
+    view.see(18)
+    assert view.top == 16
+    view.see(3)
+    assert view.top == 3
+
+
+def test_selection_maps_model_index_to_row(view):
+    view.set_model(100, text)
+    view.scroll_to(40)
+    view.select(42)
+    assert view.listbox.curselection() == (2,)
+    assert view.curselection() == (42,)
+    view.select(44)
+    assert view.listbox.curselection() == (4,)
+    # Out of view: scrolls so it is the last row
+    view.select(70)
+    assert view.top == 66
+    assert view.listbox.curselection() == (4,)
+    # Scrolled away and back, the selection follows its index
+    view.scroll_to(0)
+    assert view.listbox.curselection() == ()
+    view.scroll_to(68)
+    assert view.listbox.curselection() == (2,)
+
+
+def test_clicked_row_maps_back_to_model_index(view):
+    view.set_model(100, text)
+    view.scroll_to(30)
+    view.listbox.selection_set(3)
+    view.on_listbox_select(None)
+    assert view.selected == 33
+    assert view.events == ["<<ListboxSelect>>"]
+
+
+def test_keyboard_selection_stays_in_range(view):
+    view.set_model(10, text)
+    view.select(9)
+    view.move_selection(1)
+    assert view.selected == 9
+    view.select(0)
+    view.move_selection(-1)
+    assert view.selected == 0
+
+
+def test_append_renders_only_when_visible(view):
+    view.set_model(3, text)
+    view.append(4)
+    assert visible(view) == [text(i) for i in range(5)]
+    view.listbox.items = ["stale"] * 5
+    view.append(10)
+    assert visible(view) == ["stale"] * 5
+    assert view.count == 17
+    assert view.scrollbar.position == (0.0, 5 / 17)
+
+
+def test_refresh_row(view):
+    view.set_model(100, text)
+    view.scroll_to(10)
+    view.select(12)
+    view.row_text = lambda index: f"updated {index}"
+    view.refresh_row(12)
+    view.refresh_row(50)
+    assert visible(view) == [text(10), text(11), "updated 12", text(13), text(14)]
+    assert view.listbox.curselection() == (2,)
+
+
+def test_model_shrinking_drops_selection_and_clamps(view):
+    view.set_model(100, text)
+    view.select(90)
+    view.set_model(20, text)
+    assert view.selected is None
+    assert view.top == 15
+    assert visible(view) == [text(i) for i in range(15, 20)]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from recorder import LandmarkRecorder, load_landmarks, read_landmarks
+
+
+def hands(count, seed):
+    return np.random.default_rng(seed).random((count, 21, 3), dtype=np.float32)
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "session.lmk"
+    frames = [(0.0, hands(1, 0)), (0.033, hands(0, 1)), (0.066, hands(2, 2))]
+    with LandmarkRecorder(path) as recorder:
+        for timestamp, frame in frames:
+            recorder.write(timestamp, frame)
+    assert recorder.frames == 3
+    read = list(read_landmarks(path))
+    assert [timestamp for timestamp, frame in read] == [0.0, 0.033, 0.066]
+    for (_, written), (_, loaded) in zip(frames, read):
+        assert loaded.shape == written.shape
+        np.testing.assert_array_equal(loaded, written)
+
+
+def test_load_landmarks(tmp_path):
+    path = tmp_path / "session.lmk"
+    with LandmarkRecorder(path) as recorder:
+        recorder.write(1.5, hands(1, 3))
+        recorder.write(2.5, hands(1, 4))
+    timestamps, frames = load_landmarks(path)
+    np.testing.assert_array_equal(timestamps, [1.5, 2.5])
+    np.testing.assert_array_equal(frames[1], hands(1, 4))
+
+
+def test_flat_landmarks_are_reshaped(tmp_path):
+    path = tmp_path / "session.lmk"
+    with LandmarkRecorder(path) as recorder:
+        recorder.write(0.0, hands(2, 5).reshape(-1))
+    (_, frame), = read_landmarks(path)
+    assert frame.shape == (2, 21, 3)
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"RIFF0000")
+    with pytest.raises(ValueError):
+        list(read_landmarks(path))
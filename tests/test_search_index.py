@@ -0,0 +1,112 @@
+import time
+import pytest
+from search_index import TrackSearchIndex, normalise
+
+
+def built(keys, texts=None):
+    index = TrackSearchIndex()
+    rebuild(index, keys, texts)
+    return index
+
+
+def rebuild(index, keys, texts=None):
+    texts = texts or {}
+    index.build_async(keys, lambda key: texts.get(key, key))
+    deadline = time.monotonic() + 5
+    while index.search("x") is None:
+        assert time.monotonic() < deadline, "index build did not finish"
+        time.sleep(0.01)
+
+
+PLAYLIST = ["Abba - Waterloo.mp3", "Beyoncé - Halo.flac", "Sigur Rós - Hoppípolla.ogg",
+            "Queen - Bohemian Rhapsody.mp3", "Motörhead - Ace of Spades.mp3"]
+
+
+def test_normalise():
+    assert normalise("  Sigur   RÓS\tHoppípolla ") == "sigur ros hoppipolla"
+    assert normalise("Straße") == "strasse"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("queen", [3]),
+    ("QUEEN", [3]),
+    ("bohemian queen", [3]),
+    ("beyonce", [1]),
+    ("BEYONCÉ", [1]),
+    ("hoppipolla ros", [2]),
+    ("motorhead", [4]),
+    ("mp3", [0, 3, 4]),
+    ("queen halo", []),
+    ("zzz", []),
+])
+def test_search(query, expected):
+    assert built(PLAYLIST).search(query) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    # Words shorter than a trigram are checked against every track's text
+    ("o", [0, 1, 2, 3, 4]),
+    ("ó", [0, 1, 2, 3, 4]),
+    ("ha", [1, 3]),
+    ("ro", [2]),
+    ("ab", [0]),
+    # and narrowed by the longer words of the query
+    ("ha lo", [1]),
+    ("of spades", [4]),
+    ("", []),
+    ("   ", []),
+])
+def test_short_queries(query, expected):
+    assert built(PLAYLIST).search(query) == expected
+
+
+def test_limit():
+    assert built(PLAYLIST).search("mp3", limit=2) == [0, 3]
+
+
+def test_tags_update_the_text():
+    index = built(PLAYLIST)
+    assert index.search("sunshine") == []
+    index.update(PLAYLIST[3], "Queen - Bohemian Rhapsody.mp3 Queen A Night at the Opéra Sunshine")
+    assert index.search("sunshine opera") == [3]
+
+
+def test_added_tracks():
+    index = built(PLAYLIST)
+    index.add("Björk - Jóga.mp3", "Björk - Jóga.mp3")
+    assert index.search("bjork joga") == [5]
+
+
+def test_removal_after_library_changes():
+    # apply_library_changes rebuilds from the playlist without the removed tracks
+    index = built(PLAYLIST)
+    assert index.search("halo") == [1]
+    playlist = [track for track in PLAYLIST if track != PLAYLIST[1]]
+    rebuild(index, playlist)
+    assert index.search("halo") == []
+    assert index.search("beyonce") == []
+    # ids follow the new playlist
+    assert index.search("queen") == [2]
+    assert index.search("motorhead") == [3]
+
+
+def test_changes_during_a_rebuild_are_replayed():
+    index = TrackSearchIndex()
+    release = []
+
+    def slow_text(key):
+        while not release:
+            time.sleep(0.001)
+        return key
+
+    index.build_async(PLAYLIST[:2], slow_text)
+    assert index.search("abba") is None
+    index.add("Daft Punk - One More Time.mp3", "Daft Punk - One More Time.mp3")
+    index.update(PLAYLIST[0], "Abba - Waterloo.mp3 Eurovision")
+    release.append(True)
+    deadline = time.monotonic() + 5
+    while index.search("x") is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert index.search("daft") == [2]
+    assert index.search("eurovision") == [0]
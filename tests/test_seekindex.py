@@ -0,0 +1,171 @@
+import io
+import os
+import time
+import pytest
+from seekindex import OffsetFile, SeekIndexService, build_frame_index, id3v2_size, parse_header
+from storage import file_identity
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz: 417 bytes, 418 with padding
+MPEG1 = b"\xff\xfb\x90\x00"
+MPEG1_PADDED = b"\xff\xfb\x92\x00"
+# MPEG-2 Layer III, 64 kbit/s, 22.05 kHz: 208 bytes
+MPEG2 = b"\xff\xf3\x80\x00"
+
+
+def frame(header, length, body=b""):
+    return (header + body).ljust(length, b"\x00")
+
+
+def id3_tag(size, footer=False):
+    # ID3v2 header with a syncsafe size, followed by `size` bytes
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x04\x00" + (b"\x10" if footer else b"\x00") + syncsafe + b"\x00" * (size + (10 if footer else 0))
+
+
+def mp3(frames=10, tag=b"", xing=True, junk=b"", id3v1=True):
+    # Audio frames alternating padding, with a junk gap after the first half
+    data = bytearray(tag)
+    offsets = []
+    if xing:
+        data += frame(MPEG1, 417, b"\x00" * 32 + b"Xing")
+    for i in range(frames):
+        if i == frames // 2:
+            data += junk
+        offsets.append(len(data))
+        data += frame(MPEG1_PADDED, 418) if i % 2 else frame(MPEG1, 417)
+    if id3v1:
+        data += b"TAG".ljust(128, b"\x00")
+    return bytes(data), offsets
+
+
+def test_parse_header():
+    assert parse_header(MPEG1, 0) == (417, 44100, 1152)
+    assert parse_header(MPEG1_PADDED, 0) == (418, 44100, 1152)
+    assert parse_header(MPEG2, 0) == (208, 22050, 576)
+
+
+@pytest.mark.parametrize("header", [
+    b"\xff\xfd\x90\x00",  # layer II
+    b"\xff\xfb\xf0\x00",  # bad bitrate
+    b"\xff\xfb\x0c\x00",  # reserved sample rate
+    b"\xff\xeb\x90\x00",  # reserved version
+    b"\xfe\xfb\x90\x00",  # no sync
+    b"\xff\xfb",          # truncated
+])
+def test_parse_header_rejects(header):
+    assert parse_header(header, 0) is None
+
+
+def test_id3v2_size():
+    assert id3v2_size(b"no tag here") == 0
+    assert id3v2_size(id3_tag(300)) == 310
+    assert id3v2_size(id3_tag(300, footer=True)) == 320
+
+
+def test_frame_index_skips_tags_and_xing():
+    tag = id3_tag(1000)
+    data, offsets = mp3(frames=12, tag=tag)
+    index = build_frame_index(data)
+    assert list(index.offsets) == offsets
+    assert offsets[0] == len(tag) + 417
+    assert index.sample_rate == 44100
+    assert index.duration() == pytest.approx(12 * 1152 / 44100)
+
+
+def test_frame_index_resyncs_after_junk():
+    data, offsets = mp3(frames=8, junk=b"\x12\xff\x00\xff\xfb" + b"\x34" * 50)
+    assert list(build_frame_index(data).offsets) == offsets
+
+
+def test_frame_index_without_xing_keeps_the_first_frame():
+    data, offsets = mp3(frames=4, xing=False, id3v1=False)
+    assert list(build_frame_index(data).offsets) == offsets
+
+
+def test_not_an_mp3():
+    assert build_frame_index(b"RIFF" + b"\x00" * 4000) is None
+    assert build_frame_index(b"") is None
+
+
+def test_locate():
+    data, offsets = mp3(frames=10)
+    index = build_frame_index(data)
+    duration = 1152 / 44100
+    assert index.locate(0) == (offsets[0], 0.0)
+    assert index.locate(3.5 * duration) == (offsets[3], pytest.approx(3 * duration))
+    assert index.locate(-1) == (offsets[0], 0.0)
+    assert index.locate(1000) == (offsets[-1], pytest.approx(9 * duration))
+
+
+def test_offset_file():
+    view = OffsetFile(io.BytesIO(b"0123456789"), 4)
+    assert view.read(3) == b"456"
+    assert view.tell() == 3
+    view.seek(-2, os.SEEK_END)
+    assert view.read() == b"89"
+    view.seek(1)
+    view.seek(2, os.SEEK_CUR)
+    assert view.read(1) == b"7"
+    view.seek(-10)
+    assert view.tell() == 0
+
+
+def test_offset_file_can_leave_the_source_open():
+    source = io.BytesIO(b"0123456789")
+    view = OffsetFile(source, 4, close_source=False)
+    view.close()
+    assert view.closed and not source.closed
+    assert OffsetFile(source, 8).read() == b"89"
+
+
+def wait_for(service, path):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with service.lock:
+            if path in service.indexes:
+                return service.indexes[path]
+        time.sleep(0.01)
+    raise AssertionError(f"no index for {path}")
+
+
+def test_service_caches_by_size_and_mtime(tmp_path):
+    path = str(tmp_path / "track.mp3")
+    data, offsets = mp3(frames=6)
+    with open(path, "wb") as f:
+        f.write(data)
+    db = str(tmp_path / "seekindex.db")
+
+    service = SeekIndexService(db)
+    service.request(path)
+    assert list(wait_for(service, path).offsets) == offsets
+    service.shutdown()
+
+    # A new service finds the table in the cache
+    service = SeekIndexService(db)
+    size, mtime = file_identity(path)
+    assert list(service._cached(path, (size, mtime)).offsets) == offsets
+    # but not for a file that changed since
+    assert service._cached(path, (size + 1, mtime)) is None
+    service.request(str(tmp_path / "track.flac"))
+    assert service.get(str(tmp_path / "track.flac")) is None
+    service.shutdown()
+
+
+def test_service_keeps_the_most_recently_used_indexes(tmp_path):
+    data, offsets = mp3(frames=4)
+    paths = []
+    for i in range(4):
+        paths.append(str(tmp_path / f"track{i}.mp3"))
+        with open(paths[-1], "wb") as f:
+            f.write(data)
+    service = SeekIndexService(str(tmp_path / "seekindex.db"), max_indexes=2)
+    for path in paths[:2]:
+        service.request(path)
+        wait_for(service, path)
+    # Using the first one keeps it over the second
+    assert service.get(paths[0]) is not None
+    service.request(paths[2])
+    wait_for(service, paths[2])
+    assert list(service.indexes) == [paths[0], paths[2]]
+    assert service.get(paths[1]) is None
+    service.shutdown()
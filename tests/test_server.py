@@ -0,0 +1,252 @@
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import urllib.error
+import urllib.request
+import pytest
+from server import WS_GUID, ControlServer
+
+
+class FakeActor:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, name, value=None):
+        self.sent.append((name, value))
+
+
+class FakeMaster:
+    # Runs `after` callbacks at once instead of on a Tk loop
+    def after(self, delay, callback):
+        callback()
+
+
+class FakePlayer:
+    def is_audio_file(self, path):
+        return path.endswith(".mp3")
+
+
+class FakeGui:
+    def __init__(self):
+        self.actor = FakeActor()
+        self.master = FakeMaster()
+        self.player = FakePlayer()
+        self.playlist = [f"/music/{i}.mp3" for i in range(250)]
+        self.changes = []
+
+    def set_playlist(self, paths, message):
+        self.changes.append(("set", paths))
+
+    def apply_library_changes(self, added, removed):
+        self.changes.append(("library", added, removed))
+
+
+@pytest.fixture
+def server():
+    server = ControlServer(FakeGui(), port=0)
+    assert server.start()
+    yield server
+    server.stop()
+
+
+def request(server, path, data=None, headers=None):
+    # (status, decoded JSON) of one HTTP request, POST when `data` is given
+    body = None if data is None else json.dumps(data).encode()
+    req = urllib.request.Request(f"http://127.0.0.1:{server.port}{path}", data=body, headers=headers or {})
+    if data is not None and headers is None:
+        req.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class WebSocket:
+    # Minimal client: handshake, masked text frames out, frames in
+    def __init__(self, server, origin=None, host=None):
+        self.sock = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+        self.key = base64.b64encode(os.urandom(16)).decode()
+        lines = ["GET /ws HTTP/1.1", f"Host: {host or f'localhost:{server.port}'}", "Upgrade: websocket", "Connection: Upgrade",
+                 f"Sec-WebSocket-Key: {self.key}", "Sec-WebSocket-Version: 13"]
+        if origin:
+            lines.append(f"Origin: {origin}")
+        self.sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode())
+        self.file = self.sock.makefile("rb")
+        self.status = self.file.readline().decode()
+        self.headers = {}
+        while True:
+            line = self.file.readline().decode().strip()
+            if not line:
+                break
+            name, value = line.split(":", 1)
+            self.headers[name.lower()] = value.strip()
+
+    def send(self, data, opcode=1):
+        payload = json.dumps(data).encode() if opcode == 1 else data
+        mask = os.urandom(4)
+        assert len(payload) < 126
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.sock.sendall(bytes([0x80 | opcode, 0x80 | len(payload)]) + mask + masked)
+
+    def receive(self):
+        # (opcode, payload)
+        first, second = self.file.read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self.file.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self.file.read(8))[0]
+        return first & 0x0F, self.file.read(length)
+
+    def receive_json(self):
+        opcode, payload = self.receive()
+        assert opcode == 1
+        return json.loads(payload)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def test_transport_commands_reach_the_actor(server):
+    for path, data in [("/play", {}), ("/pause", {}), ("/next", {}), ("/previous", {}),
+                       ("/seek", {"position": 12.5}), ("/volume", {"volume": 0.4}), ("/select", {"index": 3})]:
+        assert request(server, path, data) == (200, {"ok": True})
+    assert server.gui.actor.sent == [("play", None), ("pause", None), ("skip", 1), ("skip", -1),
+                                     ("seek", 12.5), ("set_volume", 0.4), ("select", 3)]
+
+
+@pytest.mark.parametrize("path, data", [
+    ("/seek", {}),
+    ("/volume", {"volume": "loud"}),
+    ("/volume", {"volume": True}),
+    ("/select", {"index": 250}),
+    ("/playlist", {"paths": "a.mp3"}),
+    ("/playlist", {"paths": ["notes.txt"]}),
+])
+def test_invalid_commands_are_rejected(server, path, data):
+    status, result = request(server, path, data)
+    assert status == 400
+    assert "error" in result
+    assert server.gui.actor.sent == []
+
+
+def test_unknown_routes(server):
+    assert request(server, "/rewind", {})[0] == 404
+    assert request(server, "/nothing")[0] == 404
+
+
+def test_post_needs_json_from_a_local_origin(server):
+    assert request(server, "/play", {}, headers={"Content-Type": "text/plain"})[0] == 403
+    assert request(server, "/play", {}, headers={"Content-Type": "application/json",
+                                                  "Origin": "https://example.com"})[0] == 403
+    assert request(server, "/play", {}, headers={"Content-Type": "application/json",
+                                                  "Origin": "http://localhost:3000"})[0] == 200
+    assert server.gui.actor.sent == [("play", None)]
+
+
+def raw_status(server, host_line):
+    # Status line of a GET /state sent with the given Host header line
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+        sock.sendall(f"GET /state HTTP/1.1\r\n{host_line}Connection: close\r\n\r\n".encode())
+        return sock.makefile("rb").readline().decode()
+
+
+@pytest.mark.parametrize("host", ["localhost:{port}", "127.0.0.1:{port}", "[::1]:{port}", "LOCALHOST:{port}"])
+def test_loopback_hosts_are_served(server, host):
+    assert raw_status(server, f"Host: {host.format(port=server.port)}\r\n").startswith("HTTP/1.1 200")
+
+
+@pytest.mark.parametrize("host", ["evil.example:{port}", "localhost", "localhost:{other}", "127.0.0.1:x", ""])
+def test_other_hosts_are_refused(server, host):
+    # DNS rebinding: a remote name resolving to 127.0.0.1 keeps its own Host
+    line = f"Host: {host.format(port=server.port, other=server.port + 1)}\r\n" if host else ""
+    assert raw_status(server, line).startswith("HTTP/1.1 403")
+    assert server.gui.actor.sent == []
+
+
+def test_state_and_playlist(server):
+    assert request(server, "/state") == (200, None)
+    server.publish_state({"index": 2, "is_playing": True})
+    assert request(server, "/state") == (200, {"index": 2, "is_playing": True})
+    status, page = request(server, "/playlist?offset=240&limit=5")
+    assert status == 200
+    assert page == {"total": 250, "offset": 240, "tracks": [f"/music/{i}.mp3" for i in range(240, 245)]}
+    assert request(server, "/playlist?offset=abc")[0] == 400
+
+
+def test_playlist_changes_go_through_the_gui(server):
+    assert request(server, "/playlist", {"paths": ["a.mp3", "b.txt"]})[0] == 200
+    assert request(server, "/playlist/add", {"paths": ["c.mp3"]})[0] == 200
+    assert request(server, "/playlist/remove", {"paths": ["a.mp3"]})[0] == 200
+    assert server.gui.changes == [("set", ["a.mp3"]), ("library", ["c.mp3"], []), ("library", [], ["a.mp3"])]
+
+
+def test_websocket_handshake_and_commands(server):
+    ws = WebSocket(server)
+    try:
+        assert ws.status.startswith("HTTP/1.1 101")
+        expected = base64.b64encode(hashlib.sha1((ws.key + WS_GUID).encode()).digest()).decode()
+        assert ws.headers["sec-websocket-accept"] == expected
+        assert ws.receive_json() == {"state": None, "events": []}
+
+        ws.send({"command": "volume", "volume": 0.9})
+        assert ws.receive_json() == {"ok": True, "reply": "volume"}
+        ws.send({"command": "seek"})
+        assert "error" in ws.receive_json()
+        ws.send({"nothing": 1})
+        assert "error" in ws.receive_json()
+        assert server.gui.actor.sent == [("set_volume", 0.9)]
+
+        ws.send(b"ping", opcode=9)
+        assert ws.receive() == (10, b"ping")
+    finally:
+        ws.close()
+
+
+def test_websocket_updates_are_batched(server):
+    ws = WebSocket(server)
+    try:
+        ws.receive_json()
+        server.publish_event("gesture", message="Gesture: Next Track")
+        for position in range(100):
+            server.publish_state({"index": 1, "position": position})
+        server.publish_event("player", name="ended")
+        # One message with the newest state and every event since the last one
+        assert ws.receive_json() == {
+            "state": {"index": 1, "position": 99},
+            "events": [{"type": "gesture", "message": "Gesture: Next Track"}, {"type": "player", "name": "ended"}],
+        }
+    finally:
+        ws.close()
+
+
+def test_websocket_from_another_site_is_refused(server):
+    ws = WebSocket(server, origin="https://example.com")
+    try:
+        assert ws.status.startswith("HTTP/1.1 403")
+    finally:
+        ws.close()
+
+
+def test_websocket_with_another_host_is_refused(server):
+    ws = WebSocket(server, host=f"evil.example:{server.port}")
+    try:
+        assert ws.status.startswith("HTTP/1.1 403")
+    finally:
+        ws.close()
+
+
+def test_stop_with_open_websocket(server, caplog):
+    ws = WebSocket(server)
+    try:
+        ws.receive_json()
+        server.stop()
+        assert not server.thread.is_alive()
+        assert not [record for record in caplog.records if record.name == "asyncio"]
+    finally:
+        ws.close()
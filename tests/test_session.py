@@ -0,0 +1,115 @@
+import sqlite3
+import pytest
+from session import DEFAULTS, VERSION, SessionStore
+from shuffle import ShuffleEngine
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "session.db")
+
+
+def test_no_session_yet(path):
+    store = SessionStore(path)
+    assert store.load() is None
+    store.close()
+
+
+def test_round_trip(path):
+    playlist = ["/music/a.mp3", "/music/ünïcode/b.flac", "/music/c d.ogg"]
+    store = SessionStore(path, interval=60)
+    store.save_playlist(playlist)
+    store.update(index=2, position=31.5, volume=0.8, loop_mode="All", shuffle_mode=False)
+    store.close()
+
+    store = SessionStore(path)
+    session = store.load()
+    assert session["playlist"] == playlist
+    assert session["index"] == 2
+    assert session["position"] == 31.5
+    assert session["volume"] == 0.8
+    assert session["loop_mode"] == "All"
+    assert session["shuffle_mode"] is False
+    assert session["shuffle"] is None
+    store.close()
+
+
+def test_defaults_fill_missing_fields(path):
+    store = SessionStore(path)
+    store.save_playlist(["/music/a.mp3"])
+    store.flush()
+    assert store.load() == dict(DEFAULTS, playlist=["/music/a.mp3"], shuffle=None)
+    store.close()
+
+
+def test_paths_that_are_not_valid_utf8(path):
+    # os.fsdecode of undecodable bytes gives surrogate escapes
+    playlist = ["/music/\udcff\udcfe.mp3", "/music/plain.mp3"]
+    store = SessionStore(path)
+    store.save_playlist(playlist)
+    store.flush()
+    assert store.load()["playlist"] == playlist
+    store.close()
+
+
+def test_shuffle_round_trip(path):
+    engine = ShuffleEngine(50, start=3, seed=7)
+    for _ in range(10):
+        engine.next()
+    store = SessionStore(path)
+    store.save_playlist([f"/music/{i}.mp3" for i in range(50)])
+    store.save_shuffle(engine.state())
+    store.update(shuffle_mode=True)
+    store.close()
+
+    store = SessionStore(path)
+    session = store.load()
+    restored = ShuffleEngine.from_state(session["shuffle"])
+    assert [restored.next() for _ in range(20)] == [engine.next() for _ in range(20)]
+    # Turning shuffle off clears the saved order
+    store.save_shuffle(None)
+    store.flush()
+    assert store.load()["shuffle"] is None
+    store.close()
+
+
+def test_changes_are_batched(path):
+    store = SessionStore(path, interval=60)
+    store.update(index=1)
+    store.update(index=2, volume=0.1)
+    store.save_playlist(["/a.mp3"])
+    # Nothing written until the flush
+    reader = SessionStore(path)
+    assert reader.load() is None
+    store.flush()
+    session = reader.load()
+    assert (session["index"], session["volume"], session["playlist"]) == (2, 0.1, ["/a.mp3"])
+    # Fields not touched since keep their saved value
+    store.update(position=12.0)
+    store.flush()
+    assert reader.load()["index"] == 2
+    reader.close()
+    store.close()
+
+
+def test_timer_flushes(path):
+    store = SessionStore(path, interval=0.01)
+    store.save_playlist(["/a.mp3"])
+    timer = store.timer
+    timer.join(2.0)
+    assert store.timer is None
+    assert store.load()["playlist"] == ["/a.mp3"]
+    store.close()
+
+
+def test_older_layouts_are_discarded(path):
+    store = SessionStore(path)
+    store.save_playlist(["/a.mp3"])
+    store.close()
+    db = sqlite3.connect(path)
+    db.execute(f"PRAGMA user_version = {VERSION + 1}")
+    db.commit()
+    db.close()
+    store = SessionStore(path)
+    assert store.load() is None
+    store.close()
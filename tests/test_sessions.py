@@ -0,0 +1,78 @@
+import pytest
+from detector import GestureDetector
+from player_actor import send_gesture
+from sessions import GestureArbiter, GestureSession
+from synthetic_hands import FIST, OPEN, hands, make_hand
+
+
+def test_first_camera_holds_control():
+    arbiter = GestureArbiter(hold=1.5)
+    assert arbiter.admit(0, "play", now=10.0)
+    assert not arbiter.admit(1, "pause", now=10.5)
+    assert arbiter.admit(0, "pause", now=11.0)
+    # Idle for `hold`: another camera may take over
+    assert not arbiter.admit(1, "next", now=12.4)
+    assert arbiter.admit(1, "next", now=12.6)
+    assert not arbiter.admit(0, "play", now=13.0)
+
+
+def test_hand_reacquired_after_lost_after_keeps_control():
+    # A hand leaves the frame for longer than the tracker's lost_after and
+    # comes back as a new track: the same camera still has control
+    detector = GestureDetector(confirm=0.1, lost_after=0.5)
+    arbiter = GestureArbiter(hold=1.5)
+    admitted = []
+    tracks = set()
+    frames = [(i * 0.05, hands(make_hand(OPEN))) for i in range(6)]
+    frames += [(0.30 + i * 0.05, hands()) for i in range(14)]
+    frames += [(1.00 + i * 0.05, hands(make_hand(FIST))) for i in range(6)]
+    for now, frame in frames:
+        for track_id, name, value in detector.detect_users(frame, now):
+            tracks.add(track_id)
+            admitted.append((name, arbiter.admit(0, name, now=now)))
+    assert len(tracks) == 2
+    assert admitted == [("play", True), ("pause", True)]
+
+
+def test_second_hand_of_the_same_camera_is_admitted():
+    detector = GestureDetector(confirm=0.1)
+    arbiter = GestureArbiter()
+    left, right = make_hand(OPEN, dx=-0.3), make_hand(FIST, dx=0.3)
+    events = []
+    for i in range(6):
+        events += detector.detect_users(hands(left, right), i * 0.05)
+    assert {track_id for track_id, name, value in events} == {1, 2}
+    assert all(arbiter.admit(0, name, now=1.0) for track_id, name, value in events)
+
+
+class FakeActor:
+    def __init__(self, arbiter=None):
+        self.arbiter = arbiter
+        self.sent = []
+
+    def send(self, name, value=None, stamp=None, user=None):
+        if user is not None and self.arbiter is not None and not self.arbiter.admit(user, name):
+            return False
+        self.sent.append(name)
+        return True
+
+
+def test_refused_gestures_have_no_status_message():
+    actor = FakeActor(GestureArbiter())
+    assert send_gesture(actor, "play", None, user=0) == "Gesture: Play"
+    assert send_gesture(actor, "next", None, user=1) is None
+    assert actor.sent == ["play"]
+
+
+class FakeGui:
+    def __init__(self):
+        self.actor = FakeActor()
+
+
+@pytest.mark.parametrize("sources, arbitrated", [((0,), False), ((0, 1), True)])
+def test_arbiter_only_with_several_cameras(sources, arbitrated):
+    session = GestureSession(FakeGui(), print, sources=sources)
+    try:
+        assert (session.arbiter is not None) == arbitrated
+    finally:
+        session.stop()
@@ -0,0 +1,86 @@
+import json
+from shuffle import ShuffleEngine
+
+
+def play(engine, steps):
+    return [engine.next() for _ in range(steps)]
+
+
+def test_every_track_once_per_cycle():
+    engine = ShuffleEngine(50, seed=1)
+    for _ in range(3):
+        assert sorted(play(engine, 50)) == list(range(50))
+
+
+def test_start_counts_as_played():
+    engine = ShuffleEngine(20, start=7, seed=2)
+    cycle = play(engine, 19)
+    assert sorted(cycle) == [i for i in range(20) if i != 7]
+
+
+def test_no_repeat_across_cycles():
+    for seed in range(50):
+        engine = ShuffleEngine(5, seed=seed)
+        order = play(engine, 40)
+        assert all(a != b for a, b in zip(order, order[1:]))
+
+
+def test_seed_gives_the_same_order():
+    assert play(ShuffleEngine(30, seed=5), 60) == play(ShuffleEngine(30, seed=5), 60)
+
+
+def test_peek_matches_next():
+    engine = ShuffleEngine(10, seed=3)
+    for _ in range(25):
+        upcoming = engine.peek()
+        assert engine.peek() == upcoming
+        assert engine.next() == upcoming
+
+
+def test_back_and_forward():
+    engine = ShuffleEngine(10, seed=4)
+    order = play(engine, 5)
+    assert engine.previous() == order[3]
+    assert engine.previous() == order[2]
+    assert engine.next() == order[3]
+    assert engine.next() == order[4]
+    following = engine.next()
+    assert following not in order
+
+
+def test_history_runs_out():
+    engine = ShuffleEngine(10, seed=6, history_size=3)
+    play(engine, 6)
+    assert [engine.previous() for _ in range(4)][-1] is None
+
+
+def test_select_claims_the_track():
+    engine = ShuffleEngine(10, seed=7)
+    first = engine.next()
+    picked = next(i for i in range(10) if i != first and i != engine.peek())
+    engine.select(picked)
+    assert engine.current == picked
+    rest = play(engine, 8)
+    assert sorted(rest + [first, picked]) == list(range(10))
+    assert engine.previous() == rest[-2]
+
+
+def test_extend_adds_unplayed_tracks():
+    engine = ShuffleEngine(5, seed=8)
+    played = play(engine, 3)
+    engine.extend(3)
+    assert sorted(played + play(engine, 5)) == list(range(8))
+
+
+def test_state_round_trip_continues_exactly():
+    engine = ShuffleEngine(100, start=3, seed=None)
+    play(engine, 40)
+    engine.previous()
+    engine.peek()
+    # As a session stores it: JSON for everything but the order blob
+    state = engine.state()
+    info = json.loads(json.dumps({key: value for key, value in state.items() if key != "order"}))
+    restored = ShuffleEngine.from_state(dict(info, order=state["order"]))
+    assert restored.current == engine.current
+    assert play(restored, 150) == play(engine, 150)
+    assert [restored.previous() for _ in range(10)] == [engine.previous() for _ in range(10)]
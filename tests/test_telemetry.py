@@ -0,0 +1,126 @@
+import csv
+import json
+import pytest
+from telemetry import BUCKET_COUNT, BUCKET_MIN, BUCKETS_PER_DECADE, Histogram, Telemetry
+
+
+def edge(index):
+    # Upper edge of a bucket in seconds
+    return BUCKET_MIN * 10 ** (index / BUCKETS_PER_DECADE)
+
+
+def bucket_of(seconds):
+    histogram = Histogram()
+    histogram.add(seconds)
+    return histogram.buckets.index(1)
+
+
+@pytest.mark.parametrize("seconds, index", [
+    (0.0, 0),
+    (BUCKET_MIN, 0),
+    (BUCKET_MIN * 1.001, 1),
+    (edge(1) * 1.001, 2),
+    (0.001 * 1.001, 2 * BUCKETS_PER_DECADE + 1),
+    (0.001 * 0.999, 2 * BUCKETS_PER_DECADE),
+    (99.0, BUCKET_COUNT - 1),
+    (1e6, BUCKET_COUNT - 1),
+])
+def test_bucket_edges(seconds, index):
+    assert bucket_of(seconds) == index
+
+
+def test_buckets_cover_values_up_to_their_upper_edge():
+    for index in range(1, BUCKET_COUNT - 1):
+        assert bucket_of(edge(index) * 0.999) == index
+        assert bucket_of(edge(index) * 1.001) == index + 1
+
+
+def test_percentiles():
+    histogram = Histogram()
+    # 90 fast samples, 9 slow ones, one outlier
+    for _ in range(90):
+        histogram.add(0.0012)
+    for _ in range(9):
+        histogram.add(0.02)
+    histogram.add(0.5)
+    # Upper edge of the bucket holding each percentile, within 1/20 decade
+    assert 0.0012 <= histogram.percentile(50) < 0.0012 * 10 ** (1 / BUCKETS_PER_DECADE)
+    assert histogram.percentile(90) == histogram.percentile(50)
+    assert 0.02 <= histogram.percentile(95) < 0.02 * 10 ** (1 / BUCKETS_PER_DECADE)
+    assert histogram.percentile(99) == histogram.percentile(95)
+    # Never above the largest sample
+    assert histogram.percentile(100) == 0.5
+    assert histogram.max == 0.5
+
+
+def test_percentile_capped_by_max():
+    histogram = Histogram()
+    histogram.add(0.0012)
+    assert histogram.percentile(50) == 0.0012
+
+
+def test_empty():
+    histogram = Histogram()
+    assert histogram.percentile(50) == 0.0
+    assert histogram.summary() == {"count": 0}
+
+
+def test_summary_in_milliseconds():
+    histogram = Histogram()
+    histogram.add(0.001)
+    histogram.add(0.003)
+    summary = histogram.summary()
+    assert summary["count"] == 2
+    assert summary["mean"] == pytest.approx(2.0)
+    assert summary["max"] == pytest.approx(3.0)
+    assert summary["p99"] == pytest.approx(3.0)
+
+
+def test_merge_and_round_trip():
+    first, second = Histogram(), Histogram()
+    for value in (0.001, 0.002):
+        first.add(value)
+    second.add(0.1)
+    copy = Histogram.from_dict(json.loads(json.dumps(first.to_dict())))
+    assert copy.to_dict() == first.to_dict()
+    copy.merge(second)
+    assert copy.count == 3
+    assert copy.total == pytest.approx(0.103)
+    assert copy.max == 0.1
+    assert sum(copy.buckets) == 3
+    # The original is untouched
+    assert first.count == 2
+
+
+def test_disabled_telemetry_records_nothing():
+    telemetry = Telemetry()
+    assert telemetry.now() == 0.0
+    telemetry.record("capture", 1.0)
+    telemetry.observe("capture", 0.01)
+    telemetry.count("frames")
+    assert telemetry.state() == {"histograms": {}, "counters": {}}
+
+
+def test_remote_state_is_merged(tmp_path):
+    local, worker = Telemetry(enabled=True), Telemetry(enabled=True)
+    local.observe("dispatch", 0.001)
+    local.count("frames", 2)
+    worker.observe("inference", 0.02)
+    worker.observe("dispatch", 0.003)
+    worker.count("frames", 3)
+    local.merge_remote("worker0", json.loads(json.dumps(worker.state())))
+    report = local.report()
+    assert report["stages"]["dispatch"]["count"] == 2
+    assert report["stages"]["inference"]["count"] == 1
+    assert report["counters"] == {"frames": 5}
+    # Merging for a report leaves the local histograms alone
+    assert local.histograms["dispatch"].count == 1
+
+    path = local.export(str(tmp_path / "report.csv"))
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][0] == "stage"
+    assert [row[0] for row in rows[1:]] == ["dispatch", "inference", "frames"]
+    path = local.export(str(tmp_path / "report.json"))
+    with open(path) as f:
+        assert json.load(f)["counters"] == {"frames": 5}
@@ -0,0 +1,89 @@
+import math
+import numpy as np
+import pytest
+from tracker import HandTracker, OneEuroFilter
+from synthetic_hands import OPEN, hands, make_hand
+
+
+def test_one_euro_first_value_passes_through():
+    smooth = OneEuroFilter()
+    np.testing.assert_allclose(smooth([0.3, 0.7], 0.0), [0.3, 0.7])
+    np.testing.assert_allclose(smooth([0.3, 0.7], 0.1), [0.3, 0.7])
+
+
+def test_one_euro_alpha():
+    # Time constant 1 / (2 pi fc) against the step dt
+    assert OneEuroFilter.alpha(1.0, 1 / (2 * math.pi)) == pytest.approx(0.5)
+    assert OneEuroFilter.alpha(1.5, 0.01) < OneEuroFilter.alpha(1.5, 0.1) < 1.0
+
+
+def test_one_euro_first_step():
+    # The derivative starts at zero, so the first step uses min_cutoff only
+    smooth = OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    smooth(0.0, 0.0)
+    assert float(smooth(1.0, 0.1)) == pytest.approx(OneEuroFilter.alpha(1.0, 0.1))
+
+
+def test_one_euro_follows_fast_movement_with_beta():
+    # Same ramp, a speed term makes the filter lag less
+    steady, adaptive = OneEuroFilter(beta=0.0), OneEuroFilter(beta=2.0)
+    for i in range(30):
+        slow = steady(i * 0.02, i / 30)
+        fast = adaptive(i * 0.02, i / 30)
+    target = 29 * 0.02
+    assert target - float(fast) < target - float(slow)
+    assert 0 < float(slow) < target
+
+
+def test_one_euro_ignores_stale_timestamps():
+    smooth = OneEuroFilter()
+    smooth(0.0, 1.0)
+    first = float(smooth(1.0, 1.1))
+    assert float(smooth(5.0, 1.1)) == first
+    assert float(smooth(5.0, 1.0)) == first
+
+
+def test_ids_in_input_order():
+    tracker = HandTracker()
+    tracks = tracker.update(hands(make_hand(OPEN, dx=-0.3), make_hand(OPEN, dx=0.3)), 0.0)
+    assert [track.id for track in tracks] == [1, 2]
+
+
+def test_nearest_track_keeps_its_id():
+    tracker = HandTracker()
+    left, right = make_hand(OPEN, dx=-0.3), make_hand(OPEN, dx=0.3)
+    tracker.update(hands(left, right), 0.0)
+    # Input order swapped, hands moved a little
+    tracks = tracker.update(hands(make_hand(OPEN, dx=0.32), make_hand(OPEN, dx=-0.28)), 0.05)
+    assert [track.id for track in tracks] == [2, 1]
+
+
+def test_far_hand_gets_a_new_id():
+    tracker = HandTracker(max_distance=0.25)
+    tracker.update(hands(make_hand(OPEN, dx=-0.3)), 0.0)
+    tracks = tracker.update(hands(make_hand(OPEN, dx=0.3)), 0.05)
+    assert [track.id for track in tracks] == [2]
+
+
+def test_lost_after():
+    tracker = HandTracker(lost_after=0.5)
+    hand = hands(make_hand(OPEN))
+    tracker.update(hand, 0.0)
+    # Frames without the hand: kept up to lost_after
+    tracker.update(hands(), 0.3)
+    assert [track.id for track in tracker.update(hand, 0.5)] == [1]
+    tracker.update(hands(), 0.8)
+    assert [track.id for track in tracker.tracks] == [1]
+    tracker.update(hands(), 1.01)
+    assert tracker.tracks == []
+    assert [track.id for track in tracker.update(hand, 1.05)] == [2]
+
+
+def test_track_landmarks_are_smoothed():
+    tracker = HandTracker()
+    tracker.update(hands(make_hand(OPEN)), 0.0)
+    jumped = make_hand(OPEN, dx=0.1)
+    track = tracker.update(hands(jumped), 1 / 30)[0]
+    assert make_hand(OPEN)[0, 0] < track.hand[0, 0] < jumped[0, 0]
+    np.testing.assert_allclose(track.centre, track.hand[[0, 5, 9, 13, 17], :2].mean(axis=0))
+    assert track.first_seen == 0.0 and track.last_seen == pytest.approx(1 / 30)
@@ -0,0 +1,94 @@
+import math
+import numpy as np
+from classifier import palm_centre
+
+
+class OneEuroFilter:
+    # One-Euro low-pass filter over arrays of any shape: steady landmarks are
+    # smoothed hard, fast-moving ones follow with little lag
+    def __init__(self, min_cutoff=1.5, beta=2.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.value = None
+        self.derivative = None
+        self.timestamp = None
+
+    @staticmethod
+    def alpha(cutoff, dt):
+        # Smoothing factor for a cutoff frequency (scalar or per element)
+        return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+    def __call__(self, value, timestamp):
+        value = np.asarray(value, dtype=np.float32)
+        if self.value is None:
+            self.value = value
+            self.derivative = np.zeros_like(value)
+            self.timestamp = timestamp
+            return self.value
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return self.value
+        derivative = (value - self.value) / dt
+        self.derivative = self.derivative + self.alpha(self.d_cutoff, dt) * (derivative - self.derivative)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.derivative)
+        self.value = self.value + self.alpha(cutoff, dt) * (value - self.value)
+        self.timestamp = timestamp
+        return self.value
+
+
+class HandTrack:
+    # One hand followed across frames
+    def __init__(self, track_id, hand, now, filter_options):
+        self.id = track_id
+        self.filter = OneEuroFilter(**filter_options)
+        self.hand = self.filter(hand, now)
+        self.centre = palm_centre(self.hand)
+        self.first_seen = now
+        self.last_seen = now
+        self.state = None
+
+    def update(self, hand, now):
+        self.hand = self.filter(hand, now)
+        self.centre = palm_centre(self.hand)
+        self.last_seen = now
+
+
+class HandTracker:
+    # Gives every hand a stable id by matching palm centres to the nearest
+    # track of the previous frames, and smooths its landmarks. Tracks that
+    # have not been seen for `lost_after` seconds are dropped.
+    def __init__(self, max_distance=0.25, lost_after=0.5, **filter_options):
+        self.max_distance = max_distance
+        self.lost_after = lost_after
+        self.filter_options = filter_options
+        self.tracks = []
+        self.next_id = 1
+
+    def update(self, hands, now):
+        # Matched tracks for hands shaped (hands, 21, 3), in input order
+        centres = palm_centre(hands) if len(hands) else np.empty((0, 2), dtype=np.float32)
+        pairs = []
+        for i, centre in enumerate(centres):
+            for track in self.tracks:
+                pairs.append((float(np.hypot(*(centre - track.centre))), i, track))
+        pairs.sort(key=lambda pair: pair[0])
+
+        matched = [None] * len(hands)
+        used = set()
+        for distance, i, track in pairs:
+            if distance > self.max_distance:
+                break
+            if matched[i] is None and track.id not in used:
+                matched[i] = track
+                used.add(track.id)
+                track.update(hands[i], now)
+
+        for i, track in enumerate(matched):
+            if track is None:
+                track = HandTrack(self.next_id, hands[i], now, self.filter_options)
+                self.next_id += 1
+                self.tracks.append(track)
+                matched[i] = track
+        self.tracks = [track for track in self.tracks if now - track.last_seen <= self.lost_after]
+        return matched